@@ -0,0 +1,92 @@
+"""
+Per-endpoint admission control for api_server.py.
+
+A pure ASGI middleware that puts each configured endpoint behind its own
+Bulkhead. Requests beyond the endpoint's concurrency limit wait in a short,
+bounded queue; once the queue is full or the queue-time deadline passes
+they are shed with `429 Too Many Requests` and `Retry-After`. They are not
+left to pile up and time out. It is ASGI rather than `@app.middleware` so
+streamed responses and disconnect detection pass through untouched.
+"""
+
+import json
+import math
+
+from bulkhead import AdaptiveBulkhead, Bulkhead, BulkheadFullError
+
+
+def endpoint_limiters(
+    endpoints: list,
+    max_concurrent: int = 64,
+    max_queue: int = 128,
+    queue_timeout: float = 1.0,
+    adaptive: bool = False,
+    latency_target: float = 0.5,
+    overrides: dict = None
+) -> dict:
+    """
+    Build {path: Bulkhead} for the given endpoints.
+
+    `overrides` maps a path to keyword arguments (max_concurrent, max_queue,
+    queue_timeout, adaptive, latency_target, min_concurrent) that replace
+    the defaults for that endpoint only.
+    """
+    limiters = {}
+    for path in endpoints:
+        options = {
+            "max_concurrent": max_concurrent,
+            "max_queue": max_queue,
+            "queue_timeout": queue_timeout,
+            "adaptive": adaptive,
+            "latency_target": latency_target,
+            **(overrides or {}).get(path, {})
+        }
+        if options.pop("adaptive"):
+            limiters[path] = AdaptiveBulkhead(path, **options)
+        else:
+            options.pop("latency_target")
+            options.pop("min_concurrent", None)
+            limiters[path] = Bulkhead(path, **options)
+    return limiters
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that sheds load per endpoint with 429 + Retry-After.
+
+    Args:
+        app: ASGI application to protect
+        limiters: {path: Bulkhead}; paths not listed are never limited
+    """
+
+    def __init__(self, app, limiters: dict):
+        self.app = app
+        self.limiters = limiters
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limiters.get(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        admitted = False
+        try:
+            async with limiter.slot():
+                admitted = True
+                await self.app(scope, receive, send)
+        except BulkheadFullError as e:
+            if admitted:
+                raise
+            await self._reject(send, limiter, str(e))
+
+    async def _reject(self, send, limiter: Bulkhead, message: str):
+        body = json.dumps({"error": message}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(limiter.queue_timeout))).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,9 +1,266 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager, nullcontext
+from fastapi import FastAPI, HTTPException, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-import subprocess
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from typing import List
+import asyncio
 import json
+import math
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-app = FastAPI()
+from mcp_client import MCPSessionError, MCPTimeoutError
+from mcp_pool import MCPSessionPool, PoolExhaustedError
+from mcp_zygote import ZygoteLauncher
+from mcp_dispatch import InProcessDispatcher, load_tool_registry, load_wrapped_tools
+from admission import AdmissionMiddleware, endpoint_limiters
+from bulkhead import Bulkhead, BulkheadFullError
+from hedging import HedgePolicy
+from metrics import Registry
+from response_encoding import EncodedResult, dumps, loads, negotiate, variant_etag
+from result_cache import ResultCache, SQLiteResultCache, cache_key, encode_result, etag_matches
+from singleflight import SingleFlight
+from traffic_capture import CaptureMiddleware, TrafficRecorder
+
+# Telemetry served at /metrics
+registry = Registry()
+TOOL_REQUESTS = registry.counter(
+    "mcp_tool_requests_total", "Tool calls by outcome (ok, tool_error, error, cancelled, cache_hit, coalesced)", ("tool", "outcome")
+)
+TOOL_ERRORS = registry.counter("mcp_tool_errors_total", "Failed tool calls by error type", ("tool", "type"))
+TOOL_LATENCY = registry.histogram("mcp_tool_request_seconds", "End-to-end tool call latency", ("tool",))
+TOOL_PHASES = registry.histogram(
+    "mcp_tool_phase_seconds", "Tool call latency by phase (bulkhead_wait, queue_wait, execute, parse)", ("tool", "phase")
+)
+RESPONSE_BYTES = registry.counter(
+    "mcp_response_bytes_total", "Tool response body bytes sent, by content-coding", ("coding",)
+)
+TOOL_IN_FLIGHT = registry.gauge("mcp_tool_in_flight", "Tool calls currently executing", ("tool",))
+WS_CONNECTIONS = registry.gauge("mcp_websocket_connections", "Open /ws connections")
+SESSION_STARTUP = registry.histogram(
+    "mcp_session_startup_seconds",
+    "MCP server startup by phase (spawn: process creation, initialize: imports and handshake)",
+    ("phase",)
+)
+
+def observe_session_start(client):
+    SESSION_STARTUP.observe(client.spawn_seconds, phase="spawn")
+    SESSION_STARTUP.observe(client.initialize_seconds, phase="initialize")
+
+# "exec" starts every session as a fresh `sever.py` process, "fork" forks
+# sessions from a zygote that has already imported it
+POOL_LAUNCHER = os.environ.get("MCP_POOL_LAUNCHER", "exec").lower()
+zygote = ZygoteLauncher() if POOL_LAUNCHER == "fork" else None
+
+# Bulkheads: the Firebase tools block on the network for seconds while the
+# template and analysis tools finish in microseconds. Each class gets its own
+# slots, queue, deadline and MCP sessions (or worker threads), so a Firebase
+# slowdown can't starve the fast tools.
+NETWORK_TOOLS = {"download_firebase_txt_file", "list_firebase_files"}
+
+def compartment(tool_name: str) -> str:
+    return "network" if tool_name in NETWORK_TOOLS else "cpu"
+
+def bulkhead_from_env(name: str, max_concurrent: int, max_queue: int, queue_timeout: float, timeout: float) -> Bulkhead:
+    prefix = f"MCP_{name.upper()}_BULKHEAD"
+    return Bulkhead(
+        name,
+        max_concurrent=int(os.environ.get(f"{prefix}_MAX_CONCURRENT", str(max_concurrent))),
+        max_queue=int(os.environ.get(f"{prefix}_MAX_QUEUE", str(max_queue))),
+        queue_timeout=float(os.environ.get(f"{prefix}_QUEUE_TIMEOUT", str(queue_timeout))),
+        timeout=float(os.environ.get(f"{prefix}_TIMEOUT", str(timeout)))
+    )
+
+bulkheads = {
+    "cpu": bulkhead_from_env("cpu", max_concurrent=64, max_queue=256, queue_timeout=2.0, timeout=10.0),
+    "network": bulkhead_from_env("network", max_concurrent=8, max_queue=32, queue_timeout=5.0, timeout=30.0)
+}
+registry.gauge("mcp_bulkhead_active", "Calls running in each bulkhead", ("bulkhead",),
+               callback=lambda: {(name,): b.active for name, b in bulkheads.items()})
+registry.gauge("mcp_bulkhead_queued", "Calls waiting for a bulkhead slot", ("bulkhead",),
+               callback=lambda: {(name,): b.queued for name, b in bulkheads.items()})
+registry.counter("mcp_bulkhead_rejected_total", "Calls rejected by a full bulkhead", ("bulkhead", "reason"),
+                 callback=lambda: {
+                     (name, reason): count
+                     for name, b in bulkheads.items() for reason, count in b.rejected.items()
+                 })
+
+# Hedging: idempotent calls that outlast their tool's recent p95 are sent
+# again on a second session; the first answer wins, the loser is cancelled
+HEDGING = os.environ.get("MCP_HEDGE", "1") == "1"
+
+def hedge_policy_from_env():
+    if not HEDGING:
+        return None
+    return HedgePolicy(
+        percentile=float(os.environ.get("MCP_HEDGE_PERCENTILE", "95")),
+        min_samples=int(os.environ.get("MCP_HEDGE_MIN_SAMPLES", "20")),
+        budget=float(os.environ.get("MCP_HEDGE_BUDGET", "0.1"))
+    )
+
+def pool_from_env(size: int, size_variable: str) -> MCPSessionPool:
+    return MCPSessionPool(
+        size=int(os.environ.get(size_variable, str(size))),
+        max_inflight=int(os.environ.get("MCP_POOL_MAX_INFLIGHT", "32")),
+        max_calls=int(os.environ.get("MCP_POOL_MAX_CALLS", "1000")),
+        max_waiters=int(os.environ.get("MCP_POOL_MAX_WAITERS", "64")),
+        acquire_timeout=float(os.environ.get("MCP_POOL_ACQUIRE_TIMEOUT", "10")),
+        health_check_interval=float(os.environ.get("MCP_POOL_HEALTH_CHECK_INTERVAL", "30")),
+        on_start=observe_session_start,
+        client_factory=zygote.client if zygote is not None else None,
+        hedging=hedge_policy_from_env()
+    )
+
+# Pools of pre-initialized `sever.py` sessions, one per bulkhead
+pools = {
+    "cpu": pool_from_env(4, "MCP_POOL_SIZE"),
+    "network": pool_from_env(2, "MCP_NETWORK_POOL_SIZE")
+}
+registry.gauge("mcp_pool_sessions", "Live and starting MCP sessions", ("pool", "state"), callback=lambda: {
+    (name, state): p.stats()[state] for name, p in pools.items() for state in ("live", "starting")
+})
+registry.gauge("mcp_pool_in_flight", "Calls currently borrowed from pool sessions", ("pool",),
+               callback=lambda: {(name,): p.stats()["in_flight"] for name, p in pools.items()})
+registry.gauge("mcp_pool_waiting", "Callers queued for a pool session", ("pool",),
+               callback=lambda: {(name,): p.stats()["waiting"] for name, p in pools.items()})
+registry.counter("mcp_pool_recycled_total", "Sessions recycled after max_calls", ("pool",),
+                 callback=lambda: {(name,): p.recycled for name, p in pools.items()})
+registry.counter("mcp_hedged_calls_total", "Calls duplicated on a second session", ("pool",),
+                 callback=lambda: {(name,): p.hedging.hedges for name, p in pools.items() if p.hedging})
+registry.counter("mcp_hedge_wins_total", "Hedged calls answered first by the duplicate", ("pool",),
+                 callback=lambda: {(name,): p.hedging.hedge_wins for name, p in pools.items() if p.hedging})
+# Default per-request deadline; clients may shorten it with X-Request-Timeout
+TOOL_TIMEOUT = float(os.environ.get("MCP_TOOL_TIMEOUT", "30"))
+
+# "stdio" talks to pooled sever.py processes, "inprocess" calls the tools directly
+DISPATCH_MODE = os.environ.get("MCP_DISPATCH_MODE", "stdio").lower()
+in_process = {}
+if DISPATCH_MODE == "inprocess":
+    try:
+        registry_fns, wrapped = load_tool_registry(), load_wrapped_tools()
+        in_process = {
+            "cpu": InProcessDispatcher(registry_fns, wrapped=wrapped),
+            # Network tools get their own threads instead of the loop's shared executor
+            "network": InProcessDispatcher(registry_fns, wrapped=wrapped, executor=ThreadPoolExecutor(
+                max_workers=bulkheads["network"].max_concurrent, thread_name_prefix="mcp-network"
+            ))
+        }
+    except Exception as e:
+        print(f"In-process dispatch unavailable, falling back to stdio: {e}", file=sys.stderr)
+
+# Tools exposed over HTTP. The template and analysis tools are pure functions
+# of their arguments, so their results can be cached.
+CACHEABLE_TOOLS = {
+    "collect_requirements",
+    "provide_base_template",
+    "provide_advanced_template",
+    "analyze_process_automation"
+}
+API_TOOLS = CACHEABLE_TOOLS | NETWORK_TOOLS
+# Safe to run twice, so they may be hedged
+IDEMPOTENT_TOOLS = CACHEABLE_TOOLS | {"list_firebase_files"}
+# HTTP callers get the downloaded text back instead of files written on the
+# server. In this mode the tool only fetches https URLs on the Firebase hosts,
+# doesn't follow redirects and refuses filenames with path separators.
+ARGUMENT_OVERRIDES = {"download_firebase_txt_file": {"return_content": True, "save_as_cline_rules": False}}
+BATCH_MAX_ITEMS = int(os.environ.get("MCP_BATCH_MAX_ITEMS", "100"))
+# Tool calls one /ws connection may have running at once
+WS_MAX_IN_FLIGHT = int(os.environ.get("MCP_WS_MAX_IN_FLIGHT", "32"))
+# "memory" keeps a cache per worker process, "sqlite" shares one across all
+# uvicorn workers on the host
+CACHE_BACKEND = os.environ.get("MCP_CACHE_BACKEND", "memory").lower()
+if CACHE_BACKEND == "sqlite":
+    cache = SQLiteResultCache(
+        os.environ.get("MCP_CACHE_PATH", os.path.join(tempfile.gettempdir(), "mcp-result-cache.sqlite3")),
+        max_bytes=int(os.environ.get("MCP_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        ttl=float(os.environ.get("MCP_CACHE_TTL", "300"))
+    )
+else:
+    cache = ResultCache(
+        max_entries=int(os.environ.get("MCP_CACHE_MAX_ENTRIES", "1024")),
+        ttl=float(os.environ.get("MCP_CACHE_TTL", "300"))
+    )
+# The sqlite backend does blocking I/O and can wait for another worker's
+# write lock, so its calls run in a worker thread instead of on the loop
+CACHE_IN_THREAD = isinstance(cache, SQLiteResultCache)
+
+async def cache_io(fn, *args):
+    """Call a result cache method, off the event loop if the backend blocks"""
+    if CACHE_IN_THREAD:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+for counter in ("hits", "misses", "evictions", "expirations"):
+    registry.counter(f"mcp_cache_{counter}_total", f"Result cache {counter}", callback=lambda c=counter: getattr(cache, c))
+# Read from memory: a stats() call would query the sqlite backend on the loop
+registry.gauge("mcp_cache_entries", "Results currently cached", callback=lambda: cache.entries)
+
+# Identical concurrent calls share one execution
+COALESCE_CALLS = os.environ.get("MCP_COALESCE_CALLS", "1") == "1"
+flights = SingleFlight()
+registry.counter("mcp_singleflight_executions_total", "Tool executions started", callback=lambda: flights.executions)
+registry.counter("mcp_singleflight_coalesced_total", "Calls that joined an identical in-flight execution",
+                 callback=lambda: flights.coalesced)
+registry.gauge("mcp_singleflight_coalescing_ratio", "Share of calls served by another call's execution",
+               callback=lambda: flights.stats()["coalescing_ratio"])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not in_process:
+        if zygote is not None:
+            try:
+                await zygote.start()
+            except Exception as e:
+                print(f"MCP zygote unavailable, falling back to exec: {e}", file=sys.stderr)
+                for p in pools.values():
+                    p.client_factory = None
+        await asyncio.gather(*[p.start() for p in pools.values()])
+    yield
+    await asyncio.gather(*[p.close() for p in pools.values()])
+    if zygote is not None:
+        await zygote.close()
+    if recorder is not None:
+        recorder.close()
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fast encoder"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# Admission control: each tool endpoint gets a concurrency limit, a queue
+# depth and a queue-time deadline; excess requests are shed with 429
+ADMISSION_ENDPOINTS = [f"/{tool}" for tool in sorted(API_TOOLS)] + ["/batch"]
+admission = {}
+if os.environ.get("MCP_ADMISSION", "1") == "1":
+    admission = endpoint_limiters(
+        ADMISSION_ENDPOINTS,
+        max_concurrent=int(os.environ.get("MCP_ADMISSION_MAX_CONCURRENT", "64")),
+        max_queue=int(os.environ.get("MCP_ADMISSION_MAX_QUEUE", "128")),
+        queue_timeout=float(os.environ.get("MCP_ADMISSION_QUEUE_TIMEOUT", "1")),
+        adaptive=os.environ.get("MCP_ADMISSION_ADAPTIVE", "0") == "1",
+        latency_target=float(os.environ.get("MCP_ADMISSION_LATENCY_TARGET", "0.5")),
+        overrides=json.loads(os.environ.get("MCP_ADMISSION_OVERRIDES", "{}"))
+    )
+registry.gauge("mcp_admission_limit", "Current concurrency limit per endpoint", ("endpoint",),
+               callback=lambda: {(path,): limiter.limit for path, limiter in admission.items()})
+registry.gauge("mcp_admission_active", "Requests admitted and running per endpoint", ("endpoint",),
+               callback=lambda: {(path,): limiter.active for path, limiter in admission.items()})
+registry.gauge("mcp_admission_queued", "Requests waiting for admission per endpoint", ("endpoint",),
+               callback=lambda: {(path,): limiter.queued for path, limiter in admission.items()})
+registry.counter("mcp_admission_rejected_total", "Requests shed with 429", ("endpoint", "reason"),
+                 callback=lambda: {
+                     (path, reason): count
+                     for path, limiter in admission.items() for reason, count in limiter.rejected.items()
+                 })
+# Added before CORS so that 429 responses still carry the CORS headers
+app.add_middleware(AdmissionMiddleware, limiters=admission)
 
 # Add CORS middleware for Lovable frontend integration
 app.add_middleware(
@@ -14,65 +271,186 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def call_mcp_tool(tool_name: str, **kwargs):
-    """Call an MCP tool by running the server as a subprocess"""
+# Opt-in traffic capture for replay_traffic.py. Outermost, so requests shed
+# with 429 are recorded too; "{pid}" in the path gives each worker its own file
+CAPTURE_PATH = os.environ.get("MCP_CAPTURE_PATH")
+recorder = TrafficRecorder(CAPTURE_PATH) if CAPTURE_PATH else None
+if recorder is not None:
+    app.add_middleware(CaptureMiddleware, recorder=recorder, paths=ADMISSION_ENDPOINTS)
+registry.counter("mcp_captured_requests_total", "Requests written to the capture file",
+                 callback=lambda: recorder.records if recorder is not None else 0)
+
+def parse_deadline(value) -> float:
+    """A client's requested deadline in seconds, capped at TOOL_TIMEOUT; the default unless finite and positive"""
     try:
-        # Prepare the MCP request
-        request = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "tools/call",
-            "params": {
-                "name": tool_name,
-                "arguments": kwargs
-            }
-        }
-        
-        # Run the MCP server and send the request
-        process = subprocess.Popen(
-            ["python", "/Users/prerna/MCP-1/sever.py"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return TOOL_TIMEOUT
+    if not math.isfinite(seconds) or seconds <= 0:
+        return TOOL_TIMEOUT
+    return min(seconds, TOOL_TIMEOUT)
+
+def request_deadline(request: Request) -> float:
+    """Seconds this request may spend waiting for its tool call"""
+    return parse_deadline(request.headers.get("x-request-timeout"))
+
+async def wait_for_disconnect(request: Request):
+    """Return once the client has gone away"""
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+class ToolCallError(Exception):
+    """The MCP server answered a tool call with a JSON-RPC error."""
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away before the tool call finished."""
+
+async def dispatch(tool_name: str, arguments: dict, timeout: float, timings: dict = None) -> dict:
+    """Run a tool call inside its bulkhead, in-process if enabled, otherwise on a pooled session"""
+    name = compartment(tool_name)
+    bulkhead = bulkheads[name]
+    started = time.perf_counter()
+    async with bulkhead.slot(timings):
+        # Pass down only what is left of the caller's deadline
+        remaining = timeout - (time.perf_counter() - started)
+        if remaining <= 0:
+            raise MCPTimeoutError(f"Deadline of {timeout}s passed while waiting for the '{name}' bulkhead")
+        timeout = min(remaining, bulkhead.timeout)
+        dispatcher = in_process.get(name)
+        if dispatcher is not None and dispatcher.has_tool(tool_name):
+            return await dispatcher.call_tool(tool_name, arguments, timeout=timeout, timings=timings)
+        return await pools[name].call_tool(
+            tool_name, arguments, timeout=timeout, timings=timings, hedge=tool_name in IDEMPOTENT_TOOLS
         )
-        
-        # Send initialization request first
-        init_request = {
-            "jsonrpc": "2.0",
-            "id": 0,
-            "method": "initialize",
-            "params": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {},
-                "clientInfo": {"name": "api-client", "version": "1.0.0"}
-            }
-        }
-        
-        stdout, stderr = process.communicate(
-            json.dumps(init_request) + "\n" + json.dumps(request) + "\n"
+
+async def run_tool(tool_name: str, arguments: dict, timeout: float):
+    """
+    Run one tool call, serving deterministic tools from the result cache.
+
+    Identical calls (same tool and canonical arguments) that arrive while one
+    is already running share that execution instead of starting another.
+    The shared execution runs with the full TOOL_TIMEOUT rather than the
+    first caller's deadline; each caller stops waiting at its own deadline,
+    and the execution is cancelled once none is left waiting.
+
+    Returns (result, encoded); `encoded` is the result's EncodedResult (body,
+    ETag and compressed variants) for cacheable results, otherwise None.
+    """
+    key = cache_key(tool_name, arguments)
+    cacheable = tool_name in CACHEABLE_TOOLS
+    if cacheable:
+        cached = await cache_io(cache.lookup, key)
+        if cached is not None:
+            TOOL_REQUESTS.inc(tool=tool_name, outcome="cache_hit")
+            return cached
+
+    if not COALESCE_CALLS:
+        return await execute_tool(tool_name, arguments, timeout, key if cacheable else None)
+    if key in flights:
+        TOOL_REQUESTS.inc(tool=tool_name, outcome="coalesced")
+    return await flights.do(
+        key, lambda: execute_tool(tool_name, arguments, TOOL_TIMEOUT, key if cacheable else None)
+    )
+
+async def execute_tool(tool_name: str, arguments: dict, timeout: float, cache_as: str = None):
+    """Dispatch a tool call, record its telemetry and cache the result under `cache_as`"""
+    timings = {}
+    started = time.perf_counter()
+    try:
+        with TOOL_IN_FLIGHT.track(tool=tool_name):
+            response = await dispatch(tool_name, arguments, timeout, timings)
+        if "error" in response:
+            raise ToolCallError(f"Failed to call tool: {response['error'].get('message')}")
+    except asyncio.CancelledError:
+        TOOL_REQUESTS.inc(tool=tool_name, outcome="cancelled")
+        raise
+    except Exception as e:
+        TOOL_REQUESTS.inc(tool=tool_name, outcome="error")
+        TOOL_ERRORS.inc(tool=tool_name, type=type(e).__name__)
+        raise
+    finally:
+        TOOL_LATENCY.observe(time.perf_counter() - started, tool=tool_name)
+        for phase, seconds in timings.items():
+            TOOL_PHASES.observe(seconds, tool=tool_name, phase=phase)
+
+    result = response.get("result", {})
+    if result.get("isError"):
+        TOOL_REQUESTS.inc(tool=tool_name, outcome="tool_error")
+        TOOL_ERRORS.inc(tool=tool_name, type="ToolError")
+        return result, None
+    TOOL_REQUESTS.inc(tool=tool_name, outcome="ok")
+    if cache_as is not None:
+        encoded = encode_result(result)
+        await cache_io(cache.put, cache_as, result, encoded)
+        return result, encoded
+    return result, None
+
+async def until_disconnect(request: Request, awaitable, deadline: float):
+    """
+    Await a tool call within the request deadline.
+
+    The call is cancelled (which also cancels it on the MCP server) as soon
+    as the client disconnects or the deadline passes.
+    """
+    call = asyncio.ensure_future(awaitable)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(request))
+    done = set()
+    try:
+        done, _ = await asyncio.wait(
+            {call, disconnect}, timeout=deadline, return_when=asyncio.FIRST_COMPLETED
         )
-        
-        if process.returncode == 0:
-            lines = stdout.strip().split('\n')
-            for line in lines:
-                if line.strip():
-                    try:
-                        response = json.loads(line)
-                        if response.get("id") == 1:  # Our tool call response
-                            return response.get("result", {})
-                    except json.JSONDecodeError:
-                        continue
-        
-        return {"error": f"Failed to call tool: {stderr}"}
-        
+    finally:
+        for task in (call, disconnect):
+            if not task.done():
+                task.cancel()
+
+    if call not in done:
+        if disconnect in done:
+            raise ClientDisconnected()
+        raise MCPTimeoutError(f"Deadline of {deadline}s exceeded")
+    return call.result()
+
+def encoded_response(request: Request, encoded: EncodedResult):
+    """
+    Send pre-encoded JSON in the best content-coding the client accepts.
+
+    Compressed variants are built once and kept on `encoded`. Results with
+    an ETag get 304 if the client already has the variant it would receive.
+    """
+    coding, body = encoded.encode(negotiate(request.headers.get("accept-encoding")))
+    headers = {"Vary": "Accept-Encoding"}
+    if coding is not None:
+        headers["Content-Encoding"] = coding
+    if encoded.etag is not None:
+        headers["ETag"] = variant_etag(encoded.etag, coding)
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+    RESPONSE_BYTES.inc(len(body), coding=coding or "identity")
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def call_mcp_tool(request: Request, tool_name: str, **kwargs):
+    """Call an MCP tool in-process if enabled, otherwise on a pooled server session"""
+    deadline = request_deadline(request)
+    try:
+        result, encoded = await until_disconnect(request, run_tool(tool_name, kwargs, deadline), deadline)
+    except ClientDisconnected:
+        return Response(status_code=499)
+    except MCPTimeoutError as e:
+        return JSONResponse(status_code=504, content={"error": str(e)})
+    except (BulkheadFullError, PoolExhaustedError) as e:
+        # Shed load: the caller may retry shortly
+        return JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "1"})
+    except MCPSessionError as e:
+        return JSONResponse(status_code=502, content={"error": str(e)})
     except Exception as e:
         return {"error": str(e)}
+    return encoded_response(request, encoded or EncodedResult(dumps(result)))
 
 @app.get("/collect_requirements")
-def collect_requirements(project_name: str, project_type: str, complexity: str, tech_stack: str = "not specified", deadline_weeks: int = 4):
+async def collect_requirements(request: Request, project_name: str, project_type: str, complexity: str, tech_stack: str = "not specified", deadline_weeks: int = 4):
     """Collect requirements and return implementation plan"""
-    return call_mcp_tool(
+    return await call_mcp_tool(
+        request,
         "collect_requirements",
         project_name=project_name,
         project_type=project_type,
@@ -82,17 +460,18 @@ def collect_requirements(project_name: str, project_type: str, complexity: str,
     )
 
 @app.get("/provide_base_template")
-def provide_base_template(use_case: str):
+async def provide_base_template(request: Request, use_case: str):
     """Get base prompt templates for a use case"""
-    return call_mcp_tool("provide_base_template", use_case=use_case)
+    return await call_mcp_tool(request, "provide_base_template", use_case=use_case)
 
 @app.get("/provide_advanced_template")
-def provide_advanced_template(base_template: str, style: str = "clean_code"):
+async def provide_advanced_template(request: Request, base_template: str, style: str = "clean_code"):
     """Enhance a base template with advanced details"""
-    return call_mcp_tool("provide_advanced_template", base_template=base_template, style=style)
+    return await call_mcp_tool(request, "provide_advanced_template", base_template=base_template, style=style)
 
 @app.get("/analyze_process_automation")
-def analyze_process_automation(
+async def analyze_process_automation(
+    request: Request,
     process_name: str, 
     primary_goal: str, 
     trigger_type: str, 
@@ -104,7 +483,8 @@ def analyze_process_automation(
     pain_points: str = "not specified"
 ):
     """Analyze process automation with detailed recommendations"""
-    return call_mcp_tool(
+    return await call_mcp_tool(
+        request,
         "analyze_process_automation",
         process_name=process_name,
         primary_goal=primary_goal,
@@ -117,9 +497,210 @@ def analyze_process_automation(
         pain_points=pain_points
     )
 
+@app.get("/download_firebase_txt_file")
+async def download_firebase_txt_file(
+    request: Request,
+    firebase_url: str,
+    project_id: str = "your-firebase-project-id",
+    file_path: str = "project_plans",
+    filename: str = ""
+):
+    """Download a .txt file from Firebase and return its content"""
+    return await call_mcp_tool(
+        request,
+        "download_firebase_txt_file",
+        firebase_url=firebase_url,
+        project_id=project_id,
+        file_path=file_path,
+        filename=filename,
+        **ARGUMENT_OVERRIDES["download_firebase_txt_file"]
+    )
+
+@app.get("/list_firebase_files")
+async def list_firebase_files(request: Request, project_id: str = "mcptest-468919", collection: str = "project_requirements", limit: int = 10):
+    """List files stored in a Firebase collection"""
+    return await call_mcp_tool(request, "list_firebase_files", project_id=project_id, collection=collection, limit=limit)
+
+class BatchItem(BaseModel):
+    tool: str
+    arguments: dict = {}
+
+async def run_batch_item(item: BatchItem, timeout: float) -> dict:
+    if item.tool not in API_TOOLS:
+        return {"tool": item.tool, "error": f"Unknown tool: {item.tool}"}
+    try:
+        arguments = {**item.arguments, **ARGUMENT_OVERRIDES.get(item.tool, {})}
+        result, _ = await run_tool(item.tool, arguments, timeout)
+        return {"tool": item.tool, "result": result}
+    except Exception as e:
+        return {"tool": item.tool, "error": str(e) or type(e).__name__}
+
+async def stream_batch(items: List[BatchItem], deadline: float):
+    """
+    Yield one NDJSON line per batch item as soon as its call completes.
+
+    Lines arrive in completion order and carry the item's "index". Items
+    still running when the deadline passes are reported as errors. If the
+    client disconnects, Starlette cancels this generator and the pending
+    calls are cancelled with it.
+    """
+    async def indexed(index: int, item: BatchItem):
+        return index, await run_batch_item(item, deadline)
+
+    tasks = [asyncio.ensure_future(indexed(i, item)) for i, item in enumerate(items)]
+    pending = set(range(len(items)))
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=deadline):
+            try:
+                index, line = await next_done
+            except asyncio.TimeoutError:
+                break
+            pending.discard(index)
+            yield dumps({"index": index, **line}) + b"\n"
+        for index in sorted(pending):
+            line = {"index": index, "tool": items[index].tool, "error": f"Deadline of {deadline}s exceeded"}
+            yield dumps(line) + b"\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@app.post("/batch")
+async def batch(request: Request, items: List[BatchItem], stream: bool = False):
+    """
+    Run many tool calls in one round trip.
+
+    Calls run concurrently and are pipelined over the pooled MCP sessions;
+    results come back in request order, each with either "result" or "error".
+    With `?stream=true` or `Accept: application/x-ndjson` the results are
+    streamed instead, one line per call as soon as it completes.
+    """
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch is limited to {BATCH_MAX_ITEMS} calls")
+    deadline = request_deadline(request)
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(stream_batch(items, deadline), media_type="application/x-ndjson")
+    calls = asyncio.gather(*[run_batch_item(item, deadline) for item in items])
+    try:
+        results = await until_disconnect(request, calls, deadline)
+    except ClientDisconnected:
+        return Response(status_code=499)
+    except MCPTimeoutError as e:
+        return JSONResponse(status_code=504, content={"error": str(e)})
+    return encoded_response(request, EncodedResult(dumps({"results": results})))
+
+def ws_error(tag: bytes, message: str, retry_after: int = None) -> bytes:
+    frame = {"error": message}
+    if retry_after is not None:
+        frame["retry_after"] = retry_after
+    return b'{"id":' + tag + b"," + dumps(frame)[1:]
+
+async def ws_call(tag: bytes, message: dict) -> bytes:
+    """
+    Run one /ws tool call and return its reply frame.
+
+    The call goes through the admission limit of the tool's HTTP endpoint,
+    so a WebSocket client is shed under the same load as GET requests.
+    Cached results are spliced into the frame without re-serializing them.
+    """
+    tool = message.get("tool")
+    arguments = message.get("arguments", {})
+    if tool not in API_TOOLS:
+        return ws_error(tag, f"Unknown tool: {tool}")
+    if not isinstance(arguments, dict):
+        return ws_error(tag, "arguments must be an object")
+    deadline = parse_deadline(message.get("timeout"))
+    limiter = admission.get(f"/{tool}")
+    try:
+        async with limiter.slot() if limiter is not None else nullcontext():
+            call = run_tool(tool, {**arguments, **ARGUMENT_OVERRIDES.get(tool, {})}, deadline)
+            result, encoded = await asyncio.wait_for(call, deadline)
+    except asyncio.TimeoutError:
+        return ws_error(tag, f"Deadline of {deadline}s exceeded")
+    except (BulkheadFullError, PoolExhaustedError) as e:
+        return ws_error(tag, str(e), retry_after=1)
+    except Exception as e:
+        return ws_error(tag, str(e) or type(e).__name__)
+    body = encoded.body if encoded is not None else dumps(result)
+    return b'{"id":' + tag + b',"result":' + body + b"}"
+
+@app.websocket("/ws")
+async def websocket_calls(websocket: WebSocket):
+    """
+    Multiplexed tool calls over one connection.
+
+    Each message is {"id": ..., "tool": ..., "arguments": {...}}, with an
+    optional "timeout" in seconds. Calls run concurrently and each reply is
+    sent as soon as its call completes, so replies arrive out of order; they
+    carry the message's "id" and either "result" or "error". {"cancel": id}
+    cancels a running call. Calls still running when the client disconnects
+    are cancelled.
+    """
+    await websocket.accept()
+    calls = {}  # encoded id -> running task
+    send_lock = asyncio.Lock()
+
+    async def send(frame: bytes):
+        async with send_lock:
+            await websocket.send_text(frame.decode())
+
+    async def run(tag: bytes, message: dict):
+        try:
+            await send(await ws_call(tag, message))
+        except Exception:
+            pass  # the client went away; the receive loop cancels the rest
+        finally:
+            if calls.get(tag) is asyncio.current_task():
+                del calls[tag]
+
+    WS_CONNECTIONS.inc()
+    try:
+        while True:
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                break
+            try:
+                message = loads(received.get("text") or received.get("bytes") or b"")
+            except ValueError:
+                message = None
+            if not isinstance(message, dict) or ("id" not in message and "cancel" not in message):
+                await send(ws_error(b"null", 'Expected a JSON object with an "id"'))
+            elif "cancel" in message:
+                tag = dumps(message["cancel"])
+                task = calls.pop(tag, None)
+                if task is not None:
+                    task.cancel()
+                    await send(ws_error(tag, "Cancelled"))
+            else:
+                tag = dumps(message["id"])
+                if tag in calls:
+                    await send(ws_error(tag, "A call with this id is already running"))
+                elif len(calls) >= WS_MAX_IN_FLIGHT:
+                    await send(ws_error(tag, f"Too many calls in flight (limit {WS_MAX_IN_FLIGHT})", retry_after=1))
+                else:
+                    calls[tag] = asyncio.ensure_future(run(tag, message))
+    finally:
+        WS_CONNECTIONS.dec()
+        for task in calls.values():
+            task.cancel()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of tool, pool and cache telemetry"""
+    return Response(content=registry.render(), media_type=Registry.CONTENT_TYPE)
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Per-endpoint admission limits, occupancy and rejections"""
+    return {path: limiter.stats() for path, limiter in admission.items()}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Result cache hit, miss and eviction counters"""
+    return await cache_io(cache.stats)
+
 @app.get("/")
-def root():
-    return {"message": "Prompt Context Server API", "endpoints": ["/collect_requirements", "/provide_base_template", "/provide_advanced_template", "/analyze_process_automation"]}
+async def root():
+    return {"message": "Prompt Context Server API", "endpoints": ["/collect_requirements", "/provide_base_template", "/provide_advanced_template", "/analyze_process_automation", "/download_firebase_txt_file", "/list_firebase_files", "/batch", "/ws"]}
 
 if __name__ == "__main__":
     import uvicorn
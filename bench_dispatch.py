@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: stdio session pool vs in-process dispatch for every api_server endpoint
+Usage: python bench_dispatch.py [iterations]
+"""
+
+import asyncio
+import statistics
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mcp_pool import MCPSessionPool
+from mcp_dispatch import InProcessDispatcher
+
+ENDPOINT_CALLS = {
+    "/collect_requirements": ("collect_requirements", {
+        "project_name": "TaskManager",
+        "project_type": "webapp",
+        "complexity": "medium",
+        "tech_stack": "React + Node.js",
+        "deadline_weeks": 4
+    }),
+    "/provide_base_template": ("provide_base_template", {"use_case": "api"}),
+    "/provide_advanced_template": ("provide_advanced_template", {
+        "base_template": "Build a REST API for inventory management",
+        "style": "performance"
+    }),
+    "/analyze_process_automation": ("analyze_process_automation", {
+        "process_name": "Invoice approval",
+        "primary_goal": "reduce_errors",
+        "trigger_type": "email",
+        "trigger_details": "Invoice PDF received in finance inbox",
+        "success_outcome": "Invoice approved and paid on time"
+    })
+}
+
+async def measure(backend, tool_name: str, arguments: dict, iterations: int) -> list:
+    await backend.call_tool(tool_name, arguments)  # warm up
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await backend.call_tool(tool_name, arguments)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def run_benchmark(iterations: int = 500):
+    in_process = InProcessDispatcher()
+    pool = MCPSessionPool(size=1)
+    await pool.start()
+    try:
+        print(f"{'endpoint':<30} {'mode':<10} {'p50 us':>10} {'p95 us':>10} {'mean us':>10}")
+        print("-" * 74)
+        for endpoint, (tool_name, arguments) in ENDPOINT_CALLS.items():
+            p50s = {}
+            for mode, backend in (("stdio", pool), ("inprocess", in_process)):
+                samples = await measure(backend, tool_name, arguments, iterations)
+                p50s[mode] = statistics.median(samples)
+                print(f"{endpoint:<30} {mode:<10} {p50s[mode]:>10.1f} "
+                      f"{percentile(samples, 95):>10.1f} {statistics.mean(samples):>10.1f}")
+            print(f"{'':<30} {'speedup':<10} {p50s['stdio'] / p50s['inprocess']:>9.1f}x")
+    finally:
+        await pool.close()
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
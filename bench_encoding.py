@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes on the wire and CPU per response for each api_server encoding strategy
+Usage: python bench_encoding.py [iterations]
+"""
+
+import asyncio
+import gzip
+import json
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_dispatch import ENDPOINT_CALLS
+from mcp_dispatch import InProcessDispatcher
+from response_encoding import COMPRESSORS, dumps
+from result_cache import encode_result
+
+def stdlib_json(result) -> bytes:
+    """What starlette's JSONResponse does for every response."""
+    return json.dumps(result, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+def strategies(result) -> dict:
+    encoded = encode_result(result)
+    for coding in COMPRESSORS:
+        encoded.encode(coding)  # stored once, like the result cache does
+    modes = {
+        "stdlib json": lambda: stdlib_json(result),
+        "stdlib+gzip": lambda: gzip.compress(stdlib_json(result)),  # per-response GZipMiddleware
+        "orjson": lambda: dumps(result),
+        "cached": lambda: encoded.encode(None)[1],
+    }
+    for coding in COMPRESSORS:
+        modes[f"cached {coding}"] = lambda coding=coding: encoded.encode(coding)[1]
+    return modes
+
+def cpu_per_call(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+async def run_benchmark(iterations: int = 2000):
+    dispatcher = InProcessDispatcher()
+    print(f"{'endpoint':<30} {'mode':<14} {'bytes':>8} {'cpu us':>10}")
+    print("-" * 65)
+    for endpoint, (tool_name, arguments) in ENDPOINT_CALLS.items():
+        result = (await dispatcher.call_tool(tool_name, arguments))["result"]
+        for mode, fn in strategies(result).items():
+            print(f"{endpoint:<30} {mode:<14} {len(fn()):>8} {cpu_per_call(fn, iterations):>10.2f}")
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
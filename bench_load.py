@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the api_server endpoints, checked against stored baselines
+Usage: python bench_load.py [--concurrency 16] [--rate 0] [--duration 10] [--cached] [--update-baselines]
+
+Starts a fresh api_server.py locally for each endpoint (honouring the MCP_*
+environment) and drives it. With --rate 0 (the default) `concurrency` clients
+send back to back; otherwise requests are sent open-loop at `rate` per
+second with at most `concurrency` in flight. Requests use distinct
+arguments so they exercise the tools, not the result cache, unless
+--cached is given. Throughput, p50/p95/p99 latency, errors and the peak
+RSS of the server and its MCP workers are compared with
+bench_baselines.json; the run exits with status 1 on a regression.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from replay_traffic import free_port, percentile, start_server
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baselines.json")
+
+# Endpoint -> builder of (method, query params, JSON body) from a distinguishing tag
+ENDPOINTS = {
+    "/collect_requirements": lambda tag: ("GET", {
+        "project_name": f"Load test {tag}",
+        "project_type": "webapp",
+        "complexity": "medium",
+        "tech_stack": "React + Node.js"
+    }, None),
+    "/provide_base_template": lambda tag: ("GET", {"use_case": f"api {tag}"}, None),
+    "/provide_advanced_template": lambda tag: ("GET", {
+        "base_template": f"Build a REST API for inventory {tag}",
+        "style": "performance"
+    }, None),
+    "/analyze_process_automation": lambda tag: ("GET", {
+        "process_name": f"Invoice approval {tag}",
+        "primary_goal": "reduce_errors",
+        "trigger_type": "email",
+        "trigger_details": "Invoice PDF received in finance inbox",
+        "success_outcome": "Invoice approved and paid on time"
+    }, None),
+    "/batch": lambda tag: ("POST", None, [
+        {"tool": "provide_base_template", "arguments": {"use_case": f"ml {tag}"}},
+        {"tool": "provide_advanced_template", "arguments": {"base_template": f"Batch {tag}"}},
+        {"tool": "collect_requirements", "arguments": {
+            "project_name": f"Batch {tag}", "project_type": "api", "complexity": "low"
+        }}
+    ])
+}
+
+# Metric -> direction in which it regresses
+CHECKS = {"throughput_rps": "lower", "p95_ms": "higher", "rss_mb": "higher"}
+
+def tree_rss_mb(pid: int):
+    """Resident memory of a process and all its descendants in MB, or None without /proc."""
+    if not os.path.exists(f"/proc/{pid}"):
+        return None
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue  # exited while we were looking
+    return total_kb / 1024
+
+async def drive(client: httpx.AsyncClient, path: str, concurrency: int, rate: float, duration: float,
+                distinct: bool = True) -> tuple:
+    """Load one endpoint for `duration` seconds and return ([(seconds, status)], elapsed)."""
+    build = ENDPOINTS[path]
+    tags = itertools.count()
+    samples = []
+    started = time.perf_counter()
+    stop = started + duration
+
+    async def send(due: float):
+        method, params, body = build(next(tags) if distinct else 0)
+        try:
+            status = (await client.request(method, path, params=params, json=body)).status_code
+        except httpx.HTTPError:
+            status = 0
+        samples.append((time.perf_counter() - due, status))
+
+    if rate > 0:
+        # Open loop: latency counts from when a request was due, so queueing
+        # behind the concurrency cap or a slow server isn't hidden
+        slots = asyncio.Semaphore(concurrency)
+
+        async def limited(due: float):
+            async with slots:
+                await send(due)
+
+        tasks = []
+        for i in itertools.count():
+            due = started + i / rate
+            if due >= stop:
+                break
+            if due > time.perf_counter():
+                await asyncio.sleep(due - time.perf_counter())
+            tasks.append(asyncio.ensure_future(limited(due)))
+        await asyncio.gather(*tasks)
+    else:
+        async def worker():
+            while time.perf_counter() < stop:
+                await send(time.perf_counter())
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return samples, time.perf_counter() - started
+
+async def measure(url: str, server_pid: int, path: str, args) -> dict:
+    """Warm up, then load `path` while sampling the server's peak RSS."""
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        await drive(client, path, args.concurrency, 0, args.warmup, not args.cached)
+        peak = [tree_rss_mb(server_pid)]
+
+        async def sample_rss():
+            while True:
+                await asyncio.sleep(0.1)
+                peak.append(tree_rss_mb(server_pid))
+
+        sampler = asyncio.ensure_future(sample_rss())
+        try:
+            samples, elapsed = await drive(client, path, args.concurrency, args.rate, args.duration, not args.cached)
+        finally:
+            sampler.cancel()
+    latencies = [seconds * 1000 for seconds, _ in samples]
+    rss = [mb for mb in peak if mb is not None]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, status in samples if status == 0 or status >= 400),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "rss_mb": round(max(rss), 1) if rss else None
+    }
+
+def scenario_name(args) -> str:
+    """Baselines are only comparable for the same dispatch mode and load shape."""
+    mode = os.environ.get("MCP_DISPATCH_MODE", "stdio").lower()
+    load = f"rate{args.rate:g}" if args.rate > 0 else "closed"
+    return f"{mode}-c{args.concurrency}-{load}-{'cached' if args.cached else 'distinct'}"
+
+def machine() -> dict:
+    return {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()}
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    """Describe every metric that is worse than its baseline by more than `tolerance`."""
+    found = []
+    for path, row in results.items():
+        expected = baseline.get(path)
+        if expected is None:
+            continue
+        if row["errors"] > expected.get("errors", 0):
+            found.append(f"{path}: {row['errors']} errors (baseline {expected.get('errors', 0)})")
+        for metric, direction in CHECKS.items():
+            current, reference = row.get(metric), expected.get(metric)
+            if current is None or not reference:
+                continue
+            if direction == "lower" and current < reference * (1 - tolerance):
+                found.append(f"{path}: {metric} {current} < baseline {reference}")
+            elif direction == "higher" and current > reference * (1 + tolerance):
+                found.append(f"{path}: {metric} {current} > baseline {reference}")
+    return found
+
+def run_benchmark(args) -> int:
+    results = {}
+    for path in args.endpoints:
+        # A fresh server per endpoint: no endpoint inherits the cache, pool
+        # recycling or memory growth left behind by the previous one
+        port = free_port()
+        server = start_server(port)
+        try:
+            results[path] = asyncio.run(measure(f"http://127.0.0.1:{port}", server.pid, path, args))
+        finally:
+            server.terminate()
+            server.wait()
+
+    scenario = scenario_name(args)
+    print(f"Scenario {scenario}, {args.duration:g}s per endpoint\n")
+    print(f"{'endpoint':<30} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} "
+          f"{'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+    print("-" * 97)
+    for path, row in results.items():
+        rss = f"{row['rss_mb']:.1f}" if row["rss_mb"] is not None else "-"
+        print(f"{path:<30} {row['requests']:>9} {row['errors']:>7} {row['throughput_rps']:>9.1f} "
+              f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {rss:>8}")
+
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            baselines = json.load(f)
+    if args.update_baselines:
+        baselines[scenario] = {"machine": machine(), "endpoints": results}
+        with open(args.baselines, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline for {scenario} written to {args.baselines}")
+        return 0
+
+    stored = baselines.get(scenario)
+    if stored is None:
+        print(f"\nNo baseline for {scenario}; record one with --update-baselines")
+        return 0
+    if stored.get("machine") != machine():
+        print(f"\nWarning: baseline was recorded on {stored.get('machine')}")
+    found = regressions(results, stored["endpoints"], args.tolerance)
+    if found:
+        print(f"\nRegressions beyond {args.tolerance:.0%} of baseline:")
+        for line in found:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions beyond {args.tolerance:.0%} of baseline")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load benchmark for api_server endpoints")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients (closed loop) or in-flight cap (open loop)")
+    parser.add_argument("--rate", type=float, default=0, help="Requests per second per endpoint; 0 for closed loop")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per endpoint")
+    parser.add_argument("--warmup", type=float, default=1, help="Seconds of unmeasured load per endpoint first")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--cached", action="store_true", help="Repeat identical arguments to measure cache hits")
+    parser.add_argument("--baselines", default=BASELINES, help="Baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--update-baselines", action="store_true", help="Store this run as the baseline")
+    sys.exit(run_benchmark(parser.parse_args()))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: MCP worker startup latency, cold spawn vs fork from the zygote
+Usage: python bench_startup.py [iterations]
+"""
+
+import asyncio
+import statistics
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mcp_client import MCPClient
+from mcp_zygote import ZygoteLauncher
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def measure(new_client, iterations: int) -> dict:
+    """Time from launch until the worker has answered its first tool call."""
+    phases = {"spawn": [], "initialize": [], "first_call": [], "total": []}
+    for _ in range(iterations):
+        start = time.perf_counter()
+        client = await new_client().start()
+        ready = time.perf_counter()
+        await client.call_tool("provide_base_template", {"use_case": "api"})
+        done = time.perf_counter()
+        await client.close()
+        phases["spawn"].append(client.spawn_seconds * 1000)
+        phases["initialize"].append(client.initialize_seconds * 1000)
+        phases["first_call"].append((done - ready) * 1000)
+        phases["total"].append((done - start) * 1000)
+    return phases
+
+async def run_benchmark(iterations: int = 20):
+    start = time.perf_counter()
+    zygote = await ZygoteLauncher().start()
+    print(f"Zygote boot (paid once): {(time.perf_counter() - start) * 1000:.1f} ms\n")
+    try:
+        results = {
+            "cold": await measure(MCPClient, iterations),
+            "fork": await measure(zygote.client, iterations)
+        }
+    finally:
+        await zygote.close()
+
+    print(f"{'mode':<6} {'phase':<12} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}")
+    print("-" * 52)
+    for mode, phases in results.items():
+        for phase, samples in phases.items():
+            print(f"{mode:<6} {phase:<12} {statistics.median(samples):>10.1f} "
+                  f"{percentile(samples, 95):>10.1f} {statistics.mean(samples):>10.1f}")
+    speedup = statistics.median(results["cold"]["total"]) / statistics.median(results["fork"]["total"])
+    print(f"\nTime to first tool call: fork is {speedup:.1f}x faster than cold spawn")
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
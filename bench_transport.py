@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: stdio session pool vs sever.py served over streamable HTTP
+Usage: python bench_transport.py [requests] [concurrency] [workers]
+
+Both sides get the same number of server processes: `workers` pooled stdio
+sessions, or `MCP_TRANSPORT=http MCP_WORKERS=N python sever.py`. Each mode
+is run with one client calling sequentially and with `concurrency`
+concurrent clients.
+"""
+
+import asyncio
+import itertools
+import statistics
+import subprocess
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from mcp_pool import MCPSessionPool
+from replay_traffic import free_port, percentile
+
+TOOL_CALL = ("collect_requirements", {
+    "project_name": "TaskManager",
+    "project_type": "webapp",
+    "complexity": "medium",
+    "tech_stack": "React + Node.js"
+})
+
+class StreamableHTTPCaller:
+    """Tool calls as single stateless JSON-RPC POSTs to sever.py's /mcp endpoint."""
+
+    def __init__(self, url: str):
+        self.client = httpx.AsyncClient(
+            base_url=url, timeout=30,
+            headers={"Accept": "application/json, text/event-stream"},
+            limits=httpx.Limits(max_connections=256, max_keepalive_connections=256)
+        )
+        self.ids = itertools.count(1)
+
+    async def call_tool(self, tool_name: str, arguments: dict) -> dict:
+        response = await self.client.post("/mcp", json={
+            "jsonrpc": "2.0", "id": next(self.ids), "method": "tools/call",
+            "params": {"name": tool_name, "arguments": arguments}
+        })
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self):
+        await self.client.aclose()
+
+def start_http_server(port: int, workers: int) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "sever.py"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "MCP_TRANSPORT": "http", "MCP_PORT": str(port), "MCP_WORKERS": str(workers)}
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            httpx.post(f"http://127.0.0.1:{port}/mcp", timeout=1, json={"jsonrpc": "2.0", "id": 0, "method": "ping"},
+                       headers={"Accept": "application/json, text/event-stream"}).raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("sever.py HTTP transport did not start within 60s")
+
+async def load(caller, requests: int, concurrency: int) -> tuple:
+    """Run `requests` calls from `concurrency` clients; return (latencies in ms, elapsed seconds)."""
+    tool_name, arguments = TOOL_CALL
+    remaining = iter(range(requests))
+    latencies = []
+
+    async def client():
+        for _ in remaining:
+            start = time.perf_counter()
+            await caller.call_tool(tool_name, arguments)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    for _ in range(min(50, requests)):  # warm up every worker
+        await caller.call_tool(tool_name, arguments)
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return latencies, time.perf_counter() - started
+
+async def run_benchmark(requests: int = 2000, concurrency: int = 16, workers: int = 2):
+    port = free_port()
+    server = start_http_server(port, workers)
+    pool = MCPSessionPool(size=workers, max_calls=0)
+    await pool.start()
+    modes = {"stdio": pool, "http": StreamableHTTPCaller(f"http://127.0.0.1:{port}")}
+    try:
+        print(f"{workers} server processes per mode, {requests} calls to {TOOL_CALL[0]}\n")
+        print(f"{'mode':<8} {'clients':>8} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+        print("-" * 61)
+        for clients in (1, concurrency):
+            for mode, caller in modes.items():
+                latencies, elapsed = await load(caller, requests, clients)
+                print(f"{mode:<8} {clients:>8} {requests / elapsed:>10.1f} {statistics.median(latencies):>10.2f} "
+                      f"{percentile(latencies, 95):>10.2f} {percentile(latencies, 99):>10.2f}")
+    finally:
+        await modes["http"].close()
+        await pool.close()
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    asyncio.run(run_benchmark(*args))
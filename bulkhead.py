@@ -0,0 +1,161 @@
+"""
+Bulkheads: isolated concurrency compartments for classes of tool calls.
+
+Each bulkhead lets at most `max_concurrent` calls run, queues up to
+`max_queue` more for at most `queue_timeout` seconds and rejects the rest,
+so a slow class of calls (e.g. Firebase downloads) can only ever tie up its
+own slots, never the ones reserved for the fast tools.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class BulkheadFullError(Exception):
+    """Raised when a bulkhead's queue is full or a call waited past queue_timeout."""
+
+
+class Bulkhead:
+    """
+    Concurrency limit with a bounded, deadline-limited FIFO queue.
+
+    Args:
+        name: Label used in errors and metrics
+        max_concurrent: Calls allowed to run at once
+        max_queue: Calls allowed to wait for a slot
+        queue_timeout: Seconds a call may wait for a slot
+        timeout: Upper bound on the runtime of each call in this bulkhead
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int = 16,
+        max_queue: int = 64,
+        queue_timeout: float = 5.0,
+        timeout: float = 30.0
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.limit = max_concurrent
+        self.active = 0
+        self._waiters = deque()
+        self.rejected = {"queue_full": 0, "queue_timeout": 0}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise BulkheadFullError(f"Too many calls queued for '{self.name}' (limit {self.max_queue})")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected["queue_timeout"] += 1
+            raise BulkheadFullError(f"No capacity for '{self.name}' after waiting {self.queue_timeout}s")
+        except asyncio.CancelledError:
+            # The slot may have been handed over just as we were cancelled
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self):
+        self.active -= 1
+        self._wake()
+
+    def _wake(self):
+        # Hand free slots straight to the oldest waiters
+        while self._waiters and self.active < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, timings: dict = None):
+        """
+        Hold one slot for the enclosed block.
+
+        If `timings` is given it receives "bulkhead_wait", the seconds spent queued.
+        """
+        started = time.perf_counter()
+        await self.acquire()
+        if timings is not None:
+            timings["bulkhead_wait"] = time.perf_counter() - started
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "limit": round(self.limit, 2),
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "timeout_seconds": self.timeout,
+            "active": self.active,
+            "queued": self.queued,
+            "rejected": dict(self.rejected)
+        }
+
+
+class AdaptiveBulkhead(Bulkhead):
+    """
+    Bulkhead whose concurrency limit follows observed latency (AIMD).
+
+    A call that finishes within `latency_target` raises the limit by
+    1/limit, so roughly +1 per limit's worth of fast calls. A slower call,
+    or one that raises (timeouts included), multiplies it by `backoff`. Only calls started after the previous
+    decrease can trigger another one, so a single burst of slow calls cuts
+    the limit once, not once per call. The limit stays between
+    `min_concurrent` and `max_concurrent`.
+
+    Args:
+        latency_target: Seconds a call may take before it counts as overload
+        min_concurrent: Lower bound for the limit
+        backoff: Multiplicative decrease applied to the limit
+        **kwargs: Bulkhead arguments; the limit starts at max_concurrent
+    """
+
+    def __init__(self, name: str, latency_target: float = 0.5, min_concurrent: int = 1, backoff: float = 0.7, **kwargs):
+        super().__init__(name, **kwargs)
+        self.latency_target = latency_target
+        self.min_concurrent = min_concurrent
+        self.backoff = backoff
+        self._last_decrease = 0.0
+
+    def observe(self, started: float, seconds: float):
+        if seconds <= self.latency_target:
+            self.limit = min(self.max_concurrent, self.limit + 1 / self.limit)
+            self._wake()
+        elif started >= self._last_decrease:
+            self.limit = max(self.min_concurrent, self.limit * self.backoff)
+            self._last_decrease = time.monotonic()
+
+    @asynccontextmanager
+    async def slot(self, timings: dict = None):
+        async with super().slot(timings):
+            started = time.monotonic()
+            try:
+                yield
+            except BaseException:
+                # Failed, timed out or cancelled: overload, however soon it ended
+                self.observe(started, float("inf"))
+                raise
+            self.observe(started, time.monotonic() - started)
@@ -0,0 +1,251 @@
+"""
+Opt-in wall-clock profiling of selected tool calls in sever.py.
+
+CallProfilerMiddleware picks calls to profile: every Nth call, every call
+that turns out to take longer than a threshold, and any call whose request
+carries `_meta: {"profile": true}`. While a picked call runs, a background
+thread samples its stack every `interval` seconds; when it finishes (and,
+for the threshold, only if it was slow) the samples are written as a
+collapsed-stack file ready for flamegraph.pl, speedscope or inferno:
+
+    provide_base_template;provide_base_template (sever.py:120);dumps (__init__.py:183) 4870
+
+Each line is one stack, rooted at the tool name, weighted by the
+microseconds it was seen on, so a file adds up to the call's wall time.
+Sync tools are sampled on their worker thread; async tools on the event
+loop while they run and along their await chain while they wait.
+
+Nothing is installed unless profiling is configured, so with it off the
+cost is zero. When on, calls that aren't picked cost a counter increment.
+"""
+
+import inspect
+import functools
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+
+from fastmcp.server.middleware import Middleware
+
+# The ProfiledCall being run in this context, if it was picked
+_profiled_call = ContextVar("profiled_call", default=None)
+
+
+def frame_label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfiledCall:
+    """Stack samples of one tool call."""
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.started = self.last_sample = time.perf_counter()
+        self.thread = None  # thread running the tool body, once it started
+        self.code = None  # code object of the tool function
+        self.coroutine = None  # the tool's coroutine, for async tools
+        self.stacks = {}  # collapsed stack -> microseconds
+        self._last_stack = tool
+
+    def _thread_stack(self, leaf) -> list:
+        """Frames from the tool function down to `leaf`, or [] if it isn't on the stack."""
+        frames = []
+        top = self.coroutine.cr_frame if self.coroutine is not None else None
+        frame = leaf
+        while frame is not None:
+            frames.append(frame)
+            if frame is top or (top is None and frame.f_code is self.code):
+                return frames[::-1]
+            frame = frame.f_back
+        return []
+
+    def _await_stack(self) -> list:
+        """Frames of a suspended coroutine and whatever it is awaiting."""
+        frames = []
+        awaited = self.coroutine
+        while awaited is not None:
+            frame = getattr(awaited, "cr_frame", None) or getattr(awaited, "gi_frame", None)
+            if frame is None:
+                break  # a Future or a finished coroutine
+            frames.append(frame)
+            awaited = getattr(awaited, "cr_await", None) or getattr(awaited, "gi_yieldfrom", None)
+        return frames
+
+    def sample(self, thread_frames: dict, now: float):
+        frames = []
+        if self.thread is not None:
+            leaf = thread_frames.get(self.thread)
+            frames = self._thread_stack(leaf) if leaf is not None else []
+            if not frames and self.coroutine is not None:
+                frames = self._await_stack()
+        stack = ";".join([self.tool] + [frame_label(frame.f_code) for frame in frames])
+        self._add(stack, now)
+
+    def _add(self, stack: str, now: float):
+        # Time since the previous sample goes to the stack seen now
+        self.stacks[stack] = self.stacks.get(stack, 0) + (now - self.last_sample) * 1e6
+        self.last_sample = now
+        self._last_stack = stack
+
+    def finish(self) -> float:
+        """Close the profile and return the call's wall time in seconds."""
+        now = time.perf_counter()
+        self._add(self._last_stack, now)
+        return now - self.started
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {round(us)}\n" for stack, us in self.stacks.items() if round(us) > 0)
+
+
+def profiled(fn):
+    """Wrap a tool function so a picked call knows which thread and frames are the tool's."""
+    if getattr(fn, "_profiled", False):
+        return fn
+    code = inspect.unwrap(fn).__code__
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            call = _profiled_call.get()
+            if call is None:
+                return await fn(*args, **kwargs)
+            coroutine = fn(*args, **kwargs)
+            call.code, call.coroutine, call.thread = code, coroutine, threading.get_ident()
+            return await coroutine
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            call = _profiled_call.get()
+            if call is not None:
+                call.code, call.thread = code, threading.get_ident()
+            return fn(*args, **kwargs)
+    wrapper._profiled = True
+    return wrapper
+
+
+class CallProfiler:
+    """
+    Samples the stacks of picked tool calls and writes them as collapsed-stack files.
+
+    `every` profiles one call in N (0 disables), `slow_ms` keeps the profile
+    of any call slower than that many milliseconds (None disables; every
+    call is then sampled, which costs a few microseconds per sample).
+    Files go to `directory` as <tool>-<unix ms>-<pid>-<wall ms>ms.collapsed.
+    """
+
+    def __init__(self, directory: str, every: int = 0, slow_ms: float = None, interval: float = 0.005):
+        self.directory = directory
+        self.every = every
+        self.slow = slow_ms / 1000 if slow_ms is not None else None
+        self.interval = interval
+        self.calls = 0
+        self._reset()
+
+    def _reset(self):
+        # A forked worker has the lock state but not the sampler thread
+        self.pid = os.getpid()
+        self._active = []
+        self._lock = threading.Condition()
+        self._sampler = None
+
+    def pick(self, forced: bool = False):
+        """
+        Why the next call is profiled: "request", "sampled" or "slow" (kept
+        only if it turns out slow), or None if it isn't.
+        """
+        self.calls += 1
+        if forced:
+            return "request"
+        if self.every > 0 and self.calls % self.every == 0:
+            return "sampled"
+        return "slow" if self.slow is not None else None
+
+    def start(self, tool: str) -> ProfiledCall:
+        if self.pid != os.getpid():
+            self._reset()
+        call = ProfiledCall(tool)
+        with self._lock:
+            self._active.append(call)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name="call-profiler", daemon=True)
+                self._sampler.start()
+            self._lock.notify()
+        return call
+
+    def stop(self, call: ProfiledCall, reason: str):
+        """Stop sampling `call` and write its profile, unless it was only a candidate for being slow."""
+        with self._lock:
+            self._active.remove(call)
+        wall = call.finish()
+        if reason != "slow" or wall >= self.slow:
+            return self.write(call, wall)
+        return None
+
+    def write(self, call: ProfiledCall, wall: float) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{call.tool}-{int(time.time() * 1000)}-{os.getpid()}-{wall * 1000:.0f}ms.collapsed"
+        path = os.path.join(self.directory, name)
+        with open(f"{path}.tmp", "w") as f:
+            f.write(call.collapsed())
+        os.replace(f"{path}.tmp", path)
+        return path
+
+    def _sample(self):
+        while True:
+            with self._lock:
+                while not self._active:
+                    self._lock.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                # Under the lock so a call can't finish halfway through being sampled
+                thread_frames = sys._current_frames()
+                now = time.perf_counter()
+                for call in self._active:
+                    call.sample(thread_frames, now)
+                del thread_frames
+
+
+def request_meta(context) -> dict:
+    """The `_meta` object of the request behind a middleware context."""
+    meta = getattr(context.message, "meta", None)
+    if meta is None and context.fastmcp_context is not None:
+        request = context.fastmcp_context.request_context  # None before the MCP session exists
+        meta = getattr(request, "meta", None)
+    return meta if isinstance(meta, dict) else {}
+
+
+class CallProfilerMiddleware(Middleware):
+    """FastMCP middleware profiling the tool calls a CallProfiler picks."""
+
+    def __init__(self, profiler: CallProfiler):
+        self.profiler = profiler
+        self._wrapped = set()  # tools whose function reports its thread
+
+    async def _wrap(self, context, tool_name: str):
+        self._wrapped.add(tool_name)
+        server = context.fastmcp_context.fastmcp if context.fastmcp_context is not None else None
+        if server is None:
+            return
+        try:
+            tool = await server.get_tool(tool_name)
+        except Exception:
+            return  # unknown tool; the call itself reports the error
+        if tool is not None and callable(getattr(tool, "fn", None)):
+            tool.fn = profiled(tool.fn)
+
+    async def on_call_tool(self, context, call_next):
+        reason = self.profiler.pick(bool(request_meta(context).get("profile")))
+        if reason is None:
+            return await call_next(context)
+        tool_name = context.message.name
+        if tool_name not in self._wrapped:
+            await self._wrap(context, tool_name)
+        call = self.profiler.start(tool_name)
+        token = _profiled_call.set(call)
+        try:
+            return await call_next(context)
+        finally:
+            _profiled_call.reset(token)
+            self.profiler.stop(call, reason)
@@ -0,0 +1,288 @@
+"""
+Content-addressed local cache for files downloaded from Firebase.
+
+Entries are keyed on the download URL plus its query parameters and point
+at a blob named by the SHA-256 of its content, so plans downloaded under
+several keys are stored once. Each entry keeps the response's ETag,
+Last-Modified and Content-Disposition: download_firebase_txt_file sends them
+back as If-None-Match / If-Modified-Since and, on 304 Not Modified, copies
+the blob instead of transferring the body again. In offline mode the cached
+copy is served without asking the server at all, however old it is.
+
+The index is a SQLite file in WAL mode next to the blobs, shared by every
+process on the host like SQLiteResultCache. Triggers keep a row per blob
+with its size, the number of entries pointing at it and its most recent
+use, and the total size of the blobs in a counter row. Only when that total
+exceeds `max_bytes` are the least recently used blobs evicted, with every
+entry pointing at them. Blobs are verified against their hash whenever they
+are copied out.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+
+from firebase_http import DOWNLOAD_CHUNK_SIZE, StreamingDownload
+from result_cache import cache_key
+
+
+class CachedDownload(NamedTuple):
+    key: str
+    sha256: str
+    size: int
+    etag: str
+    last_modified: str
+    content_disposition: str
+
+
+class DownloadCache:
+    """
+    Downloaded files by URL and parameters, with the validators to revalidate them.
+
+    Args:
+        directory: Where the index and blobs live, created if missing
+        max_bytes: Upper bound on the total size of stored blobs (0 disables storing)
+        offline: Serve cached copies without revalidating them
+    """
+
+    # Blobs read per eviction query
+    EVICTION_BATCH = 64
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, offline: bool = False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._conn = None
+        self._pid = None
+        # The async tool uses the cache from several threads at once, and
+        # transactions on one connection must not interleave
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(url: str, params: dict = None) -> str:
+        return cache_key(url, params or {})
+
+    def _connection(self) -> sqlite3.Connection:
+        # A connection must not cross a fork, so each worker opens its own
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.join(self.directory, "objects"), exist_ok=True)
+            conn = sqlite3.connect(
+                os.path.join(self.directory, "index.sqlite3"), timeout=5.0, isolation_level=None,
+                check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # One transaction, so a worker never sees the counters without their triggers
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS downloads ("
+                    "key TEXT PRIMARY KEY, url TEXT NOT NULL, sha256 TEXT NOT NULL, size INTEGER NOT NULL, "
+                    "etag TEXT, last_modified TEXT, content_disposition TEXT, "
+                    "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS downloads_sha256 ON downloads (sha256)")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS blobs ("
+                    "sha256 TEXT PRIMARY KEY, size INTEGER NOT NULL, refs INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS blobs_accessed_at ON blobs (accessed_at)")
+                conn.execute(
+                    "INSERT OR IGNORE INTO blobs (sha256, size, refs, accessed_at) "
+                    "SELECT sha256, MAX(size), COUNT(*), MAX(accessed_at) FROM downloads GROUP BY sha256"
+                )
+                conn.execute("CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+                conn.execute(
+                    "INSERT OR IGNORE INTO totals (name, value) SELECT 'bytes', COALESCE(SUM(size), 0) FROM blobs"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS downloads_blob_insert AFTER INSERT ON downloads BEGIN "
+                    "INSERT OR IGNORE INTO blobs (sha256, size, refs, accessed_at) "
+                    "VALUES (NEW.sha256, NEW.size, 0, NEW.accessed_at); "
+                    "UPDATE blobs SET refs = refs + 1, accessed_at = MAX(accessed_at, NEW.accessed_at) "
+                    "WHERE sha256 = NEW.sha256; END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS downloads_blob_delete AFTER DELETE ON downloads BEGIN "
+                    "UPDATE blobs SET refs = refs - 1 WHERE sha256 = OLD.sha256; "
+                    "DELETE FROM blobs WHERE sha256 = OLD.sha256 AND refs <= 0; END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS downloads_blob_touch AFTER UPDATE OF accessed_at ON downloads BEGIN "
+                    "UPDATE blobs SET accessed_at = MAX(accessed_at, NEW.accessed_at) WHERE sha256 = NEW.sha256; END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS blobs_size_insert AFTER INSERT ON blobs BEGIN "
+                    "UPDATE totals SET value = value + NEW.size WHERE name = 'bytes'; END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS blobs_size_delete AFTER DELETE ON blobs BEGIN "
+                    "UPDATE totals SET value = value - OLD.size WHERE name = 'bytes'; END"
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                conn.close()
+                raise
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _total_bytes(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM totals WHERE name = 'bytes'").fetchone()[0]
+
+    def _orphans(self, conn: sqlite3.Connection, sha256s) -> list:
+        """The blobs among `sha256s` that no entry points at any more."""
+        return sorted(
+            sha256 for sha256 in set(sha256s)
+            if conn.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)).fetchone() is None
+        )
+
+    def _unlink(self, sha256s):
+        for sha256 in sha256s:
+            try:
+                os.unlink(self.blob_path(sha256))
+            except FileNotFoundError:
+                pass
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.directory, "objects", sha256[:2], sha256)
+
+    def lookup(self, key: str):
+        """Return the CachedDownload stored under `key`, or None."""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT sha256, size, etag, last_modified, content_disposition FROM downloads WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or not os.path.exists(self.blob_path(row[0])):
+                if row is not None:
+                    conn.execute("DELETE FROM downloads WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            conn.execute("UPDATE downloads SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return CachedDownload(key, *row)
+
+    @staticmethod
+    def validators(entry: CachedDownload) -> dict:
+        """Conditional request headers that let the server answer 304 for `entry`."""
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def restore(self, entry: CachedDownload, path: str) -> StreamingDownload:
+        """
+        Copy the cached file to `path` atomically, checking its hash.
+
+        A missing or corrupt blob drops the entry and raises FileNotFoundError
+        or DownloadMismatch; the caller should download the file again
+        without validators (download_firebase_txt_file does so right away).
+        """
+        try:
+            with open(self.blob_path(entry.sha256), "rb") as source, \
+                    StreamingDownload(path, max_bytes=0, sha256=entry.sha256) as download:
+                while True:
+                    chunk = source.read(DOWNLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    download.write(chunk)
+        except Exception:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("DELETE FROM downloads WHERE key = ?", (entry.key,))
+                # A corrupt blob nothing else uses must go, or storing the file again would keep it
+                self._unlink(self._orphans(conn, [entry.sha256]))
+            raise
+        return download
+
+    def store(self, key: str, url: str, download: StreamingDownload, headers) -> bool:
+        """Keep a copy of a committed download with the response's validators; False if it doesn't fit."""
+        if self.max_bytes <= 0 or download.size > self.max_bytes:
+            return False
+        blob = self.blob_path(download.sha256)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            with open(download.path, "rb") as source, \
+                    StreamingDownload(blob, max_bytes=0, sha256=download.sha256) as copy:
+                while True:
+                    chunk = source.read(DOWNLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    copy.write(chunk)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Delete and insert rather than REPLACE: its implicit delete skips the blob triggers
+                replaced = [row[0] for row in conn.execute("SELECT sha256 FROM downloads WHERE key = ?", (key,))]
+                conn.execute("DELETE FROM downloads WHERE key = ?", (key,))
+                conn.execute(
+                    "INSERT INTO downloads "
+                    "(key, url, sha256, size, etag, last_modified, content_disposition, stored_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, url, download.sha256, download.size, headers.get("etag"), headers.get("last-modified"),
+                     headers.get("content-disposition"), now, now)
+                )
+                orphans = self._orphans(conn, replaced + self._evict(conn))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._unlink(orphans)
+        return True
+
+    def _evict(self, conn: sqlite3.Connection) -> list:
+        """Drop the least recently used blobs, and their entries, until the rest fit; return the blobs dropped."""
+        excess, dropped = self._total_bytes(conn) - self.max_bytes, []
+        while excess > 0:
+            victims = []
+            for sha256, size in conn.execute(
+                "SELECT sha256, size FROM blobs ORDER BY accessed_at LIMIT ?", (self.EVICTION_BATCH,)
+            ).fetchall():
+                victims.append(sha256)
+                excess -= size
+                if excess <= 0:
+                    break
+            if not victims:
+                break
+            for sha256 in victims:
+                self.evictions += conn.execute("DELETE FROM downloads WHERE sha256 = ?", (sha256,)).rowcount
+            dropped += victims
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            self._unlink([row[0] for row in conn.execute("SELECT sha256 FROM blobs").fetchall()])
+            conn.execute("DELETE FROM downloads")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._connection()
+            entries, size = conn.execute("SELECT COUNT(*) FROM downloads").fetchone()[0], self._total_bytes(conn)
+        lookups = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "offline": self.offline,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
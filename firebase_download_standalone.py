@@ -8,6 +8,8 @@ import os
 import json
 from datetime import datetime
 
+from firebase_http import firebase_session
+
 def download_firebase_txt_file(
     firebase_url: str,
     project_id: str = "mcptest-468919",
@@ -45,10 +47,10 @@ def download_firebase_txt_file(
             }
             
             # Make request to Firebase function
-            response = requests.get(firebase_url, params=params)
+            response = firebase_session().get(firebase_url, params=params)
         else:
             # Direct file download
-            response = requests.get(firebase_url)
+            response = firebase_session().get(firebase_url)
         
         response.raise_for_status()
         
@@ -239,7 +241,7 @@ def list_firebase_files(
         base_url = f"https://firestore.googleapis.com/v1/projects/{project_id}/databases/(default)/documents/{collection}"
         
         # Make request to list documents
-        response = requests.get(f"{base_url}?pageSize={limit}")
+        response = firebase_session().get(f"{base_url}?pageSize={limit}")
         
         if response.status_code == 200:
             data = response.json()
@@ -0,0 +1,288 @@
+"""
+Shared HTTP client for the Firebase calls in sever.py and firebase_download_standalone.py.
+
+A bare `requests.get()` opens a new TCP connection and TLS handshake for
+every call and waits forever on a stuck server. `firebase_session()` returns
+one process-wide Session instead:
+
+- keep-alive connection pools, sized per host: the Cloud Functions hosts
+  (us-central1-<project>.cloudfunctions.net) and firestore.googleapis.com
+  get MCP_FIREBASE_POOL_SIZE connections each (default 16), any other host 4
+- a default (connect, read) timeout of MCP_FIREBASE_CONNECT_TIMEOUT and
+  MCP_FIREBASE_READ_TIMEOUT seconds (default 5 and 30) unless a call passes
+  its own
+- gzip/deflate negotiated and decoded transparently
+
+A process forked after the session was created gets its own: sharing the
+parent's pooled sockets would interleave both processes' responses.
+
+`firebase_async_client()` is the same for the async tools: an httpx
+AsyncClient with the same pool sizes and timeouts, speaking HTTP/2 when the
+`h2` package is installed (`pip install httpx[http2]`) so concurrent calls
+to one host are multiplexed over a single connection. It is bound to the
+event loop that first uses it.
+
+`StreamingDownload` writes a response body to disk as it arrives, with a
+size limit of MCP_FIREBASE_MAX_DOWNLOAD_BYTES (default 64 MiB), or keeps it
+in memory, within MCP_FIREBASE_MAX_CONTENT_BYTES (default 1 MiB) when it
+is returned as content.
+`is_firebase_url()` tells whether a URL points at one of the Firebase hosts.
+"""
+
+import asyncio
+import codecs
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import h2  # noqa: F401 - lets httpx speak HTTP/2
+    HTTP2 = True
+except ImportError:  # pragma: no cover - optional dependency
+    HTTP2 = False
+
+POOL_SIZE = int(os.environ.get("MCP_FIREBASE_POOL_SIZE", "16"))
+DEFAULT_POOL_SIZE = 4
+CONNECT_TIMEOUT = float(os.environ.get("MCP_FIREBASE_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("MCP_FIREBASE_READ_TIMEOUT", "30"))
+# Downloads larger than this are aborted (0 for no limit)
+MAX_DOWNLOAD_BYTES = int(os.environ.get("MCP_FIREBASE_MAX_DOWNLOAD_BYTES", str(64 * 1024 * 1024)))
+# The same for downloads returned as content. Their text goes back in one
+# JSON-RPC line, twice (as text and as structured content) and escaped, so
+# the default keeps even the worst case under mcp_client's 16 MiB line limit.
+MAX_CONTENT_BYTES = int(os.environ.get("MCP_FIREBASE_MAX_CONTENT_BYTES", str(1024 * 1024)))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Read once, at import: os.umask() can only be read by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Host, or parent domain of the hosts, -> connections kept per host
+FIREBASE_HOSTS = {
+    "cloudfunctions.net": POOL_SIZE,
+    "firestore.googleapis.com": POOL_SIZE
+}
+
+
+class PooledSession(requests.Session):
+    """
+    A Session with per-host connection pool sizes and a default timeout.
+
+    `mount()` only matches URL prefixes, and every Firebase project has its
+    own Cloud Functions host, so adapters are picked by host suffix instead.
+    """
+
+    def __init__(self, pool_sizes: dict = None, default_pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: tuple = (CONNECT_TIMEOUT, READ_TIMEOUT)):
+        super().__init__()
+        self.timeout = timeout
+        self.headers["Accept-Encoding"] = "gzip, deflate"
+        # pool_connections is how many hosts keep a pool; pool_maxsize how many
+        # idle connections each of them keeps
+        self.host_adapters = {
+            suffix: HTTPAdapter(pool_connections=8, pool_maxsize=size)
+            for suffix, size in (FIREBASE_HOSTS if pool_sizes is None else pool_sizes).items()
+        }
+        self.default_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=default_pool_size)
+
+    def get_adapter(self, url: str):
+        scheme = urlsplit(url).scheme.lower()
+        if scheme not in ("http", "https"):
+            return super().get_adapter(url)
+        host = (urlsplit(url).hostname or "").lower()
+        for suffix, adapter in self.host_adapters.items():
+            if host == suffix or host.endswith(f".{suffix}"):
+                return adapter
+        return self.default_adapter
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().request(method, url, **kwargs)
+
+    def close(self):
+        for adapter in [*self.host_adapters.values(), self.default_adapter]:
+            adapter.close()
+        super().close()
+
+
+_session = None
+_session_pid = None
+_lock = threading.Lock()
+
+
+def firebase_session() -> PooledSession:
+    """The process-wide pooled session, created on first use."""
+    global _session, _session_pid
+    if _session_pid != os.getpid():
+        with _lock:
+            if _session_pid != os.getpid():
+                _session = PooledSession()
+                _session_pid = os.getpid()
+    return _session
+
+
+def create_async_client(pool_sizes: dict = None, default_pool_size: int = DEFAULT_POOL_SIZE,
+                        timeout: tuple = (CONNECT_TIMEOUT, READ_TIMEOUT), http2: bool = HTTP2) -> httpx.AsyncClient:
+    """An AsyncClient with a connection pool per Firebase host group and a default timeout."""
+    def transport(size: int) -> httpx.AsyncHTTPTransport:
+        return httpx.AsyncHTTPTransport(
+            http2=http2, limits=httpx.Limits(max_connections=size, max_keepalive_connections=size)
+        )
+
+    mounts = {}
+    for suffix, size in (FIREBASE_HOSTS if pool_sizes is None else pool_sizes).items():
+        mounts[f"all://{suffix}"] = transport(size)
+        mounts[f"all://*.{suffix}"] = mounts[f"all://{suffix}"]
+    connect, read = timeout
+    return httpx.AsyncClient(
+        transport=transport(default_pool_size),
+        mounts=mounts,
+        timeout=httpx.Timeout(read, connect=connect),
+        headers={"Accept-Encoding": "gzip, deflate"},
+        follow_redirects=True  # like requests
+    )
+
+
+# Event loop -> its client; sockets can't be shared between loops or processes
+_async_clients = weakref.WeakKeyDictionary()
+_async_clients_pid = None
+
+
+def firebase_async_client() -> httpx.AsyncClient:
+    """The pooled AsyncClient of the running event loop, created on first use."""
+    global _async_clients, _async_clients_pid
+    if _async_clients_pid != os.getpid():
+        _async_clients = weakref.WeakKeyDictionary()
+        _async_clients_pid = os.getpid()
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = create_async_client()
+    return client
+
+
+def is_firebase_url(url: str, hosts=FIREBASE_HOSTS) -> bool:
+    """True for an https URL on one of `hosts` or a subdomain of one."""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    return parts.scheme.lower() == "https" and any(host == suffix or host.endswith(f".{suffix}") for suffix in hosts)
+
+
+class DownloadTooLarge(Exception):
+    """A download exceeded its maximum size and was discarded."""
+
+
+class DownloadMismatch(Exception):
+    """A copy did not hash to the SHA-256 it was expected to have and was discarded."""
+
+
+def declared_charset(content_type: str):
+    """The charset parameter of a Content-Type header, if it names one."""
+    for parameter in (content_type or "").split(";")[1:]:
+        key, _, value = parameter.partition("=")
+        if key.strip().lower() == "charset":
+            return value.strip().strip("\"'") or None
+    return None
+
+
+class StreamingDownload:
+    """
+    Writes a response body to `path` chunk by chunk, never holding it in memory.
+
+    Chunks go to a temporary file next to `path` while their SHA-256 is
+    computed; `commit()` renames it over `path` atomically, so readers see
+    the old file or the complete new one. A body in a declared charset
+    other than UTF-8 is re-encoded to UTF-8 on the way. More than
+    `max_bytes` (0 for no limit) raises DownloadTooLarge and removes the
+    partial file. With `sha256` given, `commit()` raises DownloadMismatch
+    instead of renaming content that hashes differently. As a context
+    manager it commits on success and aborts on any error.
+
+    With `path` None the body is kept in memory instead, under the same
+    limit, and `commit()` leaves it in `content`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = MAX_DOWNLOAD_BYTES, charset: str = None, sha256: str = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.expected_sha256 = sha256
+        self.size = 0
+        self.sha256 = None  # hex digest, once committed
+        self.content = None  # the body, once committed, when kept in memory
+        self._hash = hashlib.sha256()
+        self._decoder = None
+        if charset:
+            try:
+                if codecs.lookup(charset).name != "utf-8":
+                    self._decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+            except LookupError:
+                pass  # unknown charset: keep the bytes as sent
+        if path is None:
+            self._temporary, self._file = None, io.BytesIO()
+            return
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self._temporary = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".part", dir=directory)
+        self._file = os.fdopen(fd, "wb")
+
+    def check_length(self, headers):
+        """Abort before reading anything if Content-Length already exceeds the limit."""
+        length = headers.get("content-length")
+        if self.max_bytes and length and length.isdigit() and not headers.get("content-encoding"):
+            if int(length) > self.max_bytes:
+                self.abort()
+                raise DownloadTooLarge(f"{length} bytes exceeds the {self.max_bytes} byte limit")
+
+    def write(self, chunk: bytes):
+        if self._decoder is not None:
+            chunk = self._decoder.decode(chunk).encode("utf-8")
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            self.abort()
+            raise DownloadTooLarge(f"more than {self.max_bytes} bytes")
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self):
+        if self._decoder is not None:
+            tail = self._decoder.decode(b"", final=True).encode("utf-8")
+            self._decoder = None
+            self.write(tail)
+        digest = self._hash.hexdigest()
+        if self.expected_sha256 is not None and digest != self.expected_sha256:
+            self.abort()
+            raise DownloadMismatch(f"{self.path}: expected sha256 {self.expected_sha256}, got {digest}")
+        if self._temporary is None:
+            self.content = self._file.getvalue()
+            self._file.close()
+            self.sha256 = digest
+            return
+        self._file.close()
+        os.chmod(self._temporary, 0o666 & ~_UMASK)  # mkstemp creates it private
+        os.replace(self._temporary, self.path)
+        self.sha256 = digest
+
+    def abort(self):
+        self._file.close()
+        if self._temporary is None:
+            return
+        try:
+            os.unlink(self._temporary)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
@@ -0,0 +1,76 @@
+"""
+Hedged-request policy for the MCP session pool.
+
+A call that is still unanswered once it has taken longer than most recent
+calls of the same tool (the p95 by default) has most likely hit a stalled
+worker. It is then worth sending a duplicate to another worker and taking
+whichever answer arrives first. The budget caps hedges at a fraction of all
+calls so that hedging can't amplify an overload.
+"""
+
+from collections import deque
+
+
+class HedgePolicy:
+    """
+    Per-tool rolling latency percentiles that decide when to hedge.
+
+    Args:
+        percentile: Latency percentile after which a call is hedged
+        window: Recent calls per tool the percentile is computed over
+        min_samples: Calls a tool needs before it is ever hedged
+        min_delay: Lower bound on the hedge delay in seconds
+        budget: Maximum hedges as a fraction of calls
+    """
+
+    REFRESH_EVERY = 10
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        window: int = 200,
+        min_samples: int = 20,
+        min_delay: float = 0.005,
+        budget: float = 0.1
+    ):
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.budget = budget
+        self._samples = {}     # tool -> deque of recent latencies
+        self._thresholds = {}  # tool -> cached percentile
+        self._stale = {}       # tool -> samples since the percentile was computed
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def observe(self, tool_name: str, seconds: float):
+        samples = self._samples.get(tool_name)
+        if samples is None:
+            samples = self._samples[tool_name] = deque(maxlen=self.window)
+        samples.append(seconds)
+        # A tail estimate doesn't need re-sorting the window on every call
+        stale = self._stale.get(tool_name, 0) + 1
+        self._stale[tool_name] = stale
+        if len(samples) >= self.min_samples and (tool_name not in self._thresholds or stale >= self.REFRESH_EVERY):
+            self._stale[tool_name] = 0
+            ordered = sorted(samples)
+            index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+            self._thresholds[tool_name] = ordered[index]
+
+    def delay(self, tool_name: str):
+        """Seconds to wait before hedging a new call, or None if it shouldn't be hedged."""
+        self.calls += 1
+        threshold = self._thresholds.get(tool_name)
+        if threshold is None or self.hedges >= self.budget * self.calls:
+            return None
+        return max(self.min_delay, threshold)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "thresholds_seconds": {tool: round(t, 6) for tool, t in sorted(self._thresholds.items())}
+        }
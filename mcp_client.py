@@ -0,0 +1,256 @@
+"""
+Pipelined asyncio JSON-RPC client for a stdio MCP server.
+
+One MCPClient keeps a single `sever.py` process open and lets many requests
+be in flight at once: every request gets the next id from a monotonic
+counter, is written without waiting for earlier replies, and its future is
+resolved by a reader task as soon as the matching response line arrives.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import re
+import sys
+import time
+
+SERVER_SCRIPT = os.environ.get(
+    "MCP_SERVER_SCRIPT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sever.py")
+)
+PROTOCOL_VERSION = "2024-11-05"
+CLIENT_INFO = {"name": "api-client", "version": "1.0.0"}
+
+# Every response is a single JSON line; allow more than asyncio's 64 KB default
+# so large Firebase downloads fit. A longer line fails only its own request.
+STREAM_LIMIT = 16 * 1024 * 1024
+# JSON-RPC responses start with their id: find it in an oversized line's head
+RESPONSE_ID = re.compile(rb'"id"\s*:\s*(-?\d+)')
+OVERSIZED_HEAD_BYTES = 256
+
+
+class MCPSessionError(Exception):
+    """Raised when an MCP session cannot be started or stops responding."""
+
+
+class MCPTimeoutError(MCPSessionError):
+    """Raised when a request gets no response before its timeout."""
+
+
+class MCPClient:
+    """
+    Multiplexed JSON-RPC connection to one stdio MCP server process.
+
+    Args:
+        command: Command used to start the MCP server
+    """
+
+    def __init__(self, command: list = None):
+        self.command = command or [sys.executable, SERVER_SCRIPT]
+        self.calls = 0
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.broken = False
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._process = None
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        # Startup phases, in seconds, for telemetry
+        self.spawn_seconds = 0.0
+        self.initialize_seconds = 0.0
+
+    async def start(self, init_timeout: float = 30.0):
+        """Start the server process and complete the initialize handshake."""
+        started = time.perf_counter()
+        await self._open()
+        self.spawn_seconds = time.perf_counter() - started
+        self._reader_task = asyncio.create_task(self._read_responses())
+        try:
+            started = time.perf_counter()
+            await self.request("initialize", {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": CLIENT_INFO
+            }, timeout=init_timeout)
+            await self.notify("notifications/initialized")
+            self.initialize_seconds = time.perf_counter() - started
+        except BaseException:
+            await self.close()
+            raise
+        return self
+
+    async def _open(self):
+        """Start the server process and connect to its stdin/stdout."""
+        self._process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=STREAM_LIMIT
+        )
+        self._reader, self._writer = self._process.stdout, self._process.stdin
+
+    async def _read_line(self) -> tuple:
+        """
+        The next line and whether it is complete.
+
+        A line over STREAM_LIMIT is read past and discarded; only its first
+        OVERSIZED_HEAD_BYTES come back, with False. At EOF the line is empty.
+        """
+        try:
+            return await self._reader.readuntil(b"\n"), True
+        except asyncio.IncompleteReadError as e:
+            return e.partial, True
+        except asyncio.LimitOverrunError as e:
+            head = await self._reader.read(max(e.consumed, 1))
+        while True:
+            try:
+                await self._reader.readuntil(b"\n")
+                break
+            except asyncio.IncompleteReadError:
+                break
+            except asyncio.LimitOverrunError as e:
+                await self._reader.read(max(e.consumed, 1))
+        return head[:OVERSIZED_HEAD_BYTES], False
+
+    def _fail_oversized(self, head: bytes):
+        """Fail the request an oversized response line answered, if its id can be told."""
+        match = RESPONSE_ID.search(head)
+        future = self._pending.pop(int(match.group(1)), None) if match else None
+        if future is not None and not future.done():
+            future.set_exception(MCPSessionError(f"Response exceeds the {STREAM_LIMIT} byte line limit"))
+
+    async def _read_responses(self):
+        try:
+            while True:
+                line, complete = await self._read_line()
+                if not complete:
+                    self._fail_oversized(line)
+                    continue
+                if not line:
+                    break
+                received = time.perf_counter()
+                try:
+                    response = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(response, dict) or "method" in response:
+                    # Stray output, or a request or notification from the server
+                    continue
+                future = self._pending.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result((response, received, time.perf_counter() - received))
+        except Exception:
+            pass
+        finally:
+            # EOF or a broken stream: nothing pending can be answered any more
+            self.broken = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(MCPSessionError("MCP server exited"))
+            self._pending.clear()
+
+    async def _send(self, message: dict):
+        if self.broken:
+            raise MCPSessionError("MCP session is closed")
+        try:
+            self._writer.write(json.dumps(message).encode() + b"\n")
+            await self._writer.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            self.broken = True
+            raise MCPSessionError(f"MCP server pipe closed: {e}")
+
+    @property
+    def is_alive(self) -> bool:
+        if self.broken or self._writer is None:
+            return False
+        return self._process is None or self._process.returncode is None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def notify(self, method: str, params: dict = None):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        await self._send(message)
+
+    async def request(self, method: str, params: dict = None, timeout: float = 30.0, timings: dict = None) -> dict:
+        """
+        Send a request and wait for its response; other requests may be in flight.
+
+        If `timings` is given it receives the "execute" (request written until
+        response line read) and "parse" (response decoding) durations in seconds.
+        """
+        request_id = next(self._ids)
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            sent = time.perf_counter()
+            await self._send(message)
+            response, received, parse_seconds = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._cancel(request_id, "timeout")
+            raise MCPTimeoutError(f"Timed out after {timeout}s waiting for '{method}'")
+        except asyncio.CancelledError:
+            self._cancel(request_id, "cancelled by client")
+            raise
+        finally:
+            # A late reply for an abandoned id is simply dropped by the reader
+            self._pending.pop(request_id, None)
+        self.last_used = time.monotonic()
+        if timings is not None:
+            timings["execute"] = received - sent
+            timings["parse"] = parse_seconds
+        return response
+
+    def _cancel(self, request_id: int, reason: str):
+        """Tell the server to stop working on a request nobody is waiting for."""
+        if request_id not in self._pending or not self.is_alive:
+            return
+
+        async def send_cancel():
+            try:
+                await self.notify("notifications/cancelled", {"requestId": request_id, "reason": reason})
+            except MCPSessionError:
+                pass
+
+        asyncio.ensure_future(send_cancel())
+
+    async def call_tool(self, tool_name: str, arguments: dict, timeout: float = 30.0, timings: dict = None) -> dict:
+        """Run `tools/call` and return the raw JSON-RPC response."""
+        self.calls += 1
+        return await self.request(
+            "tools/call", {"name": tool_name, "arguments": arguments}, timeout=timeout, timings=timings
+        )
+
+    async def ping(self, timeout: float = 5.0) -> bool:
+        try:
+            return "result" in await self.request("ping", timeout=timeout)
+        except MCPSessionError:
+            return False
+
+    async def close(self):
+        self.broken = True
+        if self._writer is None:
+            return
+        await self._shutdown()
+        if self._reader_task is not None:
+            await self._reader_task
+
+    async def _shutdown(self):
+        """Ask the server to exit by closing its stdin, killing it if it lingers."""
+        if self._process.returncode is None:
+            try:
+                self._process.stdin.close()
+                await asyncio.wait_for(self._process.wait(), 2)
+            except (asyncio.TimeoutError, OSError):
+                self._process.kill()
+                await self._process.wait()
@@ -0,0 +1,112 @@
+"""
+In-process tool dispatch for api_server.py.
+
+Imports the FastMCP tool registry from `sever.py` and calls the registered
+functions directly, skipping JSON encoding, the stdio pipe and JSON decoding.
+Results are shaped like the `tools/call` result a stdio session returns, so
+callers can switch between the two backends without noticing.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp_client import MCPTimeoutError
+
+
+def list_server_tools(server_app=None) -> list:
+    """Return the tools registered on the FastMCP app (sever.py's by default)."""
+    if server_app is None:
+        from sever import app as server_app
+    # list_tools() is async; run it on a private loop so this also works when
+    # the module is imported from inside a running loop (e.g. `uvicorn api_server:app`)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, server_app.list_tools()).result()
+
+
+def load_tool_registry(server_app=None) -> dict:
+    """Return {tool_name: python_function} for every tool registered on the FastMCP app."""
+    return {tool.name: getattr(tool, "fn", tool) for tool in list_server_tools(server_app)}
+
+
+def load_wrapped_tools(server_app=None) -> set:
+    """
+    Names of the tools whose results FastMCP wraps as {"result": value}.
+
+    FastMCP does this for tools whose return annotation isn't an object
+    type, e.g. `-> str`; it marks their output schema with x-fastmcp-wrap-result.
+    """
+    return {
+        tool.name for tool in list_server_tools(server_app)
+        if (getattr(tool, "output_schema", None) or {}).get("x-fastmcp-wrap-result")
+    }
+
+
+def to_tool_result(value, wrap: bool = False) -> dict:
+    """Wrap a tool's return value the same way FastMCP does on the wire."""
+    if isinstance(value, str):
+        text = value
+    else:
+        text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    result = {"content": [{"type": "text", "text": text}], "isError": False}
+    if wrap:
+        result["structuredContent"] = {"result": value}
+        result["_meta"] = {"fastmcp": {"wrap_result": True}}
+    elif isinstance(value, dict):
+        result["structuredContent"] = value
+    return result
+
+
+class InProcessDispatcher:
+    """
+    Calls `sever.py` tools as plain Python functions.
+
+    Args:
+        registry: Optional {tool_name: function} mapping; loaded from sever.py if omitted
+        executor: Optional thread pool for sync tools; defaults to the loop's executor
+        wrapped: Names of the tools whose results FastMCP wraps as {"result": value};
+            loaded from sever.py along with the registry if omitted
+    """
+
+    def __init__(self, registry: dict = None, executor=None, wrapped: set = None):
+        if registry is None:
+            registry = load_tool_registry()
+            if wrapped is None:
+                wrapped = load_wrapped_tools()
+        self.registry = registry
+        self.wrapped = wrapped if wrapped is not None else set()
+        self.executor = executor
+
+    def has_tool(self, tool_name: str) -> bool:
+        return tool_name in self.registry
+
+    async def call_tool(self, tool_name: str, arguments: dict, timeout: float = None, timings: dict = None) -> dict:
+        """
+        Run a tool and return a JSON-RPC style response ({"result": ...}).
+
+        Sync tools run in a worker thread so a slow one can't stall the event loop.
+        If `timings` is given it receives the "execute" duration in seconds.
+        """
+        fn = self.registry[tool_name]
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(fn):
+                value = await asyncio.wait_for(fn(**arguments), timeout)
+            else:
+                call = functools.partial(fn, **arguments)
+                running = asyncio.get_running_loop().run_in_executor(self.executor, call)
+                value = await asyncio.wait_for(running, timeout)
+        except asyncio.TimeoutError:
+            raise MCPTimeoutError(f"Timed out after {timeout}s waiting for '{tool_name}'")
+        except Exception as e:
+            return {"result": {
+                "content": [{"type": "text", "text": f"Error calling tool '{tool_name}': {e}"}],
+                "isError": True
+            }}
+        finally:
+            if timings is not None:
+                timings["execute"] = time.perf_counter() - started
+        return {"result": to_tool_result(value, wrap=tool_name in self.wrapped)}
@@ -0,0 +1,284 @@
+"""
+Pool of long-lived, pre-initialized stdio MCP sessions.
+
+Each session is a running `sever.py` process (an MCPClient) that has already
+completed the `initialize` handshake, so borrowing one only costs a single
+`tools/call` round trip instead of a fresh interpreter, a fastmcp import and
+a handshake. Sessions are multiplexed: a borrowed session can carry several
+in-flight calls at once, up to `max_inflight`.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from mcp_client import MCPClient, MCPSessionError, MCPTimeoutError
+
+
+class PoolExhaustedError(MCPSessionError):
+    """Raised when the pool wait queue is full or the acquire timeout expires."""
+
+
+class MCPSessionPool:
+    """
+    Fixed-size asyncio pool of MCPClient sessions.
+
+    Args:
+        size: Maximum number of live sessions
+        max_inflight: Maximum concurrent calls borrowed from one session
+        max_calls: Recycle a session after this many tool calls (0 disables)
+        max_waiters: Maximum number of callers queued for a free session
+        acquire_timeout: Seconds a caller may wait for a free session
+        health_check_interval: Ping sessions idle for longer than this before reuse
+        command: Command used to start the MCP server
+        on_start: Optional callback invoked with every newly started MCPClient
+        client_factory: Optional callable returning a new, unstarted MCPClient
+            (e.g. ZygoteLauncher.client); defaults to spawning `command`
+        hedging: Optional HedgePolicy; calls made with hedge=True that outlast
+            its threshold are duplicated on a second session
+    """
+
+    def __init__(
+        self,
+        size: int = 4,
+        max_inflight: int = 32,
+        max_calls: int = 1000,
+        max_waiters: int = 64,
+        acquire_timeout: float = 10.0,
+        health_check_interval: float = 30.0,
+        command: list = None,
+        on_start=None,
+        client_factory=None,
+        hedging=None
+    ):
+        self.size = size
+        self.max_inflight = max_inflight
+        self.max_calls = max_calls
+        self.max_waiters = max_waiters
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.command = command
+        self.on_start = on_start
+        self.client_factory = client_factory
+        self.hedging = hedging
+        self._active = {}     # client -> number of outstanding leases
+        self._retiring = {}   # recycled clients still finishing their leases
+        self._starting = 0
+        self._waiters = 0
+        self._closed = False
+        self._cond = asyncio.Condition()
+        self.recycled = 0
+
+    async def start(self):
+        """Pre-spawn all sessions so the first requests don't pay the cold start."""
+        async with self._cond:
+            missing = self.size - len(self._active) - self._starting
+            self._starting += missing
+        results = await asyncio.gather(
+            *[self._new_client().start() for _ in range(missing)],
+            return_exceptions=True
+        )
+        async with self._cond:
+            self._starting -= missing
+            for client in results:
+                if not isinstance(client, BaseException):
+                    self._active[client] = 0
+                    self._started(client)
+            self._cond.notify_all()
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise MCPSessionError(f"Failed to start MCP server: {errors[0]}")
+
+    def _pick(self, exclude=()):
+        """Least-loaded live session with spare capacity, or None."""
+        best = None
+        for client, leases in list(self._active.items()):
+            if not client.is_alive:
+                self._retire(client)
+                continue
+            if client in exclude:
+                continue
+            if leases < self.max_inflight and (best is None or leases < self._active[best]):
+                best = client
+        return best
+
+    def _retire(self, client: MCPClient):
+        leases = self._active.pop(client, 0)
+        if leases:
+            self._retiring[client] = leases
+        else:
+            asyncio.ensure_future(client.close())
+
+    async def acquire(self, exclude=()) -> MCPClient:
+        """Borrow a session, never one of `exclude` (e.g. the session a hedged call is stuck on)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.acquire_timeout
+        while True:
+            async with self._cond:
+                while True:
+                    if self._closed:
+                        raise MCPSessionError("Session pool is closed")
+                    client = self._pick(exclude)
+                    if client is not None:
+                        self._active[client] += 1
+                        break
+                    if len(self._active) + self._starting < self.size:
+                        self._starting += 1
+                        break
+                    if self._waiters >= self.max_waiters:
+                        raise PoolExhaustedError("Too many requests waiting for an MCP session")
+                    self._waiters += 1
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), deadline - loop.time())
+                    except asyncio.TimeoutError:
+                        raise PoolExhaustedError(
+                            f"No MCP session available after {self.acquire_timeout}s"
+                        )
+                    finally:
+                        self._waiters -= 1
+
+            if client is None:
+                return await self._spawn()
+
+            # Health check happens outside the lock; unhealthy sessions are replaced
+            if loop.time() - client.last_used <= self.health_check_interval or await client.ping():
+                return client
+            await self.release(client, discard=True)
+
+    async def _spawn(self) -> MCPClient:
+        try:
+            client = await self._new_client().start()
+        except BaseException as e:
+            async with self._cond:
+                self._starting -= 1
+                self._cond.notify()
+            if isinstance(e, Exception):
+                raise MCPSessionError(f"Failed to start MCP server: {e}")
+            raise
+        async with self._cond:
+            self._starting -= 1
+            self._active[client] = 1
+        self._started(client)
+        return client
+
+    def _new_client(self) -> MCPClient:
+        if self.client_factory is not None:
+            return self.client_factory()
+        return MCPClient(self.command)
+
+    def _started(self, client: MCPClient):
+        if self.on_start is not None:
+            self.on_start(client)
+
+    async def release(self, client: MCPClient, discard: bool = False):
+        async with self._cond:
+            if client in self._retiring:
+                self._retiring[client] -= 1
+                if not self._retiring[client]:
+                    del self._retiring[client]
+                    asyncio.ensure_future(client.close())
+            elif client in self._active:
+                self._active[client] -= 1
+                if self._closed or discard or not client.is_alive:
+                    self._retire(client)
+                elif self.max_calls and client.calls >= self.max_calls:
+                    self.recycled += 1
+                    self._retire(client)
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def session(self, exclude=()):
+        client = await self.acquire(exclude)
+        try:
+            yield client
+        finally:
+            await self.release(client)
+
+    async def call_tool(
+        self, tool_name: str, arguments: dict, timeout: float = 30.0, timings: dict = None, hedge: bool = False
+    ) -> dict:
+        """
+        Borrow a session and run `tools/call` on it.
+
+        `timeout` covers the whole call: time spent waiting for a session is
+        deducted from what the server is given, so the server-side request is
+        cancelled when the caller's deadline passes, not later. If `timings`
+        is given it receives "queue_wait" (time to borrow a session) plus the
+        MCPClient request phases.
+
+        With `hedge=True` (only for idempotent tools) and a hedging policy, a
+        call still unanswered after the tool's recent p95 is sent again on a
+        different session; the first response wins and the other request is
+        cancelled on its server.
+        """
+        started = time.perf_counter()
+        hedging = hedge and self.hedging is not None and self.size > 1
+        delay = self.hedging.delay(tool_name) if hedging else None
+        if delay is None or delay >= timeout:
+            response = await self._call(tool_name, arguments, timeout, timings)
+        else:
+            response = await self._hedged_call(tool_name, arguments, timeout, timings, delay)
+        if self.hedging is not None:
+            self.hedging.observe(tool_name, time.perf_counter() - started)
+        return response
+
+    async def _call(self, tool_name: str, arguments: dict, timeout: float, timings: dict = None, used: set = None) -> dict:
+        started = time.perf_counter()
+        async with self.session(exclude=used or ()) as client:
+            if used is not None:
+                used.add(client)
+            waited = time.perf_counter() - started
+            if timings is not None:
+                timings["queue_wait"] = waited
+            remaining = timeout - waited
+            if remaining <= 0:
+                raise MCPTimeoutError(f"Deadline of {timeout}s passed while waiting for an MCP session")
+            return await client.call_tool(tool_name, arguments, timeout=remaining, timings=timings)
+
+    async def _hedged_call(self, tool_name: str, arguments: dict, timeout: float, timings: dict, delay: float) -> dict:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        used = set()
+        primary = asyncio.ensure_future(self._call(tool_name, arguments, timeout, timings, used))
+        attempts = {primary}
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if done:
+                return primary.result()
+            self.hedging.hedges += 1
+            hedge = asyncio.ensure_future(self._call(tool_name, arguments, deadline - loop.time(), None, used))
+            attempts.add(hedge)
+            while attempts:
+                done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is hedge:
+                            self.hedging.hedge_wins += 1
+                        return attempt.result()
+            # Both attempts failed; report the original call's error
+            return primary.result()
+        finally:
+            # Cancelling the loser also sends notifications/cancelled to its server
+            for attempt in attempts:
+                attempt.cancel()
+                # It may still finish with an error of its own; nobody is waiting for it
+                attempt.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "live": len(self._active),
+            "starting": self._starting,
+            "in_flight": sum(self._active.values()) + sum(self._retiring.values()),
+            "waiting": self._waiters,
+            "recycled": self.recycled
+        }
+
+    async def close(self):
+        async with self._cond:
+            self._closed = True
+            clients = list(self._active) + list(self._retiring)
+            self._active.clear()
+            self._retiring.clear()
+            self._cond.notify_all()
+        await asyncio.gather(*[client.close() for client in clients], return_exceptions=True)
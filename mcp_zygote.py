@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Prefork "zygote" launcher for MCP server workers.
+
+Starting a `sever.py` process costs a fresh interpreter plus the import of
+fastmcp, requests and pydantic, which dominates pool scale-up and recycling.
+The zygote is a long-lived process that pays those costs once: it imports
+`sever.py`, runs one in-memory MCP session to load everything FastMCP
+imports lazily, and then waits on a Unix socket. Every connection to that
+socket is answered with `os.fork()`; the child wires the connection to its
+stdin/stdout and serves MCP over it, so a new worker is ready in
+milliseconds.
+
+Usage (normally started by ZygoteLauncher): python mcp_zygote.py <socket_path> [server_script]
+"""
+
+import asyncio
+import importlib.util
+import os
+import selectors
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+
+from mcp_client import MCPClient, MCPSessionError, SERVER_SCRIPT, STREAM_LIMIT
+
+READY_LINE = b"ready\n"
+
+
+def load_server(script: str = SERVER_SCRIPT):
+    """Import the MCP server script as the `sever` module and return its FastMCP app."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    spec = importlib.util.spec_from_file_location("sever", script)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["sever"] = module
+    spec.loader.exec_module(module)
+    return module.app
+
+
+async def _warm_up(server_app):
+    """
+    Run one in-memory MCP session so workers inherit what it lazily loads.
+
+    FastMCP imports its session, transport and serialization machinery on
+    first use, which otherwise costs every worker ~0.4s on its first call.
+    Only a side-effect-free template tool is called.
+    """
+    import mcp.server.stdio  # noqa: F401  (imported lazily by FastMCP.run)
+    from fastmcp import Client
+    async with Client(server_app) as client:
+        if "provide_base_template" in {tool.name for tool in await client.list_tools()}:
+            await client.call_tool("provide_base_template", {"use_case": "api"})
+
+
+def _run_worker(server_app, connection: socket.socket, listener: socket.socket):
+    """Forked child: serve MCP on the accepted connection, never return to the zygote loop."""
+    try:
+        listener.close()
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 2)
+        os.dup2(connection.fileno(), 0)
+        os.dup2(connection.fileno(), 1)
+        connection.close()
+        server_app.run()
+    finally:
+        os._exit(0)
+
+
+def serve(socket_path: str, script: str = SERVER_SCRIPT):
+    """
+    Zygote main loop.
+
+    Forks one worker per connection and writes the worker's pid back as the
+    first line, before the worker reads anything. Exits when its stdin
+    closes, so it never outlives the process that started it.
+    """
+    server_app = load_server(script)
+    try:
+        asyncio.run(_warm_up(server_app))
+    except Exception:
+        pass  # only a missed optimisation; workers still load lazily
+
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # workers are reaped automatically
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(64)
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ)
+    selector.register(sys.stdin.fileno(), selectors.EVENT_READ)
+    os.write(sys.stdout.fileno(), READY_LINE)
+
+    while True:
+        for key, _ in selector.select():
+            if key.fileobj is not listener:
+                if not os.read(sys.stdin.fileno(), 4096):
+                    listener.close()
+                    return
+                continue
+            connection, _ = listener.accept()
+            pid = os.fork()
+            if pid == 0:
+                _run_worker(server_app, connection, listener)
+            try:
+                connection.sendall(f"{pid}\n".encode())
+            except OSError:
+                pass
+            connection.close()
+
+
+class ForkedMCPClient(MCPClient):
+    """MCPClient whose server is a worker forked by a running ZygoteLauncher."""
+
+    def __init__(self, launcher: "ZygoteLauncher"):
+        super().__init__(command=[sys.executable, __file__, launcher.socket_path, launcher.script])
+        self.launcher = launcher
+        self.pid = None
+
+    async def _open(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(
+            self.launcher.socket_path, limit=STREAM_LIMIT
+        )
+        line = await self._reader.readline()
+        if not line.strip().isdigit():
+            self._writer.close()
+            raise MCPSessionError("MCP zygote did not fork a worker")
+        self.pid = int(line)
+
+    async def _shutdown(self):
+        """Half-close the socket so the worker sees EOF, killing it if it lingers."""
+        try:
+            if self._writer.can_write_eof():
+                self._writer.write_eof()
+            if self._reader_task is not None:
+                await asyncio.wait_for(asyncio.shield(self._reader_task), 2)
+        except (asyncio.TimeoutError, OSError):
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except (ProcessLookupError, TypeError):
+                pass
+        finally:
+            self._writer.close()
+
+
+class ZygoteLauncher:
+    """
+    Starts and owns a zygote process and hands out clients for forked workers.
+
+    Args:
+        script: MCP server script imported by the zygote
+    """
+
+    def __init__(self, script: str = SERVER_SCRIPT):
+        self.script = script
+        self._directory = None
+        self.socket_path = None
+        self._process = None
+
+    @property
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    async def start(self, timeout: float = 30.0):
+        """Start the zygote and wait until it has imported the server."""
+        if not hasattr(os, "fork") or not hasattr(socket, "AF_UNIX"):
+            raise MCPSessionError("Forking workers needs os.fork() and Unix sockets")
+        self._directory = tempfile.mkdtemp(prefix="mcp-zygote-")
+        self.socket_path = os.path.join(self._directory, "zygote.sock")
+        self._process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), self.socket_path, self.script,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            line = await asyncio.wait_for(self._process.stdout.readline(), timeout)
+        except asyncio.TimeoutError:
+            line = b""
+        if line != READY_LINE:
+            await self.close()
+            raise MCPSessionError("MCP zygote failed to start")
+        return self
+
+    def client(self) -> ForkedMCPClient:
+        """New, unstarted client; `await client.start()` forks its worker."""
+        return ForkedMCPClient(self)
+
+    async def close(self):
+        if self._process is not None and self._process.returncode is None:
+            try:
+                self._process.stdin.close()
+                await asyncio.wait_for(self._process.wait(), 2)
+            except (asyncio.TimeoutError, OSError):
+                self._process.kill()
+                await self._process.wait()
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else SERVER_SCRIPT)
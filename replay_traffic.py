@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Replay traffic captured by api_server.py (MCP_CAPTURE_PATH) against a local server
+Usage: python replay_traffic.py CAPTURE [CAPTURE ...] [--speed 1] [--url URL] [--include-network] [--report FILE]
+
+Requests are sent on the captured schedule, divided by --speed (0 sends them
+all as fast as --max-in-flight allows). Without --url a fresh server is
+started for the run, so every run begins from the same cold state. The
+Firebase endpoints are skipped unless --include-network is given, which
+keeps replays offline and repeatable.
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from traffic_capture import read_capture
+
+NETWORK_PATHS = {"/download_firebase_txt_file", "/list_firebase_files"}
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def replay(records: list, client: httpx.AsyncClient, speed: float = 1.0, max_in_flight: int = 64):
+    """
+    Send `records` on their captured schedule and return ({path: [(seconds, status)]}, elapsed).
+
+    Latency is measured from the time a request was due, not from when it
+    was sent, so a client falling behind schedule shows up in the tail
+    instead of silently lowering the offered load.
+    """
+    samples = {}
+    slots = asyncio.Semaphore(max_in_flight)
+    origin = records[0][0] if records else 0.0
+    started = time.perf_counter()
+
+    async def send(record: list, due: float):
+        _, method, path, query, headers, body = record
+        async with slots:
+            try:
+                response = await client.request(
+                    method, path + ("?" + query if query else ""), headers=headers,
+                    content=body.encode() if body is not None else None
+                )
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+        samples.setdefault(path, []).append((time.perf_counter() - due, status))
+
+    tasks = []
+    for record in records:
+        due = started + ((record[0] - origin) / speed if speed > 0 else 0.0)
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(send(record, due)))
+    await asyncio.gather(*tasks)
+    return samples, time.perf_counter() - started
+
+def summarize(samples: dict, elapsed: float) -> dict:
+    """Per-endpoint (and "all") request count, errors, throughput and p50/p95/p99 in ms."""
+    report = {}
+    everything = [sample for path_samples in samples.values() for sample in path_samples]
+    for path, path_samples in sorted(samples.items()) + [("all", everything)]:
+        if not path_samples:
+            continue
+        latencies = [seconds * 1000 for seconds, _ in path_samples]
+        report[path] = {
+            "requests": len(path_samples),
+            "errors": sum(1 for _, status in path_samples if status == 0 or status >= 400),
+            "throughput_rps": round(len(path_samples) / elapsed, 2) if elapsed > 0 else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3)
+        }
+    return report
+
+def start_server(port: int, env: dict = None) -> subprocess.Popen:
+    """Start api_server.py under uvicorn on 127.0.0.1:`port` and wait until it answers."""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api_server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "MCP_CAPTURE_PATH": "", **(env or {})}
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"api_server exited with status {server.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("api_server did not start within 60s")
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def run_replay(args):
+    records = read_capture(*args.captures)
+    if not args.include_network:
+        records = [record for record in records if record[2] not in NETWORK_PATHS]
+    if not records:
+        print("Nothing to replay")
+        return {}
+    span = records[-1][0] - records[0][0]
+    print(f"Replaying {len(records)} requests captured over {span:.1f}s at "
+          f"{'max speed' if args.speed <= 0 else f'{args.speed:g}x'}")
+
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        server = start_server(port)
+        url = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+            samples, elapsed = await replay(records, client, args.speed, args.max_in_flight)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = summarize(samples, elapsed)
+    print(f"\n{'endpoint':<30} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print("-" * 88)
+    for path, row in report.items():
+        print(f"{path:<30} {row['requests']:>9} {row['errors']:>7} {row['throughput_rps']:>9.1f} "
+              f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured api_server traffic")
+    parser.add_argument("captures", nargs="+", help="Capture files written with MCP_CAPTURE_PATH")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed factor; 0 sends as fast as possible")
+    parser.add_argument("--url", help="Server to replay against (default: start a fresh local one)")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Concurrent requests at most")
+    parser.add_argument("--include-network", action="store_true", help="Also replay the Firebase endpoints")
+    parser.add_argument("--report", help="Write the per-endpoint report as JSON to this file")
+    asyncio.run(run_replay(parser.parse_args()))
@@ -0,0 +1,108 @@
+"""
+Fast JSON encoding and pre-compressed response bodies for api_server.py.
+
+Tool results are encoded once with orjson (falling back to the stdlib json
+module) and kept as bytes next to the cached result. Each content-coding
+(gzip, and brotli when the `brotli` package is installed) is produced the
+first time a client asks for it and stored on the same EncodedResult, so a
+cached response is never re-serialized or recompressed.
+"""
+
+import gzip
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional codec
+    brotli = None
+
+# Bodies smaller than this go out uncompressed; the headers cost more than the savings
+MIN_COMPRESS_BYTES = 512
+
+COMPRESSORS = {"gzip": lambda body: gzip.compress(body, compresslevel=6, mtime=0)}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda body: brotli.compress(body, quality=5)
+
+# Server preference when the client accepts several codings equally
+PREFERENCE = ("br", "gzip")
+
+
+def dumps(value, sort_keys: bool = False) -> bytes:
+    """Compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return json.dumps(value, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def negotiate(accept_encoding: str):
+    """Pick the content-coding to send for an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for coding in PREFERENCE:
+        if coding not in COMPRESSORS:
+            continue
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class EncodedResult:
+    """
+    JSON body of a tool result with its ETag and lazily built compressed variants.
+
+    Args:
+        body: Encoded JSON bytes
+        etag: Strong ETag of the body, or None for uncacheable results
+        variants: Already compressed variants, {coding: bytes}
+        on_encode: Optional callback(coding, data) run once per new variant,
+            e.g. to persist it in a shared cache
+    """
+
+    __slots__ = ("body", "etag", "variants", "on_encode")
+
+    def __init__(self, body: bytes, etag: str = None, variants: dict = None, on_encode=None):
+        self.body = body
+        self.etag = etag
+        self.variants = variants if variants is not None else {}
+        self.on_encode = on_encode
+
+    def encode(self, coding: str):
+        """Return (content_coding, bytes) to send; coding None or unknown means identity."""
+        if coding is None or coding not in COMPRESSORS or len(self.body) < MIN_COMPRESS_BYTES:
+            return None, self.body
+        data = self.variants.get(coding)
+        if data is None:
+            data = self.variants[coding] = COMPRESSORS[coding](self.body)
+            if self.on_encode is not None:
+                self.on_encode(coding, data)
+        return coding, data
+
+
+def variant_etag(etag: str, coding: str) -> str:
+    """Strong ETags must differ per content-coding: "abc" -> "abc-gzip"."""
+    if coding is None:
+        return etag
+    return etag[:-1] + "-" + coding + '"'
@@ -0,0 +1,361 @@
+"""
+Bounded LRU + TTL caches for deterministic tool results.
+
+Entries are keyed on a canonical hash of the tool name plus its arguments and
+carry a strong ETag computed from the result, so api_server.py can answer
+`If-None-Match` revalidations with 304 without calling the tool again.
+
+ResultCache lives in one process; SQLiteResultCache keeps pre-serialized
+results in a SQLite file in WAL mode so every uvicorn worker on the host
+shares one warm cache. Both keep each result's encoded JSON body (and any
+compressed variants built from it) as an EncodedResult, so a cache hit is
+served without re-encoding.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+from response_encoding import EncodedResult, dumps, loads
+
+
+def canonical_json(value) -> str:
+    """Stable JSON encoding: sorted keys, no whitespace."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def cache_key(tool_name: str, arguments: dict) -> str:
+    return hashlib.sha256(canonical_json([tool_name, arguments]).encode()).hexdigest()
+
+
+def etag_for_body(body: bytes) -> str:
+    """ETag of a result body encoded by encode_result."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def encode_result(result) -> EncodedResult:
+    """Encode a result once with sorted keys; the body doubles as the ETag input."""
+    body = dumps(result, sort_keys=True)
+    return EncodedResult(body, etag_for_body(body))
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """True if an If-None-Match header value matches the given ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class ResultCache:
+    """
+    In-process LRU cache with a per-entry time to live.
+
+    Args:
+        max_entries: Maximum number of cached results (0 disables caching)
+        ttl: Seconds an entry stays fresh
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, result, EncodedResult)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(self, key: str):
+        """Return (result, EncodedResult) for a fresh entry, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, result, encoded = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result, encoded
+
+    def put(self, key: str, result, encoded: EncodedResult = None) -> str:
+        """Store a result (and its encoding, if already built) and return its ETag."""
+        if encoded is None:
+            encoded = encode_result(result)
+        if self.max_entries <= 0:
+            return encoded.etag
+        self._entries[key] = (time.monotonic() + self.ttl, result, encoded)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return encoded.etag
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    @property
+    def entries(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteResultCache:
+    """
+    Cache shared by every process on the host, stored in a SQLite file.
+
+    Results are stored as canonical JSON bytes with their ETag and any
+    compressed variants clients have asked for. The database runs in WAL
+    mode, so readers in one worker never block on a writer in another.
+    Recency is refreshed at most once per `touch_interval` per entry, so
+    cache hits rarely need a write. Triggers keep the number of entries and
+    the total of the stored bytes (bodies plus variants) in counter rows;
+    only when the bytes exceed `max_bytes` are the least recently used
+    entries evicted, oldest first. Hit and miss counters are per process;
+    entries and bytes are host-wide.
+
+    Every call does blocking file I/O and may wait for another worker's
+    write lock: call it from a worker thread, not the event loop. Calls
+    from several threads are serialized. Compressed variants built on an
+    EncodedResult are only queued, so encoding never touches the file; the
+    next lookup, put or stats call stores them. `entries` is the entry count
+    as of this process's last put or stats call, so reading it never blocks.
+
+    Args:
+        path: Database file, created if missing
+        max_bytes: Upper bound on the total size of stored results (0 disables caching)
+        ttl: Seconds an entry stays fresh
+        touch_interval: Minimum seconds between recency updates of one entry
+    """
+
+    VARIANT_COLUMNS = {"gzip": "gzip_body", "br": "br_body"}
+    # Entries read per eviction query
+    EVICTION_BATCH = 64
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, ttl: float = 300.0, touch_interval: float = 1.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self._conn = None
+        self._pid = None
+        # Transactions on one connection must not interleave
+        self._lock = threading.RLock()
+        # (key, etag, column, data) of variants waiting to be stored
+        self._pending_variants = deque()
+        self.entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # A connection must not cross a fork, so each worker opens its own
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # One transaction, so a worker never sees the counter without its triggers
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT NOT NULL, size INTEGER NOT NULL, "
+                    "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at)")
+                conn.execute("CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)")
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+                for column in self.VARIANT_COLUMNS.values():
+                    if column not in columns:
+                        conn.execute(f"ALTER TABLE results ADD COLUMN {column} BLOB")
+                conn.execute("CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+                conn.execute(
+                    "INSERT OR IGNORE INTO totals (name, value) "
+                    "SELECT 'bytes', COALESCE(SUM(size), 0) FROM results"
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO totals (name, value) SELECT 'entries', COUNT(*) FROM results"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS results_count_insert AFTER INSERT ON results BEGIN "
+                    "UPDATE totals SET value = value + 1 WHERE name = 'entries'; END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS results_count_delete AFTER DELETE ON results BEGIN "
+                    "UPDATE totals SET value = value - 1 WHERE name = 'entries'; END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS results_size_insert AFTER INSERT ON results BEGIN "
+                    "UPDATE totals SET value = value + NEW.size WHERE name = 'bytes'; END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS results_size_delete AFTER DELETE ON results BEGIN "
+                    "UPDATE totals SET value = value - OLD.size WHERE name = 'bytes'; END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS results_size_update AFTER UPDATE OF size ON results BEGIN "
+                    "UPDATE totals SET value = value + NEW.size - OLD.size WHERE name = 'bytes'; END"
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                conn.close()
+                raise
+            self._conn, self._pid = conn, os.getpid()
+            self.entries = self._total_entries(conn)
+        return self._conn
+
+    def _total_bytes(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM totals WHERE name = 'bytes'").fetchone()[0]
+
+    def _total_entries(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM totals WHERE name = 'entries'").fetchone()[0]
+
+    def lookup(self, key: str, decode: bool = True):
+        """Return (result, EncodedResult) for a fresh entry, or None; result is None unless decoded."""
+        variants = ", ".join(self.VARIANT_COLUMNS.values())
+        with self._lock:
+            conn = self._connection()
+            self._write_variants(conn)
+            row = conn.execute(
+                f"SELECT body, etag, expires_at, accessed_at, {variants} FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is None:
+                self.misses += 1
+                return None
+            body, etag, expires_at, accessed_at = row[:4]
+            if expires_at <= now:
+                conn.execute("DELETE FROM results WHERE key = ? AND expires_at <= ?", (key, now))
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if now - accessed_at >= self.touch_interval:
+                conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        stored = {
+            coding: bytes(data) for coding, data in zip(self.VARIANT_COLUMNS, row[4:]) if data is not None
+        }
+        encoded = EncodedResult(bytes(body), etag, stored, on_encode=self._variant_writer(key, etag))
+        return (loads(body) if decode else None), encoded
+
+    def _variant_writer(self, key: str, etag: str):
+        # Runs wherever the variant is encoded, often the event loop: queue only
+        def store(coding: str, data: bytes):
+            column = self.VARIANT_COLUMNS.get(coding)
+            if column is not None:
+                self._pending_variants.append((key, etag, column, data))
+        return store
+
+    def _write_variants(self, conn: sqlite3.Connection):
+        """Store the variants queued since the last call (caller holds the lock)."""
+        while self._pending_variants:
+            key, etag, column, data = self._pending_variants.popleft()
+            conn.execute(
+                f"UPDATE results SET {column} = ?, size = size + ? WHERE key = ? AND etag = ? AND {column} IS NULL",
+                (data, len(data), key, etag)
+            )
+
+    def put(self, key: str, result, encoded: EncodedResult = None) -> str:
+        """Store a result (and its encoding, if already built) and return its ETag."""
+        if encoded is None:
+            encoded = encode_result(result)
+        body, etag = encoded.body, encoded.etag
+        encoded.on_encode = self._variant_writer(key, etag)
+        if self.max_bytes <= 0 or len(body) > self.max_bytes:
+            return etag
+        now = time.time()
+        variants = {self.VARIANT_COLUMNS[c]: data for c, data in encoded.variants.items() if c in self.VARIANT_COLUMNS}
+        columns = "".join(f", {column}" for column in variants)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Delete and insert rather than REPLACE: its implicit delete skips the size trigger
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                conn.execute(
+                    f"INSERT INTO results (key, body, etag, size, expires_at, accessed_at{columns}) "
+                    f"VALUES (?, ?, ?, ?, ?, ?{', ?' * len(variants)})",
+                    (key, body, etag, len(body) + sum(map(len, variants.values())), now + self.ttl, now,
+                     *variants.values())
+                )
+                self.expirations += conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,)).rowcount
+                self._write_variants(conn)
+                self._evict(conn)
+                self.entries = self._total_entries(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return etag
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete the least recently used entries until the stored bytes fit in max_bytes."""
+        excess = self._total_bytes(conn) - self.max_bytes
+        while excess > 0:
+            victims = []
+            for key, size in conn.execute(
+                "SELECT key, size FROM results ORDER BY accessed_at LIMIT ?", (self.EVICTION_BATCH,)
+            ).fetchall():
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            if not victims:
+                break
+            conn.executemany("DELETE FROM results WHERE key = ?", victims)
+            self.evictions += len(victims)
+
+    def clear(self):
+        with self._lock:
+            self._pending_variants.clear()
+            self._connection().execute("DELETE FROM results")
+            self.entries = 0
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._write_variants(self._conn)
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._connection()
+            self._write_variants(conn)
+            self.entries, size = self._total_entries(conn), self._total_bytes(conn)
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": self.entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -1,11 +1,47 @@
 from fastmcp import FastMCP, tools
+import asyncio
+import httpx
 import requests
 import os
 import json
+import tempfile
 from datetime import datetime
 
+from call_profiler import CallProfiler, CallProfilerMiddleware
+from download_cache import DownloadCache
+from firebase_http import DOWNLOAD_CHUNK_SIZE, MAX_CONTENT_BYTES, DownloadMismatch, DownloadTooLarge, StreamingDownload
+from firebase_http import declared_charset, firebase_async_client, firebase_session, is_firebase_url
+from tool_stats import ToolStats, ToolStatsMiddleware
+
+# Per-tool call statistics, served by the server_stats tool. With
+# MCP_STATS_PATH set they are also written there as JSON every
+# MCP_STATS_INTERVAL seconds; "{pid}" in the path gives each process its own file.
+tool_stats = ToolStats()
+
 # Create the FastMCP app
-app = FastMCP("prompt-context-server")
+app = FastMCP(
+    "prompt-context-server",
+    lifespan=tool_stats.lifespan(os.environ.get("MCP_STATS_PATH"), float(os.environ.get("MCP_STATS_INTERVAL", "60")))
+)
+
+# Opt-in profiling of selected tool calls: MCP_PROFILE_EVERY=N profiles one
+# call in N and MCP_PROFILE_SLOW_MS keeps profiles of calls slower than that.
+# Once any MCP_PROFILE_* is set, a request can also ask for a profile with
+# `_meta: {"profile": true}`. Collapsed-stack files go to MCP_PROFILE_DIR
+# (profiles/ next to this file). Unset, no middleware is installed at all.
+MCP_PROFILE_DIR = os.environ.get("MCP_PROFILE_DIR")
+MCP_PROFILE_EVERY = int(os.environ.get("MCP_PROFILE_EVERY", "0"))
+MCP_PROFILE_SLOW_MS = float(os.environ["MCP_PROFILE_SLOW_MS"]) if os.environ.get("MCP_PROFILE_SLOW_MS") else None
+if MCP_PROFILE_DIR or MCP_PROFILE_EVERY > 0 or MCP_PROFILE_SLOW_MS is not None:
+    call_profiler = CallProfiler(
+        MCP_PROFILE_DIR or os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"),
+        every=MCP_PROFILE_EVERY,
+        slow_ms=MCP_PROFILE_SLOW_MS
+    )
+    # Outermost, so it wraps the tool functions innermost and the profile
+    # starts at the tool's own frame
+    app.add_middleware(CallProfilerMiddleware(call_profiler))
+app.add_middleware(ToolStatsMiddleware(tool_stats))
 
 # ---------------------------
 # Tool 1: Collect Requirements → Implementation Plan
@@ -283,14 +319,267 @@ def analyze_process_automation(
 # ---------------------------
 # Tool 5: Firebase Text File Download
 # ---------------------------
-@app.tool
+# Downloads are cached by URL and parameters in MCP_FIREBASE_CACHE_DIR and
+# revalidated with the server's ETag / Last-Modified, so an unchanged file
+# is not transferred again. MCP_FIREBASE_OFFLINE=1 serves cached copies
+# without contacting Firebase; MCP_FIREBASE_CACHE=0 turns the cache off.
+download_cache = DownloadCache(
+    os.environ.get("MCP_FIREBASE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "mcp-firebase-cache")),
+    max_bytes=int(os.environ.get("MCP_FIREBASE_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    offline=os.environ.get("MCP_FIREBASE_OFFLINE", "0") == "1"
+) if os.environ.get("MCP_FIREBASE_CACHE", "1") == "1" else None
+
+def firebase_download_request(firebase_url: str, project_id: str, filename: str) -> tuple:
+    """Full URL and query parameters for a download_firebase_txt_file call."""
+    # Construct Firebase URL if not provided as full URL
+    if not firebase_url.startswith('http'):
+        base_url = f"https://us-central1-{project_id}.cloudfunctions.net"
+        firebase_url = f"{base_url}/{firebase_url}"
+    
+    # Add parameters for text plan download
+    params = None
+    if "downloadTextPlan" in firebase_url:
+        params = {
+            "project_name": filename.replace("_Project_Plan.txt", "").replace("_", " ") if filename else "Sample Project",
+            "project_type": "webapp",
+            "complexity": "medium",
+            "tech_stack": "React, Node.js, Firebase",
+            "deadline_weeks": 8
+        }
+    return firebase_url, params
+
+def download_filename(filename: str, content_disposition: str) -> str:
+    """Local name for a download: `filename`, the server's suggested name, or a timestamped one."""
+    # Determine filename
+    if not filename:
+        # Try to extract from Content-Disposition header
+        if 'filename=' in content_disposition:
+            filename = content_disposition.split('filename=')[1].strip('"')
+        else:
+            filename = f"downloaded_file_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    
+    # Ensure .txt extension
+    if not filename.endswith('.txt'):
+        filename += '.txt'
+    return filename
+
+def download_failed(firebase_url: str, error: str) -> dict:
+    return {
+        "success": False,
+        "error": error,
+        "firebase_url": firebase_url
+    }
+
+def offline_miss(firebase_url: str) -> dict:
+    return download_failed(firebase_url, "Offline mode: no cached copy of this download")
+
+def finish_firebase_download(
+    download: StreamingDownload,
+    firebase_url: str,
+    save_as_cline_rules: bool,
+    cline_rules_filename: str,
+    cache_status: str = None
+) -> dict:
+    """Describe a saved download and optionally write its .cline rules next to it."""
+    filename = download.path
+    result = {
+        "success": True,
+        "original_file": filename,
+        "file_size": download.size,
+        "sha256": download.sha256,
+        "download_url": firebase_url,
+        "timestamp": datetime.now().isoformat()
+    }
+    if cache_status is not None:
+        # "miss" (downloaded), "revalidated" (304, copied from the cache) or "offline"
+        result["cache"] = cache_status
+    
+    # Convert to .cline rules format if requested
+    if save_as_cline_rules:
+        # Determine .cline rules filename
+        if not cline_rules_filename:
+            base_name = filename.replace('.txt', '')
+            cline_rules_filename = f"{base_name}_rules.txt"
+        
+        # Save as .cline rules, streamed from the saved file
+        cline_rules_size = write_cline_rules(filename, filename, cline_rules_filename)
+        
+        result.update({
+            "cline_rules_file": cline_rules_filename,
+            "cline_rules_created": True,
+            "cline_rules_size": cline_rules_size
+        })
+    
+    return result
+
+class FirebaseDownload:
+    """
+    One download_firebase_txt_file call, apart from the HTTP request itself.
+    
+    The sync and async versions of the tool each make the request with
+    their own client and hand the response to these methods. Everything
+    here blocks on the disk or the cache index, so the async tool runs it
+    with asyncio.to_thread (except for writing chunks, which only go to the
+    page cache).
+    """
+    
+    def __init__(self, firebase_url: str, project_id: str, filename: str,
+                 save_as_cline_rules: bool, cline_rules_filename: str, return_content: bool = False):
+        self.firebase_url, self.params = firebase_download_request(firebase_url, project_id, filename)
+        self.filename = filename
+        self.save_as_cline_rules = save_as_cline_rules and not return_content
+        self.cline_rules_filename = cline_rules_filename
+        self.return_content = return_content
+        self.key = None
+        self.cached = None
+    
+    def start(self):
+        """
+        Check the call and look the download up in the cache.
+        
+        Returns the result when the call is answered without a request
+        (offline mode, or a refused return_content call), otherwise None:
+        then GET `firebase_url` with `params` and `headers`, following
+        redirects if `follow_redirects`, again for as long as the result
+        stays None.
+        """
+        if self.return_content:
+            # The content goes back to a remote caller: only fetch from
+            # Firebase, and never touch the disk (not even the cache)
+            if not is_firebase_url(self.firebase_url):
+                return download_failed(self.firebase_url, "Only https URLs on the Firebase hosts can be downloaded")
+            if any(separator in self.filename for separator in ('/', '\\')):
+                return download_failed(self.firebase_url, "filename must not contain path separators")
+            return None
+        if download_cache is None:
+            return None
+        self.key = download_cache.key(self.firebase_url, self.params)
+        self.cached = download_cache.lookup(self.key)
+        if download_cache.offline:
+            result = self.restore("offline") if self.cached is not None else None
+            return result if result is not None else offline_miss(self.firebase_url)
+        return None
+    
+    @property
+    def headers(self):
+        """Conditional request headers that let the server answer 304 for the cached copy."""
+        return download_cache.validators(self.cached) if self.cached is not None else None
+    
+    @property
+    def follow_redirects(self) -> bool:
+        # A redirect could lead a return_content call off the Firebase hosts
+        return not self.return_content
+    
+    def not_modified(self, status_code: int) -> bool:
+        return status_code == 304 and self.cached is not None
+    
+    def restore(self, cache_status: str):
+        """
+        Copy the cached file in place of a transfer and describe it.
+        
+        Returns None if the cached copy turns out to be missing or corrupt;
+        the entry is dropped and the next request goes without validators.
+        """
+        # Saved under the name a fresh download would have had
+        filename = download_filename(self.filename, self.cached.content_disposition or '')
+        try:
+            download = download_cache.restore(self.cached, filename)
+        except (FileNotFoundError, DownloadMismatch):
+            self.cached = None
+            return None
+        return self.finish(download, cache_status)
+    
+    def save(self, response) -> StreamingDownload:
+        """The StreamingDownload a successful response's body is written to (or kept in, for return_content)."""
+        headers = response.headers
+        if self.return_content and response.status_code != 200:
+            raise ValueError(f"Firebase answered {response.status_code} instead of the file")
+        self.filename = download_filename(self.filename, headers.get('content-disposition', ''))
+        charset = declared_charset(headers.get('content-type'))
+        if self.return_content:
+            # Kept in memory, and small enough to go back in one JSON-RPC line
+            download = StreamingDownload(None, max_bytes=MAX_CONTENT_BYTES, charset=charset)
+        else:
+            download = StreamingDownload(self.filename, charset=charset)
+        download.check_length(headers)
+        return download
+    
+    def saved(self, download: StreamingDownload, response) -> dict:
+        """Cache a committed download with the response's validators and describe it."""
+        if self.return_content:
+            return {
+                "success": True,
+                "filename": self.filename,
+                "content": download.content.decode('utf-8', errors='replace'),
+                "file_size": download.size,
+                "sha256": download.sha256,
+                "download_url": self.firebase_url,
+                "timestamp": datetime.now().isoformat()
+            }
+        if download_cache is None:
+            return self.finish(download)
+        download_cache.store(self.key, self.firebase_url, download, response.headers)
+        return self.finish(download, "miss")
+    
+    def finish(self, download: StreamingDownload, cache_status: str = None) -> dict:
+        return finish_firebase_download(
+            download, self.firebase_url, self.save_as_cline_rules, self.cline_rules_filename, cache_status
+        )
+    
+    def failed(self, error: Exception) -> dict:
+        """The result of a call that raised `error`."""
+        if isinstance(error, DownloadTooLarge):
+            message = f"Download too large: {str(error)}"
+        elif isinstance(error, (requests.exceptions.RequestException, httpx.HTTPError)):
+            message = f"Network error: {str(error)}"
+        else:
+            message = f"Unexpected error: {str(error)}"
+        return download_failed(self.firebase_url, message)
+
 def download_firebase_txt_file(
     firebase_url: str,
     project_id: str = "your-firebase-project-id",
     file_path: str = "project_plans",
     filename: str = "",
     save_as_cline_rules: bool = True,
-    cline_rules_filename: str = ""
+    cline_rules_filename: str = "",
+    return_content: bool = False
+) -> dict:
+    """
+    Blocking version of the download_firebase_txt_file tool below, for
+    direct Python callers. Takes the same arguments.
+    """
+    fetch = FirebaseDownload(
+        firebase_url, project_id, filename, save_as_cline_rules, cline_rules_filename, return_content
+    )
+    try:
+        result = fetch.start()
+        while result is None:
+            with firebase_session().get(fetch.firebase_url, params=fetch.params, headers=fetch.headers,
+                                        allow_redirects=fetch.follow_redirects, stream=True) as response:
+                if fetch.not_modified(response.status_code):
+                    # Unchanged since it was cached: skip the transfer, unless
+                    # the cached copy is broken and it has to be fetched again
+                    result = fetch.restore("revalidated")
+                else:
+                    response.raise_for_status()
+                    with fetch.save(response) as download:
+                        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                            download.write(chunk)
+                    result = fetch.saved(download, response)
+        return result
+    except Exception as e:
+        return fetch.failed(e)
+
+@app.tool(name="download_firebase_txt_file")
+async def download_firebase_txt_file_async(
+    firebase_url: str,
+    project_id: str = "your-firebase-project-id",
+    file_path: str = "project_plans",
+    filename: str = "",
+    save_as_cline_rules: bool = True,
+    cline_rules_filename: str = "",
+    return_content: bool = False
 ) -> dict:
     """
     Downloads a .txt file from Firebase and optionally saves it as .cline rules.
@@ -302,94 +591,32 @@ def download_firebase_txt_file(
         filename: Specific filename to download (if empty, will try to extract from URL)
         save_as_cline_rules: Whether to save as .cline rules format
         cline_rules_filename: Custom filename for .cline rules (if empty, auto-generated)
+        return_content: Return the file's text instead of saving anything (only https
+            Firebase URLs, no redirects, no path separators in filename)
     """
-    
+    fetch = FirebaseDownload(
+        firebase_url, project_id, filename, save_as_cline_rules, cline_rules_filename, return_content
+    )
     try:
-        # Construct Firebase URL if not provided as full URL
-        if not firebase_url.startswith('http'):
-            base_url = f"https://us-central1-{project_id}.cloudfunctions.net"
-            firebase_url = f"{base_url}/{firebase_url}"
-        
-        # Add parameters for text plan download
-        if "downloadTextPlan" in firebase_url:
-            params = {
-                "project_name": filename.replace("_Project_Plan.txt", "").replace("_", " ") if filename else "Sample Project",
-                "project_type": "webapp",
-                "complexity": "medium",
-                "tech_stack": "React, Node.js, Firebase",
-                "deadline_weeks": 8
-            }
-            
-            # Make request to Firebase function
-            response = requests.get(firebase_url, params=params)
-        else:
-            # Direct file download
-            response = requests.get(firebase_url)
-        
-        response.raise_for_status()
-        
-        # Get the content
-        content = response.text
-        
-        # Determine filename
-        if not filename:
-            # Try to extract from Content-Disposition header
-            content_disposition = response.headers.get('content-disposition', '')
-            if 'filename=' in content_disposition:
-                filename = content_disposition.split('filename=')[1].strip('"')
-            else:
-                filename = f"downloaded_file_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        
-        # Ensure .txt extension
-        if not filename.endswith('.txt'):
-            filename += '.txt'
-        
-        # Save the original file
-        original_path = filename
-        with open(original_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        result = {
-            "success": True,
-            "original_file": original_path,
-            "file_size": len(content),
-            "download_url": firebase_url,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # Convert to .cline rules format if requested
-        if save_as_cline_rules:
-            cline_rules_content = convert_to_cline_rules(content, filename)
-            
-            # Determine .cline rules filename
-            if not cline_rules_filename:
-                base_name = filename.replace('.txt', '')
-                cline_rules_filename = f"{base_name}_rules.txt"
-            
-            # Save as .cline rules
-            with open(cline_rules_filename, 'w', encoding='utf-8') as f:
-                f.write(cline_rules_content)
-            
-            result.update({
-                "cline_rules_file": cline_rules_filename,
-                "cline_rules_created": True,
-                "cline_rules_size": len(cline_rules_content)
-            })
-        
+        result = await asyncio.to_thread(fetch.start)
+        while result is None:
+            # Awaiting the response leaves the server free to serve other calls
+            async with firebase_async_client().stream("GET", fetch.firebase_url, params=fetch.params,
+                                                      headers=fetch.headers,
+                                                      follow_redirects=fetch.follow_redirects) as response:
+                if fetch.not_modified(response.status_code):
+                    # Unchanged since it was cached: skip the transfer, unless
+                    # the cached copy is broken and it has to be fetched again
+                    result = await asyncio.to_thread(fetch.restore, "revalidated")
+                else:
+                    response.raise_for_status()
+                    with fetch.save(response) as download:
+                        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                            download.write(chunk)
+                    result = await asyncio.to_thread(fetch.saved, download, response)
         return result
-        
-    except requests.exceptions.RequestException as e:
-        return {
-            "success": False,
-            "error": f"Network error: {str(e)}",
-            "firebase_url": firebase_url
-        }
     except Exception as e:
-        return {
-            "success": False,
-            "error": f"Unexpected error: {str(e)}",
-            "firebase_url": firebase_url
-        }
+        return fetch.failed(e)
 
 def convert_to_cline_rules(content: str, original_filename: str) -> str:
     """
@@ -404,8 +631,18 @@ def convert_to_cline_rules(content: str, original_filename: str) -> str:
         except:
             pass
     
+    head, tail = cline_rules_template(project_name, original_filename)
+    return head + escape_cline_content(content) + tail
+
+def escape_cline_content(content: str) -> str:
+    """Escape content for JSON (character by character, so chunks can be escaped separately)."""
+    return content.replace('"', '\\"').replace('\n', '\\n')
+
+def cline_rules_template(project_name: str, original_filename: str) -> tuple:
+    """The .cline rules text before and after the escaped template content."""
+    
     # Create .cline rules format
-    cline_rules = f"""create_template
+    head = f"""create_template
 
 Create a new template for {project_name.lower()} project generation.
 
@@ -417,7 +654,8 @@ Arguments
     "name": "{project_name}",
     "description": "Comprehensive project template generated from Firebase download",
     "category": "project_template",
-    "template_content": "{content.replace('"', '\\"').replace('\n', '\\n')}",
+    "template_content": \""""
+    tail = f"""",
     "variables": [
       {{
         "name": "project_name",
@@ -491,16 +729,125 @@ Arguments
 }}
 ````"""
     
-    return cline_rules
+    return head, tail
+
+def plan_project_name(path: str, default: str) -> str:
+    """The "Project Name:" line of a saved plan, read in chunks; `default` if it has none."""
+    marker = 'Project Name:'
+    carry = ''
+    with open(path, encoding='utf-8', errors='replace', newline='') as f:
+        while True:
+            chunk = f.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                return default
+            text = carry + chunk
+            found = text.find(marker)
+            if found >= 0:
+                rest = text[found + len(marker):]
+                while '\n' not in rest:
+                    more = f.read(DOWNLOAD_CHUNK_SIZE)
+                    if not more:
+                        break
+                    rest += more
+                return rest.split('\n')[0].strip()
+            carry = text[-(len(marker) - 1):]
+
+def write_cline_rules(source_path: str, original_filename: str, destination: str) -> int:
+    """
+    Write the .cline rules of a saved plan to `destination` without loading it whole.
+    
+    Produces the same text as convert_to_cline_rules() and returns its length.
+    """
+    project_name = plan_project_name(source_path, original_filename.replace('_Project_Plan.txt', '').replace('_', ' '))
+    head, tail = cline_rules_template(project_name, original_filename)
+    size = len(head) + len(tail)
+    with open(source_path, encoding='utf-8', errors='replace', newline='') as source, \
+            open(destination, 'w', encoding='utf-8', newline='') as out:
+        out.write(head)
+        while True:
+            chunk = source.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            escaped = escape_cline_content(chunk)
+            size += len(escaped)
+            out.write(escaped)
+        out.write(tail)
+    return size
 
 # ---------------------------
 # Tool 6: List Firebase Files
 # ---------------------------
-@app.tool
+def firestore_documents_url(project_id: str, collection: str, limit: int) -> str:
+    """Firestore REST API URL listing the first `limit` documents of a collection."""
+    base_url = f"https://firestore.googleapis.com/v1/projects/{project_id}/databases/(default)/documents/{collection}"
+    return f"{base_url}?pageSize={limit}"
+
+def firebase_files_listing(response, collection: str, project_id: str) -> dict:
+    """Describe a Firestore documents listing response (from requests or httpx)."""
+    if response.status_code == 200:
+        documents = response.json().get('documents', [])
+        
+        files_list = []
+        for doc in documents:
+            doc_id = doc['name'].split('/')[-1]
+            fields = doc.get('fields', {})
+            
+            # Extract relevant information
+            file_info = {
+                "document_id": doc_id,
+                "project_name": fields.get('project_name', {}).get('stringValue', 'Unknown'),
+                "project_type": fields.get('project_type', {}).get('stringValue', 'Unknown'),
+                "complexity": fields.get('complexity', {}).get('stringValue', 'Unknown'),
+                "created_at": fields.get('created_at', {}).get('timestampValue', 'Unknown'),
+                "download_url": f"https://us-central1-{project_id}.cloudfunctions.net/downloadTextPlan"
+            }
+            
+            # Add filename if available
+            if 'plan_filename' in fields:
+                file_info['filename'] = fields['plan_filename'].get('stringValue', '')
+            
+            files_list.append(file_info)
+        
+        return {
+            "success": True,
+            "files_count": len(files_list),
+            "files": files_list,
+            "collection": collection,
+            "project_id": project_id
+        }
+    else:
+        return {
+            "success": False,
+            "error": f"Firebase API error: {response.status_code}",
+            "message": response.text
+        }
+
+def firebase_listing_failed(error: Exception) -> dict:
+    return {
+        "success": False,
+        "error": f"Error listing Firebase files: {str(error)}"
+    }
+
 def list_firebase_files(
     project_id: str = "mcptest-468919",
     collection: str = "project_requirements",
     limit: int = 10
+) -> dict:
+    """
+    Blocking version of the list_firebase_files tool below, for direct
+    Python callers. Takes the same arguments.
+    """
+    try:
+        response = firebase_session().get(firestore_documents_url(project_id, collection, limit))
+        return firebase_files_listing(response, collection, project_id)
+    except Exception as e:
+        return firebase_listing_failed(e)
+
+@app.tool(name="list_firebase_files")
+async def list_firebase_files_async(
+    project_id: str = "mcptest-468919",
+    collection: str = "project_requirements",
+    limit: int = 10
 ) -> dict:
     """
     Lists available files/documents in Firebase that can be downloaded.
@@ -512,59 +859,81 @@ def list_firebase_files(
     """
     
     try:
-        # Construct Firebase REST API URL for Firestore
-        base_url = f"https://firestore.googleapis.com/v1/projects/{project_id}/databases/(default)/documents/{collection}"
-        
-        # Make request to list documents
-        response = requests.get(f"{base_url}?pageSize={limit}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            documents = data.get('documents', [])
-            
-            files_list = []
-            for doc in documents:
-                doc_id = doc['name'].split('/')[-1]
-                fields = doc.get('fields', {})
-                
-                # Extract relevant information
-                file_info = {
-                    "document_id": doc_id,
-                    "project_name": fields.get('project_name', {}).get('stringValue', 'Unknown'),
-                    "project_type": fields.get('project_type', {}).get('stringValue', 'Unknown'),
-                    "complexity": fields.get('complexity', {}).get('stringValue', 'Unknown'),
-                    "created_at": fields.get('created_at', {}).get('timestampValue', 'Unknown'),
-                    "download_url": f"https://us-central1-{project_id}.cloudfunctions.net/downloadTextPlan"
-                }
-                
-                # Add filename if available
-                if 'plan_filename' in fields:
-                    file_info['filename'] = fields['plan_filename'].get('stringValue', '')
-                
-                files_list.append(file_info)
-            
-            return {
-                "success": True,
-                "files_count": len(files_list),
-                "files": files_list,
-                "collection": collection,
-                "project_id": project_id
-            }
-        else:
-            return {
-                "success": False,
-                "error": f"Firebase API error: {response.status_code}",
-                "message": response.text
-            }
-            
+        response = await firebase_async_client().get(firestore_documents_url(project_id, collection, limit))
+        return firebase_files_listing(response, collection, project_id)
     except Exception as e:
-        return {
-            "success": False,
-            "error": f"Error listing Firebase files: {str(e)}"
-        }
+        return firebase_listing_failed(e)
+
+# ---------------------------
+# Tool 7: Server Statistics
+# ---------------------------
+@app.tool
+def server_stats() -> dict:
+    """
+    Returns per-tool statistics for this server process: call and error
+    counts, exceptions by type, and count/mean/p50/p95/p99 of wall time,
+    CPU time, argument size and result size.
+    """
+    return tool_stats.snapshot()
 
 # ---------------------------
 # Run MCP server
 # ---------------------------
+# MCP_TRANSPORT=stdio (the default) serves a single client on stdin/stdout.
+# "http" (streamable HTTP) and "sse" serve many concurrent clients over the
+# network; MCP_WORKERS=N serves them from N processes sharing one socket.
+MCP_TRANSPORT = os.environ.get("MCP_TRANSPORT", "stdio").lower()
+MCP_HTTP_PATH = os.environ.get("MCP_HTTP_PATH", "/mcp")
+
+def create_http_app(transport: str = "http"):
+    """
+    ASGI app serving the tools over streamable HTTP or SSE.
+
+    Streamable HTTP runs stateless with plain JSON responses: no session
+    lives in the process, so any uvicorn worker can answer any request and
+    each tool call is one POST answered with one JSON body. SSE keeps a
+    session per stream and therefore needs a single worker.
+    """
+    if transport == "sse":
+        return app.http_app(transport="sse")
+    return app.http_app(path=MCP_HTTP_PATH, stateless_http=True, json_response=True)
+
+def __getattr__(name):
+    # `uvicorn sever:http_app` builds the ASGI app on first use, so stdio
+    # sessions never pay for it
+    if name == "http_app":
+        http_app = create_http_app("sse" if MCP_TRANSPORT == "sse" else "http")
+        globals()["http_app"] = http_app
+        return http_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def serve_http(transport: str, host: str, port: int, workers: int = 1):
+    """Serve the HTTP transport with uvicorn, forking `workers` processes sharing one socket."""
+    import socket
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+
+    if workers > 1 and transport == "sse":
+        raise SystemExit("The SSE transport keeps sessions in memory; run it with MCP_WORKERS=1")
+    if workers == 1:
+        uvicorn.run(create_http_app(transport), host=host, port=port, access_log=False)
+        return
+    # Workers import the app by name; MCP_TRANSPORT in the environment picks the transport
+    config = uvicorn.Config("sever:http_app", host=host, port=port, workers=workers, access_log=False)
+    # uvicorn creates the shared socket with proto 0, and asyncio only sets
+    # TCP_NODELAY on sockets whose proto is IPPROTO_TCP. Without it every
+    # keep-alive response waits ~40 ms for a delayed ACK. Re-wrapping the
+    # descriptor lets Python detect the protocol.
+    sock = socket.socket(fileno=config.bind_socket().detach())
+    Multiprocess(config, sockets=[sock]).run()
+
 if __name__ == "__main__":
-    app.run()
+    if MCP_TRANSPORT == "stdio":
+        app.run()
+    else:
+        serve_http(
+            MCP_TRANSPORT,
+            host=os.environ.get("MCP_HOST", "127.0.0.1"),
+            port=int(os.environ.get("MCP_PORT", "8001")),
+            workers=int(os.environ.get("MCP_WORKERS", "1"))
+        )
@@ -0,0 +1,60 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+
+While a call for a key is in flight, later callers with the same key wait on
+that execution instead of starting their own, and every waiter receives the
+same result (or exception).
+"""
+
+import asyncio
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent executions by key.
+
+    The shared execution is only cancelled once every caller waiting on it
+    has been cancelled, so one client disconnecting doesn't fail the others.
+    """
+
+    def __init__(self):
+        self._flights = {}  # key -> [task, waiter_count]
+        self.executions = 0
+        self.coalesced = 0
+
+    def __contains__(self, key) -> bool:
+        return key in self._flights
+
+    async def do(self, key, fn):
+        """Return the result of `await fn()`, sharing one execution per key."""
+        flight = self._flights.get(key)
+        if flight is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            flight = self._flights[key] = [task, 0]
+            task.add_done_callback(lambda _: self._finish(key, flight))
+        else:
+            self.coalesced += 1
+        flight[1] += 1
+        try:
+            return await asyncio.shield(flight[0])
+        except asyncio.CancelledError:
+            flight[1] -= 1
+            if flight[1] == 0 and not flight[0].done():
+                flight[0].cancel()
+            raise
+
+    def _finish(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight[0].cancelled():
+            flight[0].exception()  # mark retrieved even if every waiter left
+
+    def stats(self) -> dict:
+        calls = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._flights),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalescing_ratio": round(self.coalesced / calls, 4) if calls else 0.0
+        }
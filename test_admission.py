@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script for per-endpoint admission control
+Usage: python test_admission.py
+"""
+
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from fastapi import FastAPI
+
+from admission import AdmissionMiddleware, endpoint_limiters
+from bulkhead import AdaptiveBulkhead
+
+def make_app(limiters: dict) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.2)
+        return {"ok": True}
+
+    @app.get("/free")
+    async def free():
+        return {"ok": True}
+
+    app.add_middleware(AdmissionMiddleware, limiters=limiters)
+    return app
+
+async def fire(app: FastAPI, path: str, count: int) -> list:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*[client.get(path) for _ in range(count)])
+
+def test_excess_requests_are_shed_with_429():
+    print("=== Testing load shedding ===")
+    limiters = endpoint_limiters(["/slow"], max_concurrent=2, max_queue=2, queue_timeout=5)
+    responses = asyncio.run(fire(make_app(limiters), "/slow", 10))
+    statuses = sorted(r.status_code for r in responses)
+    print(f"Statuses: {statuses}")
+    assert statuses == [200] * 4 + [429] * 6
+    rejected = next(r for r in responses if r.status_code == 429)
+    assert rejected.headers["retry-after"] == "5"
+    assert "error" in rejected.json()
+    assert limiters["/slow"].rejected["queue_full"] == 6
+
+def test_queue_deadline_and_unlimited_paths():
+    print("=== Testing queue-time deadline ===")
+    limiters = endpoint_limiters(["/slow"], max_concurrent=1, max_queue=10, queue_timeout=0.05)
+    app = make_app(limiters)
+    statuses = sorted(r.status_code for r in asyncio.run(fire(app, "/slow", 3)))
+    assert statuses == [200, 429, 429]
+    assert limiters["/slow"].rejected["queue_timeout"] == 2
+    assert all(r.status_code == 200 for r in asyncio.run(fire(app, "/free", 20)))
+
+def test_overrides_select_adaptive_limit():
+    print("=== Testing per-endpoint overrides ===")
+    limiters = endpoint_limiters(
+        ["/a", "/b"], max_concurrent=8,
+        overrides={"/b": {"adaptive": True, "latency_target": 0.1, "min_concurrent": 2}}
+    )
+    assert type(limiters["/a"]).__name__ == "Bulkhead"
+    assert isinstance(limiters["/b"], AdaptiveBulkhead)
+    assert limiters["/b"].latency_target == 0.1 and limiters["/b"].min_concurrent == 2
+
+if __name__ == "__main__":
+    test_excess_requests_are_shed_with_429()
+    test_queue_deadline_and_unlimited_paths()
+    test_overrides_select_adaptive_limit()
+    print("\nAll admission tests passed!")
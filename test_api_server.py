@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Test script for the api_server.py FastAPI app (runs in-process, no server needed)
+Usage: python test_api_server.py
+"""
+
+import asyncio
+import json
+import sys
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("MCP_DISPATCH_MODE", "inprocess")
+
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import api_server
+
+def test_etag_revalidation():
+    print("=== Testing ETag / If-None-Match ===")
+    with TestClient(api_server.app) as client:
+        params = {"use_case": "webapp"}
+        first = client.get("/provide_base_template", params=params)
+        etag = first.headers["etag"]
+        print(f"ETag: {etag}")
+        assert first.status_code == 200
+        second = client.get("/provide_base_template", params=params, headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.headers["etag"] == etag
+
+def test_compressed_variants_are_negotiated_and_stored_once():
+    print("=== Testing compressed responses ===")
+    params = {
+        "process_name": "Compression check",
+        "primary_goal": "save_time",
+        "trigger_type": "schedule",
+        "trigger_details": "Nightly",
+        "success_outcome": "Report sent"
+    }
+    with TestClient(api_server.app) as client:
+        plain = client.get("/analyze_process_automation", params=params, headers={"Accept-Encoding": "identity"})
+        packed = client.get("/analyze_process_automation", params=params, headers={"Accept-Encoding": "gzip"})
+        again = client.get("/analyze_process_automation", params=params,
+                           headers={"Accept-Encoding": "gzip", "If-None-Match": packed.headers["etag"]})
+    print(f"identity {plain.headers['content-length']} bytes, gzip {packed.headers['content-length']} bytes")
+    assert "content-encoding" not in plain.headers
+    assert packed.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in packed.headers["vary"]
+    assert int(packed.headers["content-length"]) < int(plain.headers["content-length"])
+    assert packed.json() == plain.json()
+    assert packed.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert again.status_code == 304
+    defaults = dict.fromkeys(["current_steps", "stakeholders", "frequency", "pain_points"], "not specified")
+    _, encoded = api_server.cache.lookup(api_server.cache_key("analyze_process_automation", {**params, **defaults}))
+    assert set(encoded.variants) == {"gzip"}
+
+def test_batch_preserves_order_and_reports_item_errors():
+    print("=== Testing POST /batch ===")
+    items = [
+        {"tool": "provide_advanced_template", "arguments": {"base_template": f"Screen {i}"}}
+        for i in range(20)
+    ]
+    items.append({"tool": "convert_to_cline_rules", "arguments": {"content": "x", "original_filename": "x.txt"}})
+    items.append({"tool": "collect_requirements", "arguments": {"project_name": "Missing args"}})
+    with TestClient(api_server.app) as client:
+        response = client.post("/batch", json=items)
+    results = response.json()["results"]
+    print(f"Item 0: {results[0]['result']['content'][0]['text'][:30]!r}")
+    assert response.status_code == 200
+    assert len(results) == 22
+    for i in range(20):
+        assert results[i]["result"]["content"][0]["text"].startswith(f"Screen {i}\n")
+    assert "error" in results[20]
+    assert results[21]["result"]["isError"] is True
+
+def test_batch_streams_ndjson():
+    print("=== Testing streamed NDJSON batch ===")
+    items = [
+        {"tool": "analyze_process_automation", "arguments": {
+            "process_name": f"Process {i}",
+            "primary_goal": "save_time",
+            "trigger_type": "schedule",
+            "trigger_details": "Nightly",
+            "success_outcome": "Report sent"
+        }}
+        for i in range(10)
+    ]
+    items.append({"tool": "unknown_tool", "arguments": {}})
+    with TestClient(api_server.app) as client:
+        with client.stream("POST", "/batch", json=items, headers={"Accept": "application/x-ndjson"}) as response:
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+    print(f"Received {len(lines)} lines")
+    assert sorted(line["index"] for line in lines) == list(range(11))
+    by_index = {line["index"]: line for line in lines}
+    assert "error" in by_index[10]
+    assert not by_index[0]["result"]["isError"]
+
+def test_metrics_endpoint():
+    print("=== Testing /metrics ===")
+    with TestClient(api_server.app) as client:
+        client.get("/provide_advanced_template", params={"base_template": "Metrics check"})
+        client.get("/provide_advanced_template", params={"base_template": "Metrics check"})
+        response = client.get("/metrics")
+    body = response.text
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'mcp_tool_requests_total{tool="provide_advanced_template",outcome="cache_hit"}' in body
+    assert 'mcp_tool_phase_seconds_count{tool="provide_advanced_template",phase="execute"}' in body
+    assert "# TYPE mcp_tool_request_seconds histogram" in body
+    assert "mcp_cache_hits_total" in body
+    assert "mcp_singleflight_coalescing_ratio" in body
+
+def test_batch_size_limit():
+    print("=== Testing batch size limit ===")
+    items = [{"tool": "provide_base_template", "arguments": {"use_case": "api"}}] * (api_server.BATCH_MAX_ITEMS + 1)
+    with TestClient(api_server.app) as client:
+        assert client.post("/batch", json=items).status_code == 413
+
+def test_slow_network_tools_do_not_starve_fast_tools():
+    print("=== Testing bulkhead isolation ===")
+    registry = api_server.in_process["network"].registry
+    original = registry["list_firebase_files"]
+    registry["list_firebase_files"] = lambda **kwargs: time.sleep(0.5) or {"files": []}
+
+    async def main():
+        slow = [
+            asyncio.ensure_future(api_server.dispatch("list_firebase_files", {"limit": i}, 5))
+            for i in range(20)
+        ]
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        await api_server.dispatch("provide_advanced_template", {"base_template": "Fast"}, 5)
+        fast_seconds = time.perf_counter() - started
+        network = api_server.bulkheads["network"].stats()
+        for task in slow:
+            task.cancel()
+        await asyncio.gather(*slow, return_exceptions=True)
+        return fast_seconds, network
+
+    try:
+        fast_seconds, network = asyncio.run(main())
+    finally:
+        registry["list_firebase_files"] = original
+    print(f"Fast call took {fast_seconds * 1000:.1f} ms with {network['active']} slow calls running")
+    assert network["active"] == network["max_concurrent"]
+    assert network["queued"] == 20 - network["max_concurrent"]
+    assert fast_seconds < 0.25
+
+def test_websocket_multiplexes_tagged_calls():
+    print("=== Testing /ws multiplexing ===")
+    registry = api_server.in_process["network"].registry
+    original = registry["list_firebase_files"]
+    registry["list_firebase_files"] = lambda **kwargs: time.sleep(0.3) or {"files": [], "limit": kwargs["limit"]}
+    try:
+        with TestClient(api_server.app) as client, client.websocket_connect("/ws") as ws:
+            ws.send_json({"id": "slow", "tool": "list_firebase_files", "arguments": {"limit": 1}})
+            ws.send_json({"id": 7, "tool": "provide_base_template", "arguments": {"use_case": "webapp"}})
+            ws.send_json({"id": "bad", "tool": "convert_to_cline_rules", "arguments": {}})
+            ws.send_json({"id": "gone", "tool": "list_firebase_files", "arguments": {"limit": 2}})
+            ws.send_json({"cancel": "gone"})
+            ws.send_text("not json")
+            replies = [ws.receive_json() for _ in range(5)]
+    finally:
+        registry["list_firebase_files"] = original
+    print(f"Reply order: {[r['id'] for r in replies]}")
+    by_id = {r["id"]: r for r in replies}
+    assert replies[-1]["id"] == "slow"  # answered last although sent first
+    with TestClient(api_server.app) as client:
+        assert by_id[7]["result"] == client.get("/provide_base_template", params={"use_case": "webapp"}).json()
+    assert by_id["bad"]["error"].startswith("Unknown tool")
+    assert by_id["gone"]["error"] == "Cancelled"
+    assert "error" in by_id[None]
+    assert not by_id["slow"]["result"]["isError"]
+
+def test_deadline_returns_504():
+    print("=== Testing X-Request-Timeout ===")
+    registry = api_server.in_process["network"].registry
+    original = registry["list_firebase_files"]
+    registry["list_firebase_files"] = lambda **kwargs: time.sleep(0.3) or {"files": [], "limit": kwargs["limit"]}
+    try:
+        with TestClient(api_server.app) as client:
+            started = time.perf_counter()
+            late = client.get("/list_firebase_files", params={"limit": 1}, headers={"X-Request-Timeout": "0.05"})
+            elapsed = time.perf_counter() - started
+            ignored = [
+                client.get("/list_firebase_files", params={"limit": 2 + i}, headers={"X-Request-Timeout": value})
+                for i, value in enumerate(["nan", "-5", "0", "inf", "soon"])
+            ]
+    finally:
+        registry["list_firebase_files"] = original
+    print(f"504 after {elapsed * 1000:.0f} ms: {late.json()}")
+    assert late.status_code == 504 and elapsed < 0.25
+    assert "0.05s" in late.json()["error"]
+    assert [response.status_code for response in ignored] == [200] * 5
+    assert api_server.parse_deadline("2") == 2 and api_server.parse_deadline("1e9") == api_server.TOOL_TIMEOUT
+
+def test_client_disconnect_cancels_the_call():
+    print("=== Testing cancellation on client disconnect ===")
+    registry = api_server.in_process["network"].registry
+    original = registry["list_firebase_files"]
+    cancelled = []
+
+    async def list_forever(**kwargs):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(kwargs["limit"])
+            raise
+
+    async def receive():
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    async def main():
+        request = Request({"type": "http", "method": "GET", "path": "/list_firebase_files", "headers": []}, receive)
+        started = time.perf_counter()
+        response = await api_server.call_mcp_tool(request, "list_firebase_files", limit=42)
+        await asyncio.sleep(0)  # let the cancellation reach the tool
+        return response, time.perf_counter() - started
+
+    registry["list_firebase_files"] = list_forever
+    try:
+        response, elapsed = asyncio.run(main())
+    finally:
+        registry["list_firebase_files"] = original
+    print(f"Answered {response.status_code} after {elapsed * 1000:.0f} ms")
+    assert response.status_code == 499 and elapsed < 1
+    assert cancelled == [42]
+
+def test_exhausted_pool_is_shed_with_503():
+    print("=== Testing 503 on an exhausted session pool ===")
+    original = api_server.dispatch
+
+    async def exhausted(tool_name, arguments, timeout, timings=None):
+        raise api_server.PoolExhaustedError("Too many requests waiting for an MCP session")
+
+    api_server.dispatch = exhausted
+    try:
+        with TestClient(api_server.app) as client:
+            response = client.get("/list_firebase_files", params={"limit": 99})
+    finally:
+        api_server.dispatch = original
+    assert response.status_code == 503 and response.headers["retry-after"] == "1"
+
+def test_short_deadline_does_not_fail_coalesced_callers():
+    print("=== Testing per-caller deadlines on a shared execution ===")
+    registry = api_server.in_process["network"].registry
+    original = registry["list_firebase_files"]
+    registry["list_firebase_files"] = lambda **kwargs: time.sleep(0.2) or {"files": [], "limit": kwargs["limit"]}
+
+    async def call(deadline: float):
+        return await asyncio.wait_for(api_server.run_tool("list_firebase_files", {"limit": 7}, deadline), deadline)
+
+    async def main():
+        return await asyncio.gather(call(0.05), call(5), return_exceptions=True)
+
+    try:
+        impatient, patient = asyncio.run(main())
+    finally:
+        registry["list_firebase_files"] = original
+    print(f"Impatient: {type(impatient).__name__}, patient: {patient[0]['structuredContent']}")
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient[0]["structuredContent"] == {"files": [], "limit": 7}
+
+class PlanHandler(BaseHTTPRequestHandler):
+    """Serves a plan at /plan and redirects everything else to it."""
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        PlanHandler.requests.append(self.path)
+        if self.path.startswith("/plan"):
+            body = "Project Name: Over HTTP\nNo files on the server.\n".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+        else:
+            body = b""
+            self.send_response(302)
+            self.send_header("Location", "/plan")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_http_downloads_return_content_and_stay_on_firebase():
+    print("=== Testing /download_firebase_txt_file ===")
+    import sever
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PlanHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    local = f"http://127.0.0.1:{server.server_port}"
+    PlanHandler.requests.clear()
+    cwd = os.getcwd()
+    original = sever.is_firebase_url, sever.MAX_CONTENT_BYTES
+    try:
+        with tempfile.TemporaryDirectory() as directory, TestClient(api_server.app) as client:
+            os.makedirs(os.path.join(directory, "work"))
+            os.chdir(os.path.join(directory, "work"))  # "../escaped" would land in `directory`
+
+            def download(**params) -> dict:
+                return client.get("/download_firebase_txt_file", params=params).json()["structuredContent"]
+
+            refused = [
+                download(firebase_url=f"{local}/plan", filename="../escaped"),
+                download(firebase_url="downloadTextPlan", project_id=f"x@127.0.0.1:{server.server_port}/plan#"),
+                download(firebase_url="https://us-central1-p.cloudfunctions.net/downloadTextPlan", filename="../escaped"),
+                download(firebase_url="https://us-central1-p.cloudfunctions.net/downloadTextPlan", filename="a\\b")
+            ]
+            assert PlanHandler.requests == []
+            # Let the local server stand in for Firebase
+            sever.is_firebase_url = lambda url: url.startswith(local)
+            content = download(firebase_url=f"{local}/plan", filename="Over_HTTP")
+            redirected = download(firebase_url=f"{local}/elsewhere", filename="Over_HTTP")
+            sever.MAX_CONTENT_BYTES = 16  # has to fit in one JSON-RPC line
+            too_large = download(firebase_url=f"{local}/plan", filename="Over_HTTP")
+            written = [name for _, _, names in os.walk(directory) for name in names]
+    finally:
+        sever.is_firebase_url, sever.MAX_CONTENT_BYTES = original
+        os.chdir(cwd)
+        server.shutdown()
+    print(f"Refused: {[result['error'] for result in refused]}")
+    assert not any(result["success"] for result in refused)
+    assert "Firebase hosts" in refused[0]["error"] and "Firebase hosts" in refused[1]["error"]
+    assert "path separators" in refused[2]["error"] and "path separators" in refused[3]["error"]
+    assert content["success"] and content["content"] == "Project Name: Over HTTP\nNo files on the server.\n"
+    assert content["filename"] == "Over_HTTP.txt" and "original_file" not in content
+    assert not redirected["success"] and "too large" in too_large["error"]
+    assert PlanHandler.requests == ["/plan", "/elsewhere", "/plan"]
+    assert written == []
+
+if __name__ == "__main__":
+    test_etag_revalidation()
+    test_compressed_variants_are_negotiated_and_stored_once()
+    test_batch_preserves_order_and_reports_item_errors()
+    test_batch_streams_ndjson()
+    test_metrics_endpoint()
+    test_batch_size_limit()
+    test_slow_network_tools_do_not_starve_fast_tools()
+    test_websocket_multiplexes_tagged_calls()
+    test_deadline_returns_504()
+    test_client_disconnect_cancels_the_call()
+    test_exhausted_pool_is_shed_with_503()
+    test_short_deadline_does_not_fail_coalesced_callers()
+    test_http_downloads_return_content_and_stay_on_firebase()
+    print("\nAll API server tests passed!")
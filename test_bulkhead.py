@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test script for bulkhead concurrency compartments
+Usage: python test_bulkhead.py
+"""
+
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bulkhead import AdaptiveBulkhead, Bulkhead, BulkheadFullError
+
+def test_limits_concurrency_in_fifo_order():
+    print("=== Testing concurrency limit ===")
+    bulkhead = Bulkhead("test", max_concurrent=2, max_queue=10)
+    running, peak, order = [0], [0], []
+
+    async def call(i):
+        async with bulkhead.slot():
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            order.append(i)
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+
+    async def main():
+        await asyncio.gather(*[call(i) for i in range(8)])
+
+    asyncio.run(main())
+    print(f"Peak concurrency: {peak[0]}")
+    assert peak[0] == 2
+    assert order == list(range(8))
+    assert bulkhead.active == 0 and bulkhead.queued == 0
+
+def test_rejects_when_queue_full_or_wait_too_long():
+    print("=== Testing rejection ===")
+    bulkhead = Bulkhead("test", max_concurrent=1, max_queue=1, queue_timeout=0.05)
+
+    async def hold(seconds):
+        async with bulkhead.slot():
+            await asyncio.sleep(seconds)
+
+    async def main():
+        holder = asyncio.ensure_future(hold(0.2))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(hold(0))
+        await asyncio.sleep(0)
+        try:
+            await hold(0)
+            raise AssertionError("expected queue_full rejection")
+        except BulkheadFullError:
+            pass
+        try:
+            await queued
+            raise AssertionError("expected queue_timeout rejection")
+        except BulkheadFullError:
+            pass
+        await holder
+
+    asyncio.run(main())
+    print(f"Rejected: {bulkhead.rejected}")
+    assert bulkhead.rejected == {"queue_full": 1, "queue_timeout": 1}
+    assert bulkhead.active == 0
+
+def test_cancelled_waiter_does_not_leak_slot():
+    print("=== Testing cancelled waiters ===")
+    bulkhead = Bulkhead("test", max_concurrent=1, max_queue=5)
+
+    async def main():
+        await bulkhead.acquire()
+        waiter = asyncio.ensure_future(bulkhead.acquire())
+        await asyncio.sleep(0)
+        assert bulkhead.queued == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert bulkhead.queued == 0
+        bulkhead.release()
+        await asyncio.wait_for(bulkhead.acquire(), 0.1)
+        bulkhead.release()
+
+    asyncio.run(main())
+    assert bulkhead.active == 0 and bulkhead.queued == 0
+
+def test_adaptive_limit_follows_latency():
+    print("=== Testing AIMD limit ===")
+    bulkhead = AdaptiveBulkhead("test", max_concurrent=10, min_concurrent=2, latency_target=0.1, backoff=0.5)
+    bulkhead.observe(started=1.0, seconds=0.5)
+    assert bulkhead.limit == 5
+    # Slow calls that started before the decrease don't cut the limit again
+    bulkhead.observe(started=1.0, seconds=0.5)
+    assert bulkhead.limit == 5
+    for _ in range(5):
+        bulkhead.observe(started=bulkhead._last_decrease, seconds=0.01)
+    print(f"Limit after 5 fast calls: {bulkhead.limit:.2f}")
+    assert 5.9 < bulkhead.limit < 6.1
+    for _ in range(10):
+        bulkhead.observe(started=bulkhead._last_decrease, seconds=1.0)
+    assert bulkhead.limit == 2
+
+def test_adaptive_limit_counts_failures_as_slow():
+    print("=== Testing AIMD limit on failed calls ===")
+    bulkhead = AdaptiveBulkhead("test", max_concurrent=10, latency_target=10, backoff=0.5)
+
+    async def time_out():
+        async with bulkhead.slot():
+            await asyncio.sleep(1)
+
+    async def main():
+        try:
+            await asyncio.wait_for(time_out(), 0.01)
+        except asyncio.TimeoutError:
+            pass
+        assert bulkhead.limit == 5
+        await asyncio.sleep(0.01)  # start after the first decrease
+        try:
+            async with bulkhead.slot():
+                raise RuntimeError("session lost")
+        except RuntimeError:
+            pass
+        assert bulkhead.limit == 2.5
+        assert bulkhead.active == 0
+
+    asyncio.run(main())
+
+if __name__ == "__main__":
+    test_limits_concurrency_in_fifo_order()
+    test_rejects_when_queue_full_or_wait_too_long()
+    test_cancelled_waiter_does_not_leak_slot()
+    test_adaptive_limit_follows_latency()
+    test_adaptive_limit_counts_failures_as_slow()
+    print("\nAll bulkhead tests passed!")
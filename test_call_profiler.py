@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for opt-in per-call profiling of MCP tools
+Usage: python test_call_profiler.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastmcp import Client, FastMCP
+
+from call_profiler import CallProfiler, CallProfilerMiddleware
+from tool_stats import ToolStats, ToolStatsMiddleware
+
+def spin(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def make_server(profiler: CallProfiler) -> FastMCP:
+    server = FastMCP("profile-test")
+    server.add_middleware(CallProfilerMiddleware(profiler))
+    server.add_middleware(ToolStatsMiddleware(ToolStats()))
+
+    @server.tool
+    def crunch(seconds: float) -> str:
+        spin(seconds)
+        return "done"
+
+    @server.tool
+    async def fetch() -> str:
+        await asyncio.sleep(0.1)
+        return "fetched"
+
+    return server
+
+def read_profiles(directory: str) -> dict:
+    profiles = {}
+    for name in sorted(os.listdir(directory)):
+        assert name.endswith(".collapsed"), name
+        stacks = {}
+        with open(os.path.join(directory, name)) as f:
+            for line in f:
+                stack, weight = line.rsplit(" ", 1)
+                stacks[stack] = int(weight)
+        profiles[name] = stacks
+    return profiles
+
+def call_all(server: FastMCP, calls: list):
+    async def main():
+        async with Client(server) as client:
+            for name, arguments, meta in calls:
+                await client.call_tool(name, arguments, meta=meta)
+
+    asyncio.run(main())
+
+def test_every_nth_call_is_profiled():
+    print("=== Testing 1-in-N profiling ===")
+    with tempfile.TemporaryDirectory() as directory:
+        call_all(make_server(CallProfiler(directory, every=2, interval=0.002)),
+                 [("crunch", {"seconds": 0.05}, None)] * 4)
+        profiles = read_profiles(directory)
+        print(f"Profiles: {list(profiles)}")
+        assert len(profiles) == 2 and all(name.startswith("crunch-") for name in profiles)
+        for stacks in profiles.values():
+            total_ms = sum(stacks.values()) / 1000
+            assert 50 <= total_ms < 500, total_ms
+            spinning = sum(us for stack, us in stacks.items() if ";spin (test_call_profiler.py:" in stack)
+            assert spinning / 1000 >= 25, stacks
+            assert all(stack.startswith("crunch;") or stack == "crunch" for stack in stacks)
+            assert all(".crunch (test_call_profiler.py:" in stack for stack in stacks if stack != "crunch")
+
+def test_only_slow_calls_are_kept():
+    print("=== Testing latency threshold ===")
+    with tempfile.TemporaryDirectory() as directory:
+        call_all(make_server(CallProfiler(directory, slow_ms=40, interval=0.002)), [
+            ("crunch", {"seconds": 0.001}, None),
+            ("crunch", {"seconds": 0.08}, None),
+            ("crunch", {"seconds": 0.001}, {"profile": True})
+        ])
+        names = list(read_profiles(directory))
+        print(f"Profiles: {names}")
+        assert len(names) == 2
+        walls = sorted(int(name.rsplit("-", 1)[1][:-len("ms.collapsed")]) for name in names)
+        assert walls[0] < 40 <= walls[1]  # the requested one is kept even though it was fast
+
+def test_async_tools_show_what_they_await():
+    print("=== Testing async tool profiles ===")
+    with tempfile.TemporaryDirectory() as directory:
+        call_all(make_server(CallProfiler(directory, every=1, interval=0.002)), [("fetch", {}, None)])
+        (stacks,) = read_profiles(directory).values()
+        waiting = sum(us for stack, us in stacks.items() if stack.startswith("fetch;make_server.<locals>.fetch (") and ";sleep (" in stack)
+        print(f"Awaiting asyncio.sleep: {waiting / 1000:.1f} ms")
+        assert waiting / 1000 >= 80
+
+def test_off_by_default():
+    print("=== Testing sever.py without MCP_PROFILE_* ===")
+    import sever
+    assert not any(isinstance(middleware, CallProfilerMiddleware) for middleware in sever.app.middleware)
+
+if __name__ == "__main__":
+    test_every_nth_call_is_profiled()
+    test_only_slow_calls_are_kept()
+    test_async_tools_show_what_they_await()
+    test_off_by_default()
+    print("\nAll call profiler tests passed!")
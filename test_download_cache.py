@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Test script for the content-addressed Firebase download cache (uses a local server, no network needed)
+Usage: python test_download_cache.py
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastmcp import Client
+
+from download_cache import DownloadCache
+from firebase_http import DownloadMismatch, StreamingDownload
+
+PLAN = "Project Name: Cached Plan\n" + "Ship it.\n" * 500
+ETAG = '"plan-v1"'
+LAST_MODIFIED = "Wed, 01 Jul 2026 10:00:00 GMT"
+
+class ValidatingHandler(BaseHTTPRequestHandler):
+    """Serves PLAN with validators and answers matching conditional requests with 304."""
+    protocol_version = "HTTP/1.1"
+    requests = []  # (path, If-None-Match, If-Modified-Since, status)
+
+    def do_GET(self):
+        conditional = self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")
+        status = 304 if conditional[0] == ETAG else 200
+        ValidatingHandler.requests.append((self.path, *conditional, status))
+        self.send_response(status)
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        if status == 304:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = PLAN.encode()
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Disposition", 'attachment; filename="Cached_Project_Plan.txt"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_server() -> ThreadingHTTPServer:
+    ValidatingHandler.requests.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ValidatingHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def save(path: str, content: bytes) -> StreamingDownload:
+    with StreamingDownload(path, max_bytes=0) as download:
+        download.write(content)
+    return download
+
+def test_blobs_are_content_addressed_and_evicted_lru():
+    print("=== Testing content addressing and LRU eviction ===")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DownloadCache(os.path.join(directory, "cache"), max_bytes=250)
+        a = save(os.path.join(directory, "a.txt"), b"a" * 100)
+        b = save(os.path.join(directory, "b.txt"), b"b" * 100)
+        cache.store("a1", "https://x/a", a, {"etag": '"a"'})
+        cache.store("a2", "https://x/a?copy", a, {})  # same content, stored once
+        cache.store("b", "https://x/b", b, {"last-modified": LAST_MODIFIED})
+        assert cache.stats()["bytes"] == 200 and cache.stats()["entries"] == 3
+        assert cache.lookup("a1") is not None  # "a1" (and its blob) become most recently used
+        c = save(os.path.join(directory, "c.txt"), b"c" * 100)
+        cache.store("c", "https://x/c", c, {})  # evicts "b"; "a2" shares a kept blob
+        stats = cache.stats()
+        print(f"Cache stats: {stats}")
+        assert cache.lookup("b") is None and cache.lookup("a2") is not None
+        assert not os.path.exists(cache.blob_path(b.sha256))
+        assert (stats["entries"], stats["bytes"], stats["evictions"]) == (3, 200, 1)
+        entry = cache.lookup("a1")
+        assert entry.sha256 == hashlib.sha256(b"a" * 100).hexdigest() and entry.etag == '"a"'
+        assert cache.validators(entry) == {"If-None-Match": '"a"'}
+
+def test_byte_total_is_kept_in_a_counter():
+    print("=== Testing the blob byte counter ===")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DownloadCache(os.path.join(directory, "cache"), max_bytes=250)
+        a = save(os.path.join(directory, "a.txt"), b"a" * 100)
+        b = save(os.path.join(directory, "b.txt"), b"b" * 100)
+        cache.store("a1", "https://x/a", a, {})
+        cache.store("a2", "https://x/a?copy", a, {})
+        cache.store("a1", "https://x/a", b, {})  # replaced: "a2" still uses blob a
+        assert cache.stats()["bytes"] == 200 and os.path.exists(cache.blob_path(a.sha256))
+        cache.store("a2", "https://x/a?copy", b, {})  # nothing uses blob a any more
+        assert cache.stats()["bytes"] == 100 and not os.path.exists(cache.blob_path(a.sha256))
+        cache.close()
+        # An index from before the counter is counted when it is opened
+        conn = sqlite3.connect(os.path.join(directory, "cache", "index.sqlite3"))
+        conn.executescript("DROP TABLE blobs; DROP TABLE totals;")
+        conn.close()
+        reopened = DownloadCache(os.path.join(directory, "cache"), max_bytes=250)
+        assert reopened.stats()["bytes"] == 100
+        c = save(os.path.join(directory, "c.txt"), b"c" * 200)
+        reopened.store("c", "https://x/c", c, {})  # evicts blob b and both entries using it
+        stats = reopened.stats()
+        assert (stats["entries"], stats["bytes"], stats["evictions"]) == (1, 200, 2)
+        assert not os.path.exists(reopened.blob_path(b.sha256))
+        reopened.close()
+
+def test_corrupt_blobs_are_dropped():
+    print("=== Testing hash verification on restore ===")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DownloadCache(os.path.join(directory, "cache"))
+        cache.store("a", "https://x/a", save(os.path.join(directory, "a.txt"), b"original"), {})
+        entry = cache.lookup("a")
+        assert open(cache.restore(entry, os.path.join(directory, "copy.txt")).path, "rb").read() == b"original"
+        with open(cache.blob_path(entry.sha256), "wb") as f:
+            f.write(b"tampered")
+        try:
+            cache.restore(entry, os.path.join(directory, "copy.txt"))
+        except DownloadMismatch:
+            pass
+        else:
+            raise AssertionError("expected DownloadMismatch")
+        assert open(os.path.join(directory, "copy.txt"), "rb").read() == b"original"
+        assert cache.lookup("a") is None
+
+def test_downloads_revalidate_and_work_offline():
+    print("=== Testing conditional GET and offline mode in download_firebase_txt_file ===")
+    import sever
+    server = start_server()
+    cwd = os.getcwd()
+    saved_cache = sever.download_cache
+
+    async def download_async(url: str) -> dict:
+        async with Client(sever.app) as client:
+            response = await client.call_tool("download_firebase_txt_file", {
+                "firebase_url": url, "filename": "Cached_Project_Plan.txt"
+            })
+            return json.loads(response.content[0].text)
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            sever.download_cache = DownloadCache(os.path.join(directory, "cache"))
+            url = f"http://127.0.0.1:{server.server_port}/downloadTextPlan"
+            first = sever.download_firebase_txt_file(url, filename="Cached_Project_Plan.txt")
+            second = sever.download_firebase_txt_file(url, filename="Cached_Project_Plan.txt")
+            third = asyncio.run(download_async(url))
+            print(f"Cache: {first['cache']}, {second['cache']}, {third['cache']}")
+            assert (first["cache"], second["cache"], third["cache"]) == ("miss", "revalidated", "revalidated")
+            assert first["sha256"] == second["sha256"] == third["sha256"]
+            assert [request[-1] for request in ValidatingHandler.requests] == [200, 304, 304]
+            assert ValidatingHandler.requests[1][1:3] == (ETAG, LAST_MODIFIED)
+            assert "project_name=Cached&" in ValidatingHandler.requests[0][0]
+            with open("Cached_Project_Plan.txt", encoding="utf-8") as f:
+                assert f.read() == PLAN
+
+            server.shutdown()
+            sever.download_cache.offline = True
+            os.remove("Cached_Project_Plan.txt")
+            offline = sever.download_firebase_txt_file(url, filename="Cached_Project_Plan.txt")
+            assert offline["success"] and offline["cache"] == "offline"
+            with open("Cached_Project_Plan.txt", encoding="utf-8") as f:
+                assert f.read() == PLAN
+            missing = sever.download_firebase_txt_file(url, filename="Other_Project_Plan.txt")
+            assert not missing["success"] and "Offline" in missing["error"]
+            assert len(ValidatingHandler.requests) == 3
+    finally:
+        sever.download_cache = saved_cache
+        os.chdir(cwd)
+        server.shutdown()
+
+def test_broken_cached_copies_are_downloaded_again():
+    print("=== Testing 304 with a corrupt cached copy ===")
+    import sever
+    server = start_server()
+    cwd = os.getcwd()
+    saved_cache = sever.download_cache
+
+    def download_async(url: str, filename: str) -> dict:
+        return asyncio.run(sever.download_firebase_txt_file_async(url, filename=filename))
+
+    def tamper(path: str):
+        with open(path, "wb") as f:
+            f.write(b"tampered")
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            sever.download_cache = DownloadCache(os.path.join(directory, "cache"))
+            url = f"http://127.0.0.1:{server.server_port}/downloadTextPlan"
+            first = sever.download_firebase_txt_file(url, filename="Cached_Project_Plan.txt")
+            blob = sever.download_cache.blob_path(first["sha256"])
+            results = []
+            for download in (sever.download_firebase_txt_file, download_async):
+                tamper(blob)  # the server answers 304, but the cached copy can't be used
+                results.append(download(url, filename="Cached_Project_Plan.txt"))
+            print(f"Cache: {[result.get('cache') for result in results]}")
+            assert all(result["success"] and result["cache"] == "miss" for result in results), results
+            assert [request[-1] for request in ValidatingHandler.requests] == [200, 304, 200, 304, 200]
+            assert ValidatingHandler.requests[2][1:3] == (None, None)  # refetched without validators
+            with open("Cached_Project_Plan.txt", encoding="utf-8") as f:
+                assert f.read() == PLAN
+
+            tamper(blob)
+            sever.download_cache.offline = True
+            offline = sever.download_firebase_txt_file(url, filename="Cached_Project_Plan.txt")
+            assert not offline["success"] and "Offline" in offline["error"]
+    finally:
+        sever.download_cache = saved_cache
+        os.chdir(cwd)
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_blobs_are_content_addressed_and_evicted_lru()
+    test_byte_total_is_kept_in_a_counter()
+    test_corrupt_blobs_are_dropped()
+    test_downloads_revalidate_and_work_offline()
+    test_broken_cached_copies_are_downloaded_again()
+    print("\nAll download cache tests passed!")
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared Firebase HTTP session (uses a local server, no network needed)
+Usage: python test_firebase_http.py
+"""
+
+import asyncio
+import gzip
+import hashlib
+import inspect
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from fastmcp import Client
+
+from firebase_http import DOWNLOAD_CHUNK_SIZE, DownloadTooLarge, PooledSession, StreamingDownload
+from firebase_http import create_async_client, firebase_async_client, firebase_session, is_firebase_url
+
+PLAN = "PROJECT PLAN\n" + "Build the thing, then test the thing.\n" * 200
+LATIN1_PLAN = "Project Name: Café Übersicht\nStraße, naïve façade\n"
+
+class PlanHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    connections = set()
+    encodings = []
+
+    def do_GET(self):
+        PlanHandler.connections.add(self.client_address)
+        PlanHandler.encodings.append(self.headers.get("Accept-Encoding", ""))
+        if self.path.startswith("/slow"):
+            time.sleep(1)
+        if self.path.startswith("/latin1"):
+            body = LATIN1_PLAN.encode("iso-8859-1")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=iso-8859-1")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        body = gzip.compress(PLAN.encode())
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out
+
+    def log_message(self, *args):
+        pass
+
+def start_server() -> ThreadingHTTPServer:
+    PlanHandler.connections.clear()
+    PlanHandler.encodings.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PlanHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_connections_are_reused_and_gzip_decoded():
+    print("=== Testing keep-alive and gzip ===")
+    server = start_server()
+    session = PooledSession()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/plan"
+        for _ in range(5):
+            response = session.get(url)
+            assert response.text == PLAN
+        print(f"5 requests over {len(PlanHandler.connections)} connection(s)")
+        assert len(PlanHandler.connections) == 1
+        assert all("gzip" in encoding for encoding in PlanHandler.encodings)
+    finally:
+        session.close()
+        server.shutdown()
+
+def test_default_timeout():
+    print("=== Testing default read timeout ===")
+    server = start_server()
+    session = PooledSession(timeout=(1, 0.2))
+    try:
+        try:
+            session.get(f"http://127.0.0.1:{server.server_port}/slow")
+        except requests.exceptions.Timeout:
+            pass
+        else:
+            raise AssertionError("expected the default read timeout to fire")
+        # An explicit timeout still wins
+        assert session.get(f"http://127.0.0.1:{server.server_port}/slow", timeout=5).status_code == 200
+    finally:
+        session.close()
+        server.shutdown()
+
+def test_pools_are_sized_per_host():
+    print("=== Testing per-host pools ===")
+    session = PooledSession(pool_sizes={"cloudfunctions.net": 12, "firestore.googleapis.com": 6}, default_pool_size=2)
+    functions = session.get_adapter("https://us-central1-mcptest-468919.cloudfunctions.net/downloadTextPlan")
+    assert functions is session.get_adapter("https://europe-west1-other.cloudfunctions.net/x")
+    assert functions._pool_maxsize == 12
+    assert session.get_adapter("https://firestore.googleapis.com/v1/projects/p")._pool_maxsize == 6
+    assert session.get_adapter("https://notcloudfunctions.net/x") is session.default_adapter
+    assert session.default_adapter._pool_maxsize == 2
+
+    assert is_firebase_url("https://us-central1-mcptest-468919.cloudfunctions.net/downloadTextPlan")
+    assert is_firebase_url("https://firestore.googleapis.com/v1/projects/p")
+    assert not is_firebase_url("http://us-central1-p.cloudfunctions.net/x")  # https only
+    assert not is_firebase_url("https://notcloudfunctions.net/x")
+    assert not is_firebase_url("https://us-central1-x@evil.example/.cloudfunctions.net/x")
+
+def test_sever_downloads_share_the_session():
+    print("=== Testing download_firebase_txt_file over the shared session ===")
+    import sever
+    server = start_server()
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            for name in ("first.txt", "second.txt"):
+                result = sever.download_firebase_txt_file(
+                    f"http://127.0.0.1:{server.server_port}/plan", filename=name, save_as_cline_rules=False
+                )
+                assert result["success"], result
+                with open(name, encoding="utf-8") as f:
+                    assert f.read() == PLAN
+        assert len(PlanHandler.connections) == 1
+        assert firebase_session() is firebase_session()
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+def test_async_client_pools_and_timeouts():
+    print("=== Testing async client configuration ===")
+    client = create_async_client(pool_sizes={"cloudfunctions.net": 12}, default_pool_size=2, timeout=(1, 7))
+    functions = client._transport_for_url(client.build_request("GET", "https://us-central1-p.cloudfunctions.net/x").url)
+    assert functions._pool._max_connections == 12
+    assert client._transport_for_url(client.build_request("GET", "https://example.com/").url) is client._transport
+    assert client._transport._pool._max_connections == 2
+    assert client.timeout.connect == 1 and client.timeout.read == 7
+
+    async def same_client_per_loop():
+        return firebase_async_client() is firebase_async_client()
+
+    assert asyncio.run(same_client_per_loop())
+
+def test_async_tools_download_concurrently():
+    print("=== Testing async download_firebase_txt_file tool ===")
+    import sever
+    from mcp_dispatch import load_tool_registry
+    registry = load_tool_registry(sever.app)
+    assert inspect.iscoroutinefunction(registry["download_firebase_txt_file"])
+    assert inspect.iscoroutinefunction(registry["list_firebase_files"])
+
+    server = start_server()
+    cwd = os.getcwd()
+
+    async def main():
+        async with Client(sever.app) as client:
+            return await asyncio.gather(*[
+                client.call_tool("download_firebase_txt_file", {
+                    "firebase_url": f"http://127.0.0.1:{server.server_port}/slow",
+                    "filename": f"plan_{i}.txt"
+                }) for i in range(8)
+            ])
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            started = time.perf_counter()
+            responses = asyncio.run(main())
+            elapsed = time.perf_counter() - started
+            print(f"8 downloads of a 1s response in {elapsed:.2f}s")
+            assert elapsed < 4
+            for i, response in enumerate(responses):
+                result = json.loads(response.content[0].text)
+                assert result["success"] and result["cline_rules_created"], result
+                with open(f"plan_{i}.txt", encoding="utf-8") as f:
+                    assert f.read() == PLAN
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+def test_streaming_download_is_atomic_and_bounded():
+    print("=== Testing StreamingDownload ===")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "plan.txt")
+        with open(path, "w") as f:
+            f.write("previous version")
+        download = StreamingDownload(path, max_bytes=10)
+        download.write(b"12345")
+        try:
+            download.write(b"678901")
+        except DownloadTooLarge:
+            pass
+        else:
+            raise AssertionError("expected DownloadTooLarge")
+        with open(path) as f:
+            assert f.read() == "previous version"  # untouched by the aborted download
+        assert os.listdir(directory) == ["plan.txt"]
+
+        download = StreamingDownload(path, max_bytes=10)
+        try:
+            download.check_length({"content-length": "11"})
+        except DownloadTooLarge:
+            pass
+        else:
+            raise AssertionError("expected Content-Length to abort the download")
+        assert os.listdir(directory) == ["plan.txt"]
+
+        with StreamingDownload(path, charset="iso-8859-1") as download:
+            for byte in LATIN1_PLAN.encode("iso-8859-1"):
+                download.write(bytes([byte]))
+        expected = LATIN1_PLAN.encode("utf-8")
+        assert download.size == len(expected) and download.sha256 == hashlib.sha256(expected).hexdigest()
+        with open(path, "rb") as f:
+            assert f.read() == expected
+        umask = os.umask(0)
+        os.umask(umask)
+        assert os.stat(path).st_mode & 0o777 == 0o666 & ~umask
+
+        with StreamingDownload(None, charset="iso-8859-1") as download:
+            download.write(LATIN1_PLAN.encode("iso-8859-1"))
+        assert download.content == expected and download.sha256 == hashlib.sha256(expected).hexdigest()
+        assert os.listdir(directory) == ["plan.txt"]  # kept in memory
+
+def test_cline_rules_are_streamed():
+    print("=== Testing streamed .cline rules ===")
+    import sever
+    timestamp = lambda text: re.sub(r'"download_timestamp": "[^"]*"', "", text)
+    with tempfile.TemporaryDirectory() as directory:
+        # The project name straddles a chunk boundary
+        content = 'x "quoted"\n' * (DOWNLOAD_CHUNK_SIZE // 11) + "Project Name: Straddling\n" + "tail\n" * 10
+        source = os.path.join(directory, "Big_Project_Plan.txt")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(content)
+        size = sever.write_cline_rules(source, "Big_Project_Plan.txt", os.path.join(directory, "rules.txt"))
+        with open(os.path.join(directory, "rules.txt"), encoding="utf-8") as f:
+            streamed = f.read()
+        assert '"name": "Straddling"' in streamed and size == len(streamed)
+        assert timestamp(streamed) == timestamp(sever.convert_to_cline_rules(content, "Big_Project_Plan.txt"))
+
+def test_downloads_report_bytes_and_hash():
+    print("=== Testing file_size and sha256 of downloads ===")
+    import sever
+    server = start_server()
+    cwd = os.getcwd()
+
+    async def download_async(url: str) -> dict:
+        async with Client(sever.app) as client:
+            response = await client.call_tool("download_firebase_txt_file", {"firebase_url": url, "filename": "async.txt"})
+            return json.loads(response.content[0].text)
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            url = f"http://127.0.0.1:{server.server_port}/latin1"
+            results = [
+                sever.download_firebase_txt_file(url, filename="sync.txt"),
+                asyncio.run(download_async(url))
+            ]
+            expected = LATIN1_PLAN.encode("utf-8")
+            for result in results:
+                print(f"{result['original_file']}: {result['file_size']} bytes, sha256 {result['sha256'][:12]}...")
+                assert result["file_size"] == len(expected) > len(LATIN1_PLAN)
+                assert result["sha256"] == hashlib.sha256(expected).hexdigest()
+                with open(result["original_file"], "rb") as f:
+                    assert f.read() == expected
+                with open(result["cline_rules_file"], encoding="utf-8") as f:
+                    assert '"name": "Café Übersicht"' in f.read()
+            assert not [name for name in os.listdir(directory) if name.endswith(".part")]
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_connections_are_reused_and_gzip_decoded()
+    test_default_timeout()
+    test_pools_are_sized_per_host()
+    test_sever_downloads_share_the_session()
+    test_async_client_pools_and_timeouts()
+    test_async_tools_download_concurrently()
+    test_streaming_download_is_atomic_and_bounded()
+    test_cline_rules_are_streamed()
+    test_downloads_report_bytes_and_hash()
+    print("\nAll Firebase HTTP session tests passed!")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script for hedged pool calls and deadline propagation
+Usage: python test_hedging.py
+"""
+
+import asyncio
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from hedging import HedgePolicy
+from mcp_client import MCPTimeoutError
+from mcp_pool import MCPSessionPool
+
+class FakeClient:
+    """Stands in for an MCPClient; `stall` makes every call hang until cancelled."""
+
+    def __init__(self, stall: bool = False):
+        self.stall = stall
+        self.calls = 0
+        self.last_used = time.monotonic()
+        self.is_alive = True
+        self.cancelled = 0
+        self.timeouts = []
+
+    async def start(self):
+        return self
+
+    async def call_tool(self, tool_name, arguments, timeout=30.0, timings=None):
+        self.calls += 1
+        self.timeouts.append(timeout)
+        try:
+            await asyncio.wait_for(asyncio.sleep(60 if self.stall else 0.001), timeout)
+        except asyncio.TimeoutError:
+            raise MCPTimeoutError(f"Timed out after {timeout}s")
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"result": {"content": [{"type": "text", "text": "ok"}], "isError": False, "client": id(self)}}
+
+    async def ping(self):
+        return True
+
+    async def close(self):
+        self.is_alive = False
+
+def make_pool(clients: list, **kwargs) -> MCPSessionPool:
+    pending = list(clients)
+    return MCPSessionPool(size=len(clients), client_factory=lambda: pending.pop(0), **kwargs)
+
+def test_policy_thresholds_and_budget():
+    print("=== Testing hedge policy ===")
+    policy = HedgePolicy(min_samples=20, budget=0.1, min_delay=0.0)
+    assert policy.delay("tool") is None  # no history yet
+    for i in range(100):
+        policy.observe("tool", (i + 1) / 1000)
+    print(f"Policy: {policy.stats()}")
+    assert policy.delay("tool") == 0.096
+    policy.hedges = policy.calls  # budget spent
+    assert policy.delay("tool") is None
+
+def test_stalled_worker_is_hedged_and_cancelled():
+    print("=== Testing hedged call ===")
+    stalled, healthy = FakeClient(stall=True), FakeClient()
+    policy = HedgePolicy(min_samples=5, budget=1.0)
+    for _ in range(5):
+        policy.observe("provide_base_template", 0.002)
+
+    async def main():
+        pool = make_pool([healthy, stalled], hedging=policy)
+        await pool.start()
+        # Load the healthy session so the primary goes to the stalled one
+        async with pool.session():
+            call = asyncio.ensure_future(pool.call_tool("provide_base_template", {}, timeout=5, hedge=True))
+            await asyncio.sleep(0.001)
+        started = time.perf_counter()
+        response = await call
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.01)
+        await pool.close()
+        return response, elapsed
+
+    response, elapsed = asyncio.run(main())
+    print(f"Answered by the hedge in {elapsed * 1000:.1f} ms; stats: {policy.stats()}")
+    assert response["result"]["client"] == id(healthy)
+    assert elapsed < 1
+    assert stalled.cancelled == 1
+    assert (policy.hedges, policy.hedge_wins) == (1, 1)
+
+def test_non_idempotent_calls_are_not_hedged():
+    print("=== Testing hedge opt-in ===")
+    stalled, healthy = FakeClient(stall=True), FakeClient()
+    policy = HedgePolicy(min_samples=1, budget=1.0)
+    policy.observe("download", 0.001)
+
+    async def main():
+        pool = make_pool([healthy, stalled], hedging=policy)
+        await pool.start()
+        async with pool.session():
+            call = asyncio.ensure_future(pool.call_tool("download", {}, timeout=0.2))
+            await asyncio.sleep(0.001)
+        results = await asyncio.gather(call, return_exceptions=True)
+        await pool.close()
+        return results[0]
+
+    result = asyncio.run(main())
+    print(f"Result: {result!r}")
+    assert isinstance(result, MCPTimeoutError)
+    assert policy.hedges == 0 and healthy.calls == 0
+
+def test_remaining_deadline_is_passed_to_the_server():
+    print("=== Testing deadline propagation ===")
+    client = FakeClient()
+
+    async def main():
+        pool = make_pool([client], max_inflight=1)
+        await pool.start()
+        async with pool.session():
+            call = asyncio.ensure_future(pool.call_tool("provide_base_template", {}, timeout=0.5))
+            await asyncio.sleep(0.3)  # the call waits for the only session
+        await call
+        await pool.close()
+
+    asyncio.run(main())
+    print(f"Timeout given to the server: {client.timeouts[0]:.3f}s")
+    assert client.timeouts[0] < 0.25
+
+if __name__ == "__main__":
+    test_policy_thresholds_and_budget()
+    test_stalled_worker_is_hedged_and_cancelled()
+    test_non_idempotent_calls_are_not_hedged()
+    test_remaining_deadline_is_passed_to_the_server()
+    print("\nAll hedging tests passed!")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for serving sever.py over streamable HTTP (runs in-process, no server needed)
+Usage: python test_http_transport.py
+"""
+
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from starlette.testclient import TestClient
+
+import sever
+
+HEADERS = {"Accept": "application/json, text/event-stream"}
+
+def rpc(client: TestClient, request_id: int, method: str, params: dict = None) -> dict:
+    message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+    if params is not None:
+        message["params"] = params
+    response = client.post("/mcp", json=message, headers=HEADERS)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/json")
+    return response.json()
+
+def test_stateless_tool_calls_need_no_session():
+    print("=== Testing stateless streamable HTTP ===")
+    with TestClient(sever.create_http_app()) as client:
+        tools = rpc(client, 1, "tools/list")["result"]["tools"]
+        names = sorted(tool["name"] for tool in tools)
+        print(f"Tools: {names}")
+        assert "collect_requirements" in names and "list_firebase_files" in names
+        # No initialize handshake and no session id: any worker can take any call
+        reply = rpc(client, 2, "tools/call", {"name": "provide_base_template", "arguments": {"use_case": "ml"}})
+        assert reply["id"] == 2 and not reply["result"]["isError"]
+        assert json.loads(reply["result"]["content"][0]["text"]) == sever.provide_base_template("ml")
+
+def test_module_exposes_asgi_app():
+    print("=== Testing sever:http_app ===")
+    assert sever.http_app is sever.http_app  # built once, on first access
+    try:
+        sever.not_an_attribute
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("missing attributes must still raise AttributeError")
+
+if __name__ == "__main__":
+    test_stateless_tool_calls_need_no_session()
+    test_module_exposes_asgi_app()
+    print("\nAll HTTP transport tests passed!")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for the pipelined asyncio MCP client
+Usage: python test_mcp_client.py
+"""
+
+import asyncio
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mcp_client import STREAM_LIMIT, MCPClient, MCPSessionError
+
+# Answers each request with its params, after some output that isn't a
+# response; a "padding" argument makes the response that many bytes longer
+FAKE_SERVER = r"""
+import json, sys
+for line in sys.stdin:
+    message = json.loads(line)
+    if "id" not in message:
+        continue
+    if message["method"] == "tools/call":
+        print(42)  # a stray print from a tool
+        # a server-to-client request that happens to reuse the id
+        print(json.dumps({"jsonrpc": "2.0", "id": message["id"], "method": "roots/list"}))
+    result = message.get("params", {})
+    result["padding"] = "x" * result.get("arguments", {}).get("padding", 0)
+    print(json.dumps({"jsonrpc": "2.0", "id": message["id"], "result": result}), flush=True)
+"""
+
+def test_pipelined_calls_resolve_by_id():
+    print("=== Testing pipelined tools/call on one connection ===")
+
+    async def run():
+        client = await MCPClient().start()
+        try:
+            responses = await asyncio.gather(*[
+                client.call_tool("collect_requirements", {
+                    "project_name": f"Project {i}",
+                    "project_type": "api",
+                    "complexity": "low"
+                })
+                for i in range(50)
+            ])
+            assert client.in_flight == 0
+            return responses
+        finally:
+            await client.close()
+
+    responses = asyncio.run(run())
+    ids = [response["id"] for response in responses]
+    print(f"Request ids: {ids[:5]} ... {ids[-1]}")
+    assert ids == sorted(ids) and len(set(ids)) == 50
+    for i, response in enumerate(responses):
+        plan = json.loads(response["result"]["content"][0]["text"])
+        assert plan["project_name"] == f"Project {i}"
+
+def test_server_exit_fails_pending_requests():
+    print("=== Testing server exit with requests in flight ===")
+
+    async def run():
+        client = await MCPClient().start()
+        client._process.kill()
+        try:
+            await client.call_tool("provide_base_template", {"use_case": "api"}, timeout=5)
+            raise AssertionError("expected MCPSessionError")
+        except MCPSessionError as e:
+            print(f"Failed as expected: {e}")
+        assert not client.is_alive
+        await client.close()
+
+    asyncio.run(run())
+
+def test_unrelated_lines_are_skipped():
+    print("=== Testing non-object lines and server requests ===")
+
+    async def run():
+        client = await MCPClient([sys.executable, "-c", FAKE_SERVER]).start()
+        try:
+            response = await client.call_tool("collect_requirements", {"project_name": "x"}, timeout=5)
+            assert client.is_alive
+            return response
+        finally:
+            await client.close()
+
+    response = asyncio.run(run())
+    print(f"Response: {response}")
+    assert response["result"]["arguments"] == {"project_name": "x"}
+
+def test_oversized_response_fails_only_its_request():
+    print("=== Testing a response line over the limit ===")
+
+    async def run():
+        client = await MCPClient([sys.executable, "-c", FAKE_SERVER]).start()
+        try:
+            # The small call is answered after the oversized one, on the same pipe
+            results = await asyncio.gather(
+                client.call_tool("download_firebase_txt_file", {"padding": STREAM_LIMIT + 1024 * 1024}, timeout=30),
+                client.call_tool("collect_requirements", {"project_name": "small"}, timeout=30),
+                return_exceptions=True
+            )
+            assert client.is_alive
+            after = await client.call_tool("collect_requirements", {"project_name": "after"}, timeout=5)
+            return results, after
+        finally:
+            await client.close()
+
+    (oversized, small), after = asyncio.run(run())
+    print(f"Oversized: {oversized!r}")
+    assert isinstance(oversized, MCPSessionError) and "line limit" in str(oversized)
+    assert small["result"]["arguments"] == {"project_name": "small"}
+    assert after["result"]["arguments"] == {"project_name": "after"}
+
+if __name__ == "__main__":
+    test_pipelined_calls_resolve_by_id()
+    test_server_exit_fails_pending_requests()
+    test_unrelated_lines_are_skipped()
+    test_oversized_response_fails_only_its_request()
+    print("\nAll client tests passed!")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for in-process tool dispatch
+Usage: python test_mcp_dispatch.py
+"""
+
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mcp_dispatch import InProcessDispatcher
+from mcp_pool import MCPSessionPool
+
+def test_registry_has_all_tools():
+    print("=== Testing tool registry ===")
+    dispatcher = InProcessDispatcher()
+    print(f"Registered tools: {sorted(dispatcher.registry)}")
+    for name in ["collect_requirements", "provide_base_template",
+                 "provide_advanced_template", "analyze_process_automation"]:
+        assert dispatcher.has_tool(name)
+
+def test_inprocess_matches_stdio():
+    print("=== Testing in-process vs stdio results ===")
+    dispatcher = InProcessDispatcher()
+    calls = [
+        ("collect_requirements", {"project_name": "TaskManager", "project_type": "webapp", "complexity": "medium"}),
+        ("provide_base_template", {"use_case": "ml"}),
+        ("provide_advanced_template", {"base_template": "Design a dashboard", "style": "security_first"})
+    ]
+
+    async def run():
+        pool = MCPSessionPool(size=1)
+        try:
+            for tool_name, arguments in calls:
+                local = (await dispatcher.call_tool(tool_name, arguments))["result"]
+                remote = (await pool.call_tool(tool_name, arguments))["result"]
+                print(f"{tool_name}: {local['content'][0]['text'][:60]}")
+                assert local == remote, (local, remote)
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+def test_inprocess_reports_tool_errors():
+    print("=== Testing in-process error result ===")
+    response = asyncio.run(InProcessDispatcher().call_tool("collect_requirements", {"project_name": "x"}))
+    result = response["result"]
+    print(f"Error: {result['content'][0]['text']}")
+    assert result["isError"] is True
+
+if __name__ == "__main__":
+    test_registry_has_all_tools()
+    test_inprocess_matches_stdio()
+    test_inprocess_reports_tool_errors()
+    print("\nAll dispatch tests passed!")
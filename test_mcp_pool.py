@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled stdio MCP sessions used by api_server.py
+Usage: python test_mcp_pool.py
+"""
+
+import asyncio
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mcp_pool import MCPSessionPool, PoolExhaustedError
+
+def _text(response):
+    return response["result"]["content"][0]["text"]
+
+def test_pool_reuses_sessions():
+    print("=== Testing session reuse ===")
+
+    async def run():
+        pool = MCPSessionPool(size=1)
+        try:
+            async with pool.session() as first:
+                pass
+            async with pool.session() as second:
+                pass
+            assert first is second
+            result = json.loads(_text(await pool.call_tool("provide_base_template", {"use_case": "api"})))
+            print(f"Templates: {result}")
+            assert len(result) == 2
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+def test_pool_multiplexes_one_session():
+    print("=== Testing concurrent calls on one session ===")
+
+    async def run():
+        pool = MCPSessionPool(size=1, max_inflight=16)
+        try:
+            responses = await asyncio.gather(*[
+                pool.call_tool("provide_advanced_template", {"base_template": f"Task {i}"})
+                for i in range(40)
+            ])
+            print(f"Pool stats: {pool.stats()}")
+            assert pool.stats()["live"] == 1
+            for i, response in enumerate(responses):
+                assert _text(response).startswith(f"Task {i}\n")
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+def test_pool_recycles_after_max_calls():
+    print("=== Testing recycling after max_calls ===")
+
+    async def run():
+        pool = MCPSessionPool(size=1, max_calls=2)
+        try:
+            async with pool.session() as session:
+                await session.call_tool("provide_base_template", {"use_case": "ml"})
+                await session.call_tool("provide_base_template", {"use_case": "ml"})
+            async with pool.session() as replacement:
+                assert replacement is not session
+            print(f"Pool stats: {pool.stats()}")
+            assert pool.stats()["recycled"] == 1
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+def test_pool_replaces_dead_sessions():
+    print("=== Testing dead session replacement ===")
+
+    async def run():
+        pool = MCPSessionPool(size=1)
+        try:
+            async with pool.session() as session:
+                pass
+            session._process.kill()
+            await session._process.wait()
+            result = _text(await pool.call_tool("provide_advanced_template", {"base_template": "Build an API"}))
+            print(f"Enhanced template: {result!r}")
+            assert result.startswith("Build an API")
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+def test_pool_bounded_wait_queue():
+    print("=== Testing bounded wait queue ===")
+
+    async def run():
+        pool = MCPSessionPool(size=1, max_inflight=1, max_waiters=1, acquire_timeout=2)
+        try:
+            held = await pool.acquire()
+            waiter = asyncio.ensure_future(pool.acquire())
+            while pool.stats()["waiting"] < 1:
+                await asyncio.sleep(0.01)
+            try:
+                await pool.acquire()
+                raise AssertionError("expected PoolExhaustedError")
+            except PoolExhaustedError as e:
+                print(f"Rejected as expected: {e}")
+            await pool.release(held)
+            await pool.release(await waiter)
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_pool_reuses_sessions()
+    test_pool_multiplexes_one_session()
+    test_pool_recycles_after_max_calls()
+    test_pool_replaces_dead_sessions()
+    test_pool_bounded_wait_queue()
+    print("\nAll pool tests passed!")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test script for the prefork zygote launcher
+Usage: python test_mcp_zygote.py
+"""
+
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mcp_pool import MCPSessionPool
+from mcp_zygote import ZygoteLauncher
+
+def test_forked_workers_serve_independently():
+    print("=== Testing forked workers ===")
+
+    async def main():
+        zygote = await ZygoteLauncher().start()
+        try:
+            first = await zygote.client().start()
+            second = await zygote.client().start()
+            print(f"Worker pids: {first.pid}, {second.pid}")
+            assert first.pid != second.pid
+            response = await first.call_tool("provide_base_template", {"use_case": "api"})
+            assert not response["result"]["isError"]
+            await first.close()
+            # Closing one worker leaves its siblings running
+            assert await second.ping()
+            await second.close()
+            assert not second.is_alive
+        finally:
+            await zygote.close()
+        return zygote
+
+    zygote = asyncio.run(main())
+    assert not zygote.is_alive
+    assert not os.path.exists(zygote.socket_path)
+
+def test_pool_with_zygote_factory():
+    print("=== Testing pool backed by the zygote ===")
+
+    async def main():
+        zygote = await ZygoteLauncher().start()
+        pool = MCPSessionPool(size=2, max_calls=3, client_factory=zygote.client)
+        try:
+            await pool.start()
+            responses = await asyncio.gather(*[
+                pool.call_tool("provide_advanced_template", {"base_template": f"Task {i}"})
+                for i in range(10)
+            ])
+            return responses, pool.recycled
+        finally:
+            await pool.close()
+            await zygote.close()
+
+    responses, recycled = asyncio.run(main())
+    print(f"Recycled sessions: {recycled}")
+    assert all(not r["result"]["isError"] for r in responses)
+    assert recycled >= 1
+
+if __name__ == "__main__":
+    test_forked_workers_serve_independently()
+    test_pool_with_zygote_factory()
+    print("\nAll zygote tests passed!")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-process Prometheus metrics
+Usage: python test_metrics.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import Registry
+
+def test_counter_and_gauge_rendering():
+    print("=== Testing counters and gauges ===")
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ("tool",))
+    in_flight = registry.gauge("in_flight", "In flight", ("tool",))
+    registry.gauge("pool_waiting", "Waiting", callback=lambda: 3)
+    requests.inc(tool="provide_base_template")
+    requests.inc(2, tool="provide_base_template")
+    with in_flight.track(tool="collect_requirements"):
+        assert in_flight.value(tool="collect_requirements") == 1
+    text = registry.render()
+    print(text)
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{tool="provide_base_template"} 3' in text
+    assert 'in_flight{tool="collect_requirements"} 0' in text
+    assert "pool_waiting 3" in text
+
+def test_histogram_buckets_are_cumulative():
+    print("=== Testing histogram buckets ===")
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ("phase",), buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 5.0):
+        latency.observe(value, phase="execute")
+    text = registry.render()
+    print(text)
+    assert 'latency_seconds_bucket{phase="execute",le="0.01"} 1' in text
+    assert 'latency_seconds_bucket{phase="execute",le="0.1"} 3' in text
+    assert 'latency_seconds_bucket{phase="execute",le="1.0"} 3' in text
+    assert 'latency_seconds_bucket{phase="execute",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{phase="execute"} 4' in text
+
+def test_label_values_are_escaped():
+    print("=== Testing label escaping ===")
+    registry = Registry()
+    registry.counter("errors_total", "Errors", ("type",)).inc(type='bad "quote"\n')
+    assert 'errors_total{type="bad \\"quote\\"\\n"} 1' in registry.render()
+
+def test_histogram_quantiles():
+    print("=== Testing histogram quantile estimates ===")
+    histogram = Registry().histogram("latency_seconds", "Latency", ("tool",), buckets=(0.1, 0.2, 0.4))
+    assert histogram.quantile(0.5, tool="a") is None
+    for value in [0.05] * 50 + [0.15] * 40 + [0.3] * 9 + [5.0]:
+        histogram.observe(value, tool="a")
+    summary = histogram.summary(tool="a")
+    print(f"Summary: {summary}")
+    assert summary["count"] == 100 and abs(summary["mean"] - 0.162) < 1e-9
+    assert summary["p50"] == 0.1
+    assert abs(summary["p95"] - (0.2 + 0.2 * 5 / 9)) < 1e-9
+    assert summary["p99"] == 0.4  # the sample past the last bucket is only known to be > 0.4
+
+if __name__ == "__main__":
+    test_counter_and_gauge_rendering()
+    test_histogram_buckets_are_cumulative()
+    test_label_values_are_escaped()
+    test_histogram_quantiles()
+    print("\nAll metrics tests passed!")
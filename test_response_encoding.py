@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test script for JSON encoding and content-coding negotiation
+Usage: python test_response_encoding.py
+"""
+
+import gzip
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from response_encoding import COMPRESSORS, MIN_COMPRESS_BYTES, EncodedResult, dumps, negotiate, variant_etag
+from result_cache import canonical_json, encode_result, etag_for_body
+
+def test_dumps_matches_canonical_encoding():
+    print("=== Testing fast encoder ===")
+    value = {"b": [1, 2.5, None, True], "a": {"é": "ünïcode", "z": "line\nbreak"}}
+    assert dumps(value, sort_keys=True) == canonical_json(value).encode()
+    encoded = encode_result(value)
+    assert encoded.body == canonical_json(value).encode()
+    assert encoded.etag == etag_for_body(encoded.body)
+
+def test_negotiate_accept_encoding():
+    print("=== Testing Accept-Encoding negotiation ===")
+    best = "br" if "br" in COMPRESSORS else "gzip"
+    assert negotiate(None) is None
+    assert negotiate("identity") is None
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip, deflate, br") == best
+    assert negotiate("br;q=0.5, gzip;q=0.8") == "gzip"
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("*") == best
+    assert negotiate("*, gzip;q=0") == ("br" if "br" in COMPRESSORS else None)
+
+def test_variants_are_built_once():
+    print("=== Testing stored compressed variants ===")
+    calls = []
+    encoded = EncodedResult(b'{"text":"' + b"x" * MIN_COMPRESS_BYTES + b'"}', '"abc"',
+                            on_encode=lambda coding, data: calls.append(coding))
+    coding, first = encoded.encode("gzip")
+    _, second = encoded.encode("gzip")
+    print(f"{len(encoded.body)} bytes -> {len(first)} bytes gzip")
+    assert coding == "gzip" and first is second
+    assert gzip.decompress(first) == encoded.body
+    assert calls == ["gzip"]
+    assert variant_etag(encoded.etag, coding) == '"abc-gzip"'
+    assert variant_etag(encoded.etag, None) == '"abc"'
+    small = EncodedResult(b"[]", '"def"')
+    assert small.encode("gzip") == (None, b"[]")
+
+if __name__ == "__main__":
+    test_dumps_matches_canonical_encoding()
+    test_negotiate_accept_encoding()
+    test_variants_are_built_once()
+    print("\nAll response encoding tests passed!")
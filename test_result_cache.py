@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test script for the tool result cache
+Usage: python test_result_cache.py
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from result_cache import ResultCache, SQLiteResultCache, cache_key, encode_result, etag_matches
+
+def test_cache_key_is_canonical():
+    print("=== Testing canonical cache keys ===")
+    a = cache_key("collect_requirements", {"project_name": "A", "complexity": "low"})
+    b = cache_key("collect_requirements", {"complexity": "low", "project_name": "A"})
+    c = cache_key("provide_base_template", {"project_name": "A", "complexity": "low"})
+    print(f"Key: {a}")
+    assert a == b
+    assert a != c
+
+def test_lru_eviction_and_counters():
+    print("=== Testing LRU eviction ===")
+    cache = ResultCache(max_entries=2)
+    cache.put("a", {"value": 1})
+    cache.put("b", {"value": 2})
+    assert cache.lookup("a") is not None  # "a" becomes most recently used
+    cache.put("c", {"value": 3})       # evicts "b"
+    assert cache.lookup("b") is None
+    assert cache.lookup("c") is not None
+    stats = cache.stats()
+    print(f"Cache stats: {stats}")
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+
+def test_ttl_expiry():
+    print("=== Testing TTL expiry ===")
+    cache = ResultCache(ttl=0.05)
+    cache.put("a", ["template"])
+    result, encoded = cache.lookup("a")
+    assert result == ["template"] and encoded.etag == encode_result(["template"]).etag
+    time.sleep(0.1)
+    assert cache.lookup("a") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_etag_matching():
+    print("=== Testing If-None-Match parsing ===")
+    etag = encode_result({"value": 1}).etag
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+def test_sqlite_cache_is_shared_between_workers():
+    print("=== Testing shared SQLite cache ===")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite3")
+        worker_a, worker_b = SQLiteResultCache(path), SQLiteResultCache(path)
+        result = {"content": [{"type": "text", "text": "template"}], "isError": False}
+        etag = worker_a.put("key", result)
+        assert etag == encode_result(result).etag
+        shared, encoded = worker_b.lookup("key")
+        assert (shared, encoded.etag) == (result, etag)
+        body = worker_b.lookup("key", decode=False)[1].body
+        assert body == b'{"content":[{"text":"template","type":"text"}],"isError":false}'
+        stats = worker_b.stats()
+        print(f"Worker B stats: {stats}")
+        assert (stats["entries"], stats["bytes"], stats["hits"]) == (1, len(body), 2)
+        worker_a.close()
+        worker_b.close()
+
+def test_sqlite_cache_stores_compressed_variants_once():
+    print("=== Testing shared compressed variants ===")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite3")
+        worker_a, worker_b = SQLiteResultCache(path), SQLiteResultCache(path)
+        worker_a.put("key", {"text": "template " * 200})
+        _, encoded = worker_a.lookup("key")
+        coding, data = encoded.encode("gzip")
+        size = worker_a.stats()["bytes"]
+        assert coding == "gzip" and size == len(encoded.body) + len(data)
+        _, shared = worker_b.lookup("key")
+        assert shared.variants == {"gzip": data}  # worker B never compresses it again
+        shared.encode("gzip")
+        assert worker_b.stats()["bytes"] == size
+        worker_a.close()
+        worker_b.close()
+
+def test_sqlite_cache_evicts_by_size_and_expires():
+    print("=== Testing SQLite size eviction and TTL ===")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SQLiteResultCache(os.path.join(directory, "cache.sqlite3"), max_bytes=250, ttl=60, touch_interval=0)
+        for key in "abc":
+            cache.put(key, "x" * 100)  # 102 bytes encoded
+            time.sleep(0.01)
+        assert cache.lookup("a") is None  # oldest entry evicted to fit 250 bytes
+        assert cache.stats()["evictions"] == 1
+        cache.lookup("b")                 # "b" becomes most recently used
+        time.sleep(0.01)
+        cache.put("d", "y" * 100)      # evicts "c", not "b"
+        assert cache.lookup("b") is not None and cache.lookup("c") is None
+        cache.ttl = 0.05
+        cache.put("e", "z")
+        time.sleep(0.1)
+        assert cache.lookup("e") is None
+        assert cache.stats()["expirations"] >= 1
+        cache.ttl = 60
+        cache.put("b", "w" * 50)       # replacing an entry adjusts the byte counter
+        stored = cache._connection().execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        assert cache.stats()["bytes"] == stored <= 250
+        cache.close()
+
+def test_sqlite_variants_are_queued_off_the_encoding_thread():
+    print("=== Testing queued variant writes ===")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite3")
+        worker_a, worker_b = SQLiteResultCache(path), SQLiteResultCache(path)
+        worker_a.put("key", {"text": "template " * 200})
+        _, encoded = worker_a.lookup("key")
+        holding, release = threading.Event(), threading.Event()
+        def hold_lock():
+            with worker_a._lock:
+                holding.set()
+                release.wait(5)
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        holding.wait()
+        started = time.monotonic()
+        _, data = encoded.encode("gzip")  # must not wait for the busy cache
+        assert time.monotonic() - started < 1
+        release.set()
+        holder.join()
+        assert worker_b.lookup("key")[1].variants == {}
+        worker_a.lookup("key")            # the next call stores the queued variant
+        assert worker_b.lookup("key")[1].variants == {"gzip": data}
+        worker_a.close()
+        worker_b.close()
+
+def test_sqlite_entry_counter():
+    print("=== Testing SQLite entry counter ===")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite3")
+        cache = SQLiteResultCache(path, max_bytes=250, ttl=60)
+        for key in "abcb":
+            cache.put(key, "x" * 100)    # "a" is evicted, "b" replaced
+        assert cache.entries == 2
+        other = SQLiteResultCache(path)
+        assert other.stats()["entries"] == 2 == other.entries
+        cache.clear()
+        assert cache.entries == 0 == other.stats()["entries"]
+        cache.close()
+        other.close()
+
+if __name__ == "__main__":
+    test_cache_key_is_canonical()
+    test_lru_eviction_and_counters()
+    test_ttl_expiry()
+    test_etag_matching()
+    test_sqlite_cache_is_shared_between_workers()
+    test_sqlite_cache_stores_compressed_variants_once()
+    test_sqlite_cache_evicts_by_size_and_expires()
+    test_sqlite_variants_are_queued_off_the_encoding_thread()
+    test_sqlite_entry_counter()
+    print("\nAll cache tests passed!")
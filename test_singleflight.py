@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for single-flight call coalescing
+Usage: python test_singleflight.py
+"""
+
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from singleflight import SingleFlight
+
+def test_identical_calls_share_one_execution():
+    print("=== Testing coalesced execution ===")
+    flights = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": len(runs)}
+
+    async def main():
+        results = await asyncio.gather(*[flights.do("key", work) for _ in range(10)])
+        other = await flights.do("other", work)
+        return results, other
+
+    results, other = asyncio.run(main())
+    stats = flights.stats()
+    print(f"Stats: {stats}")
+    assert len(runs) == 2
+    assert all(result is results[0] for result in results)
+    assert other == {"value": 2}
+    assert (stats["executions"], stats["coalesced"], stats["in_flight"]) == (2, 9, 0)
+
+def test_exceptions_reach_every_waiter():
+    print("=== Testing shared exceptions ===")
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*[flights.do("key", fail) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_cancellation_only_stops_abandoned_executions():
+    print("=== Testing waiter cancellation ===")
+    flights = SingleFlight()
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(0.1)
+            return "done"
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def main():
+        first = asyncio.ensure_future(flights.do("a", work))
+        second = asyncio.ensure_future(flights.do("a", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        survivor = await second  # one waiter leaving doesn't cancel the others
+
+        lone = asyncio.ensure_future(flights.do("b", work))
+        await asyncio.sleep(0.01)
+        lone.cancel()
+        await asyncio.gather(lone, return_exceptions=True)
+        await asyncio.sleep(0)
+        return survivor
+
+    assert asyncio.run(main()) == "done"
+    assert cancelled == [1]
+    assert "a" not in flights and "b" not in flights
+
+if __name__ == "__main__":
+    test_identical_calls_share_one_execution()
+    test_exceptions_reach_every_waiter()
+    test_cancellation_only_stops_abandoned_executions()
+    print("\nAll single-flight tests passed!")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for per-tool instrumentation of the MCP server
+Usage: python test_tool_stats.py
+"""
+
+import asyncio
+import json
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastmcp import Client, FastMCP
+
+from tool_stats import ToolStats, ToolStatsMiddleware
+
+def busy(seconds: float):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+def make_server(stats: ToolStats, **lifespan) -> FastMCP:
+    server = FastMCP("stats-test", lifespan=stats.lifespan(**lifespan))
+    server.add_middleware(ToolStatsMiddleware(stats))
+
+    @server.tool
+    def crunch(text: str) -> str:
+        busy(0.02)
+        return text * 100
+
+    @server.tool
+    async def wait_then_crunch() -> str:
+        await asyncio.sleep(0.1)  # wall time, not CPU
+        busy(0.02)
+        return "done"
+
+    @server.tool
+    def fail() -> str:
+        raise KeyError("missing")
+
+    return server
+
+def test_calls_are_timed_and_sized():
+    print("=== Testing per-tool statistics ===")
+    stats = ToolStats()
+
+    async def main():
+        async with Client(make_server(stats)) as client:
+            for _ in range(3):
+                await client.call_tool("crunch", {"text": "abc"})
+            await client.call_tool("wait_then_crunch", {})
+            try:
+                await client.call_tool("fail", {})
+            except Exception:
+                pass
+
+    asyncio.run(main())
+    tools = stats.snapshot()["tools"]
+    print(json.dumps(tools["wait_then_crunch"], indent=2))
+    crunch = tools["crunch"]
+    assert crunch["calls"] == 3 and crunch["errors"] == 0
+    assert crunch["cpu_seconds"]["sum"] >= 0.06
+    assert crunch["argument_bytes"]["sum"] == 3 * len('{"text": "abc"}')
+    assert crunch["result_bytes"]["sum"] == 3 * 300
+    waited = tools["wait_then_crunch"]
+    assert waited["wall_seconds"]["sum"] >= 0.12
+    assert 0.02 <= waited["cpu_seconds"]["sum"] < 0.06  # the sleep is not CPU time
+    assert tools["fail"]["errors"] == 1 and sum(tools["fail"]["exceptions"].values()) == 1
+
+def test_stats_are_dumped_periodically():
+    print("=== Testing periodic JSON dump ===")
+    stats = ToolStats()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "stats-{pid}.json")
+        written = path.replace("{pid}", str(os.getpid()))
+
+        async def main():
+            async with Client(make_server(stats, path=path, interval=0.05)) as client:
+                await client.call_tool("crunch", {"text": "x"})
+                await asyncio.sleep(0.2)
+                with open(written) as f:
+                    assert json.load(f)["tools"]["crunch"]["calls"] == 1
+                await client.call_tool("crunch", {"text": "y"})
+
+        asyncio.run(main())
+        with open(written) as f:  # final dump on shutdown
+            snapshot = json.load(f)
+        print(f"Dumped: pid {snapshot['pid']}, tools {list(snapshot['tools'])}")
+        assert snapshot["tools"]["crunch"]["calls"] == 2
+        assert os.listdir(directory) == [os.path.basename(written)]
+
+def test_server_stats_tool():
+    print("=== Testing server_stats tool ===")
+    import sever
+
+    async def main():
+        async with Client(sever.app) as client:
+            await client.call_tool("provide_base_template", {"use_case": "api"})
+            response = await client.call_tool("server_stats", {})
+            return json.loads(response.content[0].text)
+
+    snapshot = asyncio.run(main())
+    assert snapshot["pid"] == os.getpid()
+    assert snapshot["tools"]["provide_base_template"]["calls"] >= 1
+
+if __name__ == "__main__":
+    test_calls_are_timed_and_sized()
+    test_stats_are_dumped_periodically()
+    test_server_stats_tool()
+    print("\nAll tool statistics tests passed!")
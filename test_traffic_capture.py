@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for traffic capture and replay
+Usage: python test_traffic_capture.py
+"""
+
+import asyncio
+import gzip
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from replay_traffic import replay, summarize
+from traffic_capture import CaptureMiddleware, TrafficRecorder, read_capture
+
+def make_app(recorder: TrafficRecorder) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/echo")
+    async def echo(q: str):
+        return {"q": q}
+
+    @app.post("/batch")
+    async def batch(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.get("/metrics")
+    async def metrics():
+        return {}
+
+    app.add_middleware(CaptureMiddleware, recorder=recorder, paths=["/echo", "/batch"])
+    return app
+
+def test_capture_records_requests_compactly():
+    print("=== Testing traffic capture ===")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "capture-{pid}.ndjson.gz")
+        recorder = TrafficRecorder(path)
+        with TestClient(make_app(recorder)) as client:
+            client.get("/echo", params={"q": "a"}, headers={"X-Request-Timeout": "2", "User-Agent": "x"})
+            client.post("/batch", json=[{"tool": "provide_base_template"}])
+            client.get("/metrics")  # not captured
+        recorder.close()
+        written = os.path.join(directory, f"capture-{os.getpid()}.ndjson.gz")
+        records = read_capture(written)
+        print(f"Records: {records}")
+        assert [r[1:3] for r in records] == [["GET", "/echo"], ["POST", "/batch"]]
+        assert records[0][3] == "q=a" and records[0][4]["x-request-timeout"] == "2"
+        assert "user-agent" not in records[0][4]
+        assert records[1][5] == '[{"tool":"provide_base_template"}]'
+        assert records[0][0] <= records[1][0]
+        with open(written, "ab") as f:  # a worker killed mid-write leaves a truncated member
+            f.write(gzip.compress(b'[1,"GET","/echo","q=b",{},null]\n')[:-8])
+        assert len(read_capture(written)) >= 2
+
+def test_replay_follows_schedule_and_reports_percentiles():
+    print("=== Testing replay ===")
+    app = make_app(TrafficRecorder(os.devnull))
+    start = time.time()
+    records = [[start + i * 0.1, "GET", "/echo", f"q={i}", {}, None] for i in range(10)]
+    records.append([start + 0.5, "POST", "/batch", "", {}, "[]"])
+
+    async def main(speed: float):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await replay(records, client, speed=speed)
+
+    samples, real_time = asyncio.run(main(1.0))
+    _, accelerated = asyncio.run(main(10.0))
+    report = summarize(samples, real_time)
+    print(f"1x: {real_time:.3f}s, 10x: {accelerated:.3f}s, report: {report}")
+    assert 0.9 <= real_time < 1.5
+    assert accelerated < 0.3
+    assert report["/echo"]["requests"] == 10 and report["/batch"]["requests"] == 1
+    assert report["all"]["requests"] == 11 and report["all"]["errors"] == 0
+    assert report["/echo"]["p50_ms"] <= report["/echo"]["p99_ms"]
+
+if __name__ == "__main__":
+    test_capture_records_requests_compactly()
+    test_replay_follows_schedule_and_reports_percentiles()
+    print("\nAll traffic capture tests passed!")
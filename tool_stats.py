@@ -0,0 +1,225 @@
+"""
+Per-tool instrumentation for the FastMCP server in sever.py.
+
+ToolStatsMiddleware wraps every tool call and records its outcome, wall
+time, CPU time, argument and result sizes and exceptions in a ToolStats.
+The numbers are served by the `server_stats` tool and, when a path is set,
+written to a JSON file every `interval` seconds.
+
+CPU time is the CPU burnt by the tool body itself: FastMCP runs sync tools
+on a worker thread, so each tool function is wrapped to measure that
+thread's CPU time (for async tools, only the steps that run the tool's own
+code) and to report it to the middleware through a context variable.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import os
+import time
+import types
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from fastmcp.server.middleware import Middleware
+
+from metrics import Registry
+
+# Arguments and results range from a few bytes to multi-megabyte downloads
+BYTE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# [cpu_seconds] of the tool call running in this context
+_call_cpu = ContextVar("tool_call_cpu", default=None)
+
+
+@types.coroutine
+def _timed_steps(coro, cell: list):
+    """Drive `coro`, adding the thread CPU time of each of its steps to cell[0]."""
+    value, error = None, None
+    while True:
+        start = time.thread_time()
+        try:
+            yielded = coro.send(value) if error is None else coro.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            cell[0] += time.thread_time() - start
+        try:
+            value, error = (yield yielded), None
+        except BaseException as e:  # delivered into the tool, e.g. cancellation
+            value, error = None, e
+
+
+def cpu_timed(fn):
+    """Wrap a tool function so its CPU time is added to the current call's counter."""
+    if getattr(fn, "_cpu_timed", False):
+        return fn
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def timed(*args, **kwargs):
+            cell = _call_cpu.get()
+            if cell is None:
+                return await fn(*args, **kwargs)
+            return await _timed_steps(fn(*args, **kwargs), cell)
+    else:
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            cell = _call_cpu.get()
+            start = time.thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if cell is not None:
+                    cell[0] += time.thread_time() - start
+    timed._cpu_timed = True
+    return timed
+
+
+def result_bytes(result) -> int:
+    """Size of a ToolResult's content blocks as sent (text as UTF-8, binary as base64)."""
+    size = 0
+    for block in getattr(result, "content", None) or ():
+        data = getattr(block, "text", None)
+        if data is None:
+            data = getattr(block, "data", None) or ""
+        size += len(data.encode()) if isinstance(data, str) else len(data)
+    return size
+
+
+class ToolStats:
+    """
+    Call counts, latency and size histograms and exceptions per tool.
+
+    Everything is per process: a process forked from a zygote starts from
+    zero instead of inheriting its parent's numbers.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self.registry = Registry()
+        self.calls = self.registry.counter(
+            "mcp_server_tool_calls_total", "Tool calls by outcome (ok, error)", ("tool", "outcome")
+        )
+        self.exceptions = self.registry.counter(
+            "mcp_server_tool_exceptions_total", "Exceptions raised by tools, by type", ("tool", "type")
+        )
+        self.wall = self.registry.histogram("mcp_server_tool_wall_seconds", "Tool call wall time", ("tool",))
+        self.cpu = self.registry.histogram("mcp_server_tool_cpu_seconds", "CPU time spent in the tool", ("tool",))
+        self.argument_bytes = self.registry.histogram(
+            "mcp_server_tool_argument_bytes", "JSON size of tool arguments", ("tool",), buckets=BYTE_BUCKETS
+        )
+        self.result_bytes = self.registry.histogram(
+            "mcp_server_tool_result_bytes", "Size of tool result content", ("tool",), buckets=BYTE_BUCKETS
+        )
+        self._tools = set()
+        self._exceptions = {}  # tool -> {exception type: count}
+
+    def observe(self, tool: str, wall: float, cpu: float, argument_bytes: int, result_size: int, error: str = None):
+        if self.pid != os.getpid():
+            self._reset()
+        self._tools.add(tool)
+        self.calls.inc(tool=tool, outcome="error" if error else "ok")
+        if error:
+            self.exceptions.inc(tool=tool, type=error)
+            counts = self._exceptions.setdefault(tool, {})
+            counts[error] = counts.get(error, 0) + 1
+        self.wall.observe(wall, tool=tool)
+        self.cpu.observe(cpu, tool=tool)
+        self.argument_bytes.observe(argument_bytes, tool=tool)
+        if not error:
+            self.result_bytes.observe(result_size, tool=tool)
+
+    def snapshot(self) -> dict:
+        if self.pid != os.getpid():
+            self._reset()
+        tools = {}
+        for tool in sorted(self._tools):
+            ok, errors = self.calls.value(tool=tool, outcome="ok"), self.calls.value(tool=tool, outcome="error")
+            tools[tool] = {
+                "calls": ok + errors,
+                "errors": errors,
+                "exceptions": dict(sorted(self._exceptions.get(tool, {}).items())),
+                "wall_seconds": self.wall.summary(tool=tool),
+                "cpu_seconds": self.cpu.summary(tool=tool),
+                "argument_bytes": self.argument_bytes.summary(tool=tool),
+                "result_bytes": self.result_bytes.summary(tool=tool)
+            }
+        return {
+            "pid": self.pid,
+            "started_at": self.started_at,
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "tools": tools
+        }
+
+    def dump(self, path: str):
+        """Write the snapshot to `path` ("{pid}" is replaced) atomically."""
+        path = path.replace("{pid}", str(os.getpid()))
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temporary, path)
+
+    def lifespan(self, path: str = None, interval: float = 60.0):
+        """FastMCP lifespan dumping the stats to `path` every `interval` seconds and on shutdown."""
+        @asynccontextmanager
+        async def dump_periodically(server):
+            if not path:
+                yield {}
+                return
+
+            async def loop():
+                while True:
+                    await asyncio.sleep(interval)
+                    self.dump(path)
+
+            task = asyncio.ensure_future(loop())
+            try:
+                yield {}
+            finally:
+                task.cancel()
+                self.dump(path)
+
+        return dump_periodically
+
+
+class ToolStatsMiddleware(Middleware):
+    """FastMCP middleware recording every tool call in a ToolStats."""
+
+    def __init__(self, stats: ToolStats):
+        self.stats = stats
+        self._timed = set()  # tools whose function already reports CPU time
+
+    async def _time_cpu(self, context, tool_name: str):
+        self._timed.add(tool_name)
+        server = context.fastmcp_context.fastmcp if context.fastmcp_context is not None else None
+        if server is None:
+            return
+        try:
+            tool = await server.get_tool(tool_name)
+        except Exception:
+            return  # unknown tool; the call itself reports the error
+        if tool is not None and callable(getattr(tool, "fn", None)):
+            tool.fn = cpu_timed(tool.fn)
+
+    async def on_call_tool(self, context, call_next):
+        tool_name = context.message.name
+        if tool_name not in self._timed:
+            await self._time_cpu(context, tool_name)
+        argument_bytes = len(json.dumps(context.message.arguments or {}, default=str))
+        cell = [0.0]
+        token = _call_cpu.set(cell)
+        started = time.perf_counter()
+        try:
+            result = await call_next(context)
+        except Exception as e:
+            self.stats.observe(tool_name, time.perf_counter() - started, cell[0], argument_bytes, 0, type(e).__name__)
+            raise
+        finally:
+            _call_cpu.reset(token)
+        self.stats.observe(tool_name, time.perf_counter() - started, cell[0], argument_bytes, result_bytes(result))
+        return result
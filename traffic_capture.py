@@ -0,0 +1,110 @@
+"""
+Opt-in capture of api_server.py traffic for replay_traffic.py.
+
+CaptureMiddleware appends one line per request to a gzip-compressed NDJSON
+file: [start_time, method, path, query_string, headers, body]. Only the
+headers that change how a request is served are kept. Each uvicorn worker
+must write its own file, which a "{pid}" placeholder in the path does;
+read_capture() merges several files back into one time-ordered stream.
+"""
+
+import gzip
+import json
+import os
+import time
+
+# Request headers that change the response and are therefore replayed
+CAPTURED_HEADERS = ("accept", "accept-encoding", "if-none-match", "x-request-timeout")
+
+
+class TrafficRecorder:
+    """
+    Writes captured requests to `path` ("{pid}" is replaced by the worker's pid).
+
+    Args:
+        path: Capture file, gzip-compressed NDJSON
+        flush_interval: Seconds between flushes, so a killed worker loses at most this much
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.records = 0
+        self._file = None
+        self._pid = None
+        self._flushed_at = 0.0
+
+    def record(self, started: float, method: str, path: str, query: str, headers: dict, body: str = None):
+        if self._pid != os.getpid():
+            # Opened lazily so that forked workers never share a file handle
+            self._pid = os.getpid()
+            self._file = gzip.open(self.path.replace("{pid}", str(self._pid)), "at", encoding="utf-8")
+        line = [round(started, 6), method, path, query, headers, body]
+        self._file.write(json.dumps(line, separators=(",", ":"), ensure_ascii=False) + "\n")
+        self.records += 1
+        now = time.monotonic()
+        if now - self._flushed_at >= self.flush_interval:
+            self._file.flush()
+            self._flushed_at = now
+
+    def close(self):
+        if self._file is not None and self._pid == os.getpid():
+            self._file.close()
+        self._file = None
+        self._pid = None
+
+
+class CaptureMiddleware:
+    """
+    Pure ASGI middleware recording every request to `paths` with its start time.
+
+    Requests are recorded once they finish, including ones rejected further
+    down the stack, so a replay reproduces the offered load, not just the
+    load that was admitted.
+    """
+
+    def __init__(self, app, recorder: TrafficRecorder, paths):
+        self.app = app
+        self.recorder = recorder
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        started = time.time()
+        chunks = []
+
+        async def capture_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunks.append(message.get("body", b""))
+            return message
+
+        try:
+            await self.app(scope, capture_receive, send)
+        finally:
+            headers = {}
+            for name, value in scope["headers"]:
+                name = name.decode("latin-1")
+                if name in CAPTURED_HEADERS:
+                    headers[name] = value.decode("latin-1")
+            body = b"".join(chunks)
+            self.recorder.record(
+                started, scope["method"], scope["path"], scope["query_string"].decode("latin-1"),
+                headers, body.decode("utf-8", "replace") if body else None
+            )
+
+
+def read_capture(*paths: str) -> list:
+    """Load one or more capture files as a single list of records ordered by start time."""
+    records = []
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    records.append(json.loads(line))
+            except (EOFError, ValueError):
+                pass  # truncated tail of a file whose worker was killed
+    records.sort(key=lambda record: record[0])
+    return records